@@ -0,0 +1,88 @@
+"""
+Smart Money Tracker - Frame Decoding Microbenchmark
+Per-frame cost of turning raw feed frames into trade events
+
+Usage: python benchmarks/bench_decode.py [recording.jsonl[.gz|.zst] | segment_dir] [--frames 200000]
+
+Without a recording, frames are synthesized by workload.py (including
+token-launch frames) plus a share of subscription acks.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "code"))
+
+import events  # noqa: E402
+from workload import generate  # noqa: E402
+
+ACK = '{"message":"Successfully subscribed to token creation events."}'
+
+
+def legacy_decode(frame: str):
+    """The previous path: json.loads, then the field reads _apply_trade made"""
+    try:
+        event = json.loads(frame)
+    except json.JSONDecodeError:
+        return None
+    tx_type = event.get('txType')
+    if tx_type not in ['buy', 'sell']:
+        return None
+    return (tx_type, event.get('traderPublicKey'), event.get('mint'), event.get('name', 'Unknown'),
+            event.get('symbol', 'UNKNOWN'), float(event.get('solAmount', 0)),
+            float(event.get('tokenAmount', 0)), event.get('signature'),
+            int(event.get('timestamp', time.time() * 1000)) // 1000)
+
+
+def load_frames(path: str, limit: int) -> List[str]:
+    if path is None:
+        frames = [json.dumps(frame, separators=(",", ":")) for frame in generate(limit)]
+        # pumpportal acks every subscribe; sprinkle a few in
+        return [ACK if i % 500 == 0 else frame for i, frame in enumerate(frames)]
+
+    from replay import read_frames
+    frames = []
+    for _, frame in read_frames(path):
+        frames.append(frame)
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def bench(name: str, decode, frames: List[str], repeat: int = 3) -> float:
+    best = float("inf")
+    trades = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        trades = sum(1 for frame in frames if decode(frame) is not None)
+        best = min(best, time.perf_counter() - started)
+    per_frame_ns = best / len(frames) * 1e9
+    print(f"  {name:<28} {per_frame_ns:>8.0f} ns/frame  {len(frames) / best:>12,.0f} frames/s  "
+          f"({trades} trades)")
+    return per_frame_ns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark frame decoding")
+    parser.add_argument("path", nargs="?", default=None, help="recording or segment directory")
+    parser.add_argument("--frames", type=int, default=200000)
+    args = parser.parse_args()
+
+    frames = load_frames(args.path, args.frames)
+    non_trade = sum(1 for frame in frames if not events.is_trade_frame(frame))
+    print(f"{len(frames)} frames, {non_trade} rejected by the pre-filter")
+
+    bench("json.loads + dict gets", legacy_decode, frames)
+    fast_loads = events._loads
+    events._loads = json.loads
+    bench("decode_trade (stdlib json)", events.decode_trade, frames)
+    events._loads = fast_loads
+    if events.orjson is not None:
+        bench("decode_trade (orjson)", events.decode_trade, frames)
+    else:
+        print("  orjson not installed; skipping")
@@ -0,0 +1,252 @@
+"""
+Smart Money Tracker - Ingest Benchmark Suite
+Time the hot paths against databases of 10k / 1M / 10M trades
+
+Usage: python benchmarks/bench_ingest.py [--sizes 10k,1m] [--ops 2000] [--out results.json]
+
+Databases are built once from the deterministic workload and cached in
+benchmarks/.cache; every run works on a fresh copy. Results are written
+as JSON (default benchmarks/results/ingest-<commit>-<time>.json) so runs
+can be compared across commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "code"))
+
+from metrics import percentile  # noqa: E402
+from workload import WorkloadGenerator, wallet_count  # noqa: E402
+
+CACHE_DIR = os.path.join(HERE, ".cache")
+RESULTS_DIR = os.path.join(HERE, "results")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Frames generated past the cached database, used for the process_trade run
+TAIL_EVENTS = 20_000
+BUILD_BATCH = 5_000
+
+
+def summarize(samples: List[float]) -> Dict:
+    samples = sorted(samples)
+    n = len(samples)
+    total = sum(samples)
+    return {
+        "n": n,
+        "mean_ms": round(total / n * 1000, 4),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+        "ops_per_s": round(n / total, 1) if total else None,
+    }
+
+
+def timed(fn: Callable, args_list) -> Dict:
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def build_database(size: int, seed: int) -> str:
+    """Cached database holding `size` generated frames, plus the next frames as JSONL"""
+    from smart_money_monitor import SmartMoneyTracker
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"trades-{size}-s{seed}.db")
+    tail_path = path + ".tail.jsonl"
+    if os.path.exists(path) and os.path.exists(tail_path):
+        return path
+
+    print(f"Building {size}-frame database (cached in {CACHE_DIR})...", flush=True)
+    building = path + ".building"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+
+    generator = WorkloadGenerator(seed=seed, wallets=wallet_count(size))
+    tracker = SmartMoneyTracker(db_path=building)
+    started = time.perf_counter()
+    done = 0
+    while done < size:
+        batch = [next(generator) for _ in range(min(BUILD_BATCH, size - done))]
+        tracker.process_batch(batch)
+        done += len(batch)
+        if done % (BUILD_BATCH * 100) == 0:
+            print(f"  {done}/{size} frames ({done / (time.perf_counter() - started):.0f}/s)", flush=True)
+    tracker.flush_scores()
+    tracker.rescore_all()
+    tracker.db.close()
+
+    with open(tail_path, "w") as f:
+        for _ in range(TAIL_EVENTS):
+            f.write(json.dumps(next(generator), separators=(",", ":")) + "\n")
+    os.replace(building, path)
+    print(f"  built in {time.perf_counter() - started:.0f}s", flush=True)
+    return path
+
+
+def bench_size(label: str, size: int, seed: int, ops: int) -> Dict:
+    from smart_money_monitor import SmartMoneyTracker
+    import web_dashboard
+    from fastapi.testclient import TestClient
+
+    cached = build_database(size, seed)
+    workdir = tempfile.mkdtemp(prefix="smt-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copy(cached, db_path)
+    rng = random.Random(seed)
+    results: Dict[str, Dict] = {}
+
+    try:
+        started = time.perf_counter()
+        tracker = SmartMoneyTracker(db_path=db_path)
+        results["startup_load"] = {"seconds": round(time.perf_counter() - started, 3)}
+
+        with tracker.db.read() as conn:
+            trades = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+            wallet_rows = conn.execute("""
+                SELECT address FROM wallets ORDER BY total_trades DESC LIMIT 2000
+            """).fetchall()
+        wallets = [w for (w,) in wallet_rows]
+        sample = [(rng.choice(wallets),) for _ in range(ops)]
+
+        # Rows with open lots, for _close_position
+        with tracker.db.read() as conn:
+            open_lots = conn.execute("""
+                SELECT wallet_address, token_address, entry_amount_tokens, entry_price
+                FROM positions WHERE status = 'open'
+                ORDER BY id DESC LIMIT ?
+            """, (ops,)).fetchall()
+
+        def in_transaction(run: Callable[[object], Dict]) -> Dict:
+            """Time calls inside one write transaction, as process_batch does
+
+            The database is a throwaway copy, so the writes are committed
+            and the in-memory state stays consistent for the next step.
+            """
+            with tracker.db.session() as cursor:
+                result = run(cursor)
+            tracker._batch_alerts = []
+            return result
+
+        results["_update_wallet_stats"] = in_transaction(
+            lambda cursor: timed(lambda w: tracker._update_wallet_stats(cursor, w), sample))
+
+        if open_lots:
+            now = int(time.time())
+            close_args = [(w, t, tokens * 0.5, tokens * 0.5 * price * 1.1) for w, t, tokens, price in open_lots]
+            results["_close_position"] = in_transaction(
+                lambda cursor: timed(
+                    lambda w, t, tokens, sol: tracker._close_position(
+                        cursor, w, t, 0, now, sol / tokens if tokens else 0, sol, tokens),
+                    close_args))
+
+        # Subscribe every sampled wallet so _check_alerts takes the full path
+        alert_wallets = sorted({w for (w,) in sample[:200]})
+        with tracker.db.write() as conn:
+            conn.executemany("""
+                INSERT INTO alert_configs (user_id, wallet_address, alert_type, alert_destination,
+                                           min_performance_score, min_buy_amount_sol, created_at)
+                VALUES ('bench', ?, 'telegram', '1', 0, 0, 0)
+            """, [(w,) for w in alert_wallets])
+            tracker.alert_index.refresh(conn.cursor())
+        results["_check_alerts"] = in_transaction(
+            lambda cursor: timed(
+                lambda w: tracker._check_alerts(cursor, w, 0, 1.0, "mint", "Bench", "BENCH", 0),
+                [(rng.choice(alert_wallets),) for _ in range(ops)]))
+
+        with open(cached + ".tail.jsonl") as f:
+            tail = [json.loads(line) for line in f][:ops]
+        results["process_trade"] = timed(tracker.process_trade, [(e,) for e in tail])
+
+        results["get_leaderboard"] = timed(tracker.get_leaderboard, [(20,)] * min(ops, 200))
+
+        web_dashboard.DB_PATH = db_path
+        client = TestClient(web_dashboard.app)
+        top = tracker.get_leaderboard(1)
+        addr = top[0]["address"] if top else wallets[0]
+        endpoints = {
+            "GET /": "/",
+            "GET /api/leaderboard": "/api/leaderboard",
+            "GET /api/wallet/{address}": f"/api/wallet/{addr}",
+            "GET /wallet/{address}": f"/wallet/{addr}",
+        }
+        for name, url in endpoints.items():
+            results[name] = timed(client.get, [(url,)] * min(ops, 200))
+
+        tracker.db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"frames": size, "trades": trades, "wallets": len(wallets), "results": results}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(report: Dict):
+    for label, size_report in report["sizes"].items():
+        print(f"\n== {label}: {size_report['trades']} trades ==")
+        for name, stats in size_report["results"].items():
+            if "p50_ms" in stats:
+                print(f"  {name:<28} p50 {stats['p50_ms']:>9.3f}ms  p99 {stats['p99_ms']:>9.3f}ms  "
+                      f"{stats['ops_per_s'] or 0:>10.0f} ops/s")
+            else:
+                print(f"  {name:<28} {stats['seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest hot paths at several database sizes")
+    parser.add_argument("--sizes", default="10k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--ops", type=int, default=2000, help="calls timed per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="JSON output path")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    commit = git_commit()
+    report = {
+        "benchmark": "ingest",
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "ops": args.ops,
+        "sizes": {},
+    }
+    for label in args.sizes.split(","):
+        label = label.strip().lower()
+        report["sizes"][label] = bench_size(label, SIZES[label], args.seed, args.ops)
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"ingest-{commit}-{stamp}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_table(report)
+    print(f"\nWrote {out}")
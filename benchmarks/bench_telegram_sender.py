@@ -0,0 +1,157 @@
+"""
+Smart Money Tracker - Telegram Sender Benchmark
+Fan out alerts against a local mock Bot API that enforces Telegram's limits
+
+Usage: python benchmarks/bench_telegram_sender.py [--messages 300] [--latency-ms 80]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from alert_sender import AlertSender  # noqa: E402
+
+TOKEN = "123456:bench"
+PORT = 8765
+
+
+def mock_bot_api(latency: float, global_rate: int = 30, per_chat_interval: float = 1.0):
+    """Bot API stand-in: sendMessage with ~30/s global and 1/s per chat limits"""
+    app = FastAPI()
+    state = {"recent": deque(), "last_by_chat": {}, "accepted": 0, "limited": 0}
+    lock = asyncio.Lock()
+
+    def too_many(retry_after: int):
+        state["limited"] += 1
+        return JSONResponse(status_code=429, content={
+            "ok": False, "error_code": 429,
+            "description": f"Too Many Requests: retry after {retry_after}",
+            "parameters": {"retry_after": retry_after},
+        })
+
+    @app.post(f"/bot{TOKEN}/getMe")
+    async def get_me():
+        return {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "bench",
+                                       "username": "bench_bot"}}
+
+    @app.post(f"/bot{TOKEN}/sendMessage")
+    async def send_message(request: Request):
+        form = await request.form()
+        data = dict(form) if form else await request.json()
+        chat_id = str(data["chat_id"])
+        await asyncio.sleep(latency)
+        async with lock:
+            now = time.monotonic()
+            recent = state["recent"]
+            while recent and recent[0] <= now - 1.0:
+                recent.popleft()
+            # Small allowance for client/server clock skew, as Telegram has
+            last = state["last_by_chat"].get(chat_id)
+            if last is not None and now - last < per_chat_interval - 0.05:
+                return too_many(1)
+            if len(recent) >= global_rate:
+                return too_many(1)
+            recent.append(now)
+            state["last_by_chat"][chat_id] = now
+            state["accepted"] += 1
+            message_id = state["accepted"]
+        return {"ok": True, "result": {"message_id": message_id, "date": int(time.time()),
+                                       "chat": {"id": int(chat_id), "type": "private"},
+                                       "text": data.get("text", "")}}
+
+    return app, state
+
+
+def start_server(app):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def make_bot() -> Bot:
+    return Bot(TOKEN, base_url=f"http://127.0.0.1:{PORT}/bot",
+               request=HTTPXRequest(connection_pool_size=64))
+
+
+def workload(messages: int, chats: int):
+    """One popular wallet: every chat subscribed, some chats subscribed twice"""
+    return [str(1000 + i % chats) for i in range(messages)]
+
+
+async def run_sequential(bot: Bot, chat_ids):
+    """Previous behaviour: await each send in turn, failures are dropped"""
+    sent = 0
+    for chat_id in chat_ids:
+        try:
+            await bot.send_message(chat_id=chat_id, text="alert")
+            sent += 1
+        except Exception:
+            pass
+    return sent
+
+
+async def run_unbounded(bot: Bot, chat_ids):
+    """Fire everything at once with no rate limiting"""
+    async def one(chat_id):
+        try:
+            await bot.send_message(chat_id=chat_id, text="alert")
+            return True
+        except Exception:
+            return False
+    return sum(await asyncio.gather(*(one(c) for c in chat_ids)))
+
+
+async def run_sender(bot: Bot, chat_ids):
+    sender = AlertSender(bot.send_message)
+    results = await asyncio.gather(*(sender.send(c, text="alert") for c in chat_ids))
+    await sender.stop()
+    return sum(results)
+
+
+async def bench(name, runner, chat_ids, state):
+    # Let the mock's rate windows drain between runs
+    await asyncio.sleep(1.5)
+    state["accepted"] = state["limited"] = 0
+    bot = make_bot()
+    async with bot:
+        start = time.perf_counter()
+        sent = await runner(bot, chat_ids)
+        elapsed = time.perf_counter() - start
+    print(f"{name:<12} sent {sent:>4}/{len(chat_ids)}  429s {state['limited']:>4}  "
+          f"{elapsed:6.2f}s  {sent / elapsed:6.1f} msg/s")
+
+
+async def main(args):
+    app, state = mock_bot_api(args.latency_ms / 1000)
+    server = start_server(app)
+    chat_ids = workload(args.messages, args.chats)
+    print(f"{len(chat_ids)} alerts to {args.chats} chats, mock RTT {args.latency_ms}ms")
+    try:
+        await bench("sequential", run_sequential, chat_ids, state)
+        await bench("unbounded", run_unbounded, chat_ids, state)
+        await bench("AlertSender", run_sender, chat_ids, state)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--chats", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""
+Smart Money Tracker - Synthetic Workload
+Deterministic generator of pump.fun-like trade traffic
+
+Usage: python benchmarks/workload.py --events 1000000 --out data/synthetic.jsonl.gz
+
+The same (events, seed, ...) arguments always produce the same stream:
+- wallet activity is Zipf distributed (a few wallets trade constantly)
+- new tokens launch with a 'create' frame and a burst of early buys
+- trading concentrates on recently launched tokens
+- sells come from real holdings and are often partial
+- a small fraction of frames are exact duplicates (same signature)
+"""
+
+import argparse
+import bisect
+import gzip
+import hashlib
+import itertools
+import json
+import random
+from typing import Dict, Iterator, List, Tuple
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+START_TIMESTAMP_MS = 1_700_000_000_000
+
+
+def b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    out = []
+    while n:
+        n, rem = divmod(n, 58)
+        out.append(B58_ALPHABET[rem])
+    pad = len(data) - len(data.lstrip(b"\0"))
+    return "1" * pad + "".join(reversed(out))
+
+
+def address(kind: str, index: int, seed: int) -> str:
+    """Stable base58 pubkey-like address"""
+    return b58encode(hashlib.sha256(f"{kind}:{seed}:{index}".encode()).digest())
+
+
+def wallet_count(events: int) -> int:
+    """Default wallet universe for a stream length"""
+    return max(500, events // 40)
+
+
+class WorkloadGenerator:
+    """Seeded pump.fun event stream (see module docstring for the model)"""
+
+    def __init__(self, seed: int = 42, wallets: int = 5000, zipf_s: float = 1.1,
+                 buy_ratio: float = 0.55, launch_rate: float = 0.01, burst_size: Tuple[int, int] = (5, 40),
+                 partial_sell_ratio: float = 0.6, duplicate_rate: float = 0.01,
+                 active_tokens: int = 200, events_per_second: float = 50.0):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.buy_ratio = buy_ratio
+        self.launch_rate = launch_rate
+        self.burst_size = burst_size
+        self.partial_sell_ratio = partial_sell_ratio
+        self.duplicate_rate = duplicate_rate
+        self.active_tokens = active_tokens
+        self.mean_gap_ms = 1000.0 / events_per_second
+
+        self.wallets = [address("wallet", i, seed) for i in range(wallets)]
+        weights = [1.0 / (rank ** zipf_s) for rank in range(1, wallets + 1)]
+        self._cumulative = list(itertools.accumulate(weights))
+
+        self.tokens: List[Dict] = []          # launched tokens, newest last
+        self.by_mint: Dict[str, Dict] = {}
+        self.holdings: Dict[str, Dict[str, float]] = {}  # wallet -> mint -> tokens
+        self._burst: List[Tuple[Dict, int]] = []  # (token, buys left) still bursting
+        self._recent: List[Dict] = []         # recent frames for duplicates
+        self.timestamp = START_TIMESTAMP_MS
+        self.count = 0
+
+    def zipf_wallet(self) -> str:
+        r = self.rng.random() * self._cumulative[-1]
+        return self.wallets[bisect.bisect_left(self._cumulative, r)]
+
+    def _launch(self) -> Dict:
+        index = len(self.tokens)
+        token = {
+            "mint": address("mint", index, self.seed),
+            "name": f"Synthetic {index}",
+            "symbol": f"SYN{index}",
+            "price": self.rng.uniform(2e-8, 5e-8),  # SOL per token
+        }
+        self.tokens.append(token)
+        self.by_mint[token["mint"]] = token
+        self._burst.append((token, self.rng.randint(*self.burst_size)))
+        return token
+
+    def _pick_token(self) -> Dict:
+        # Recent launches get most of the flow
+        window = min(len(self.tokens), self.active_tokens)
+        offset = min(int(self.rng.expovariate(1 / (window / 4))), window - 1)
+        return self.tokens[-1 - offset]
+
+    def _frame(self, tx_type: str, wallet: str, token: Dict, sol: float, tokens: float) -> Dict:
+        self.count += 1
+        return {
+            "signature": b58encode(hashlib.sha256(f"sig:{self.seed}:{self.count}".encode()).digest() * 2),
+            "mint": token["mint"],
+            "traderPublicKey": wallet,
+            "txType": tx_type,
+            "tokenAmount": tokens,
+            "solAmount": sol,
+            "marketCapSol": token["price"] * 1e9,
+            "name": token["name"],
+            "symbol": token["symbol"],
+            "pool": "pump",
+            "timestamp": self.timestamp,
+        }
+
+    def _trade(self) -> Dict:
+        token = self._pick_token()
+        # Random-walk the token price
+        token["price"] *= self.rng.lognormvariate(0, 0.05)
+        wallet = self.zipf_wallet()
+        held = self.holdings.get(wallet)
+
+        if held and self.rng.random() > self.buy_ratio:
+            mint = self.rng.choice(list(held))
+            token = self.by_mint[mint]
+            amount = held[mint]
+            if self.rng.random() < self.partial_sell_ratio:
+                amount *= self.rng.uniform(0.1, 0.9)
+            remaining = held[mint] - amount
+            if remaining <= 1e-6:
+                del held[mint]
+            else:
+                held[mint] = remaining
+            return self._frame("sell", wallet, token, amount * token["price"], amount)
+
+        return self._buy(wallet, token)
+
+    def _buy(self, wallet: str, token: Dict) -> Dict:
+        sol = round(self.rng.lognormvariate(-0.5, 1.0), 6) + 0.01
+        amount = sol / token["price"]
+        held = self.holdings.setdefault(wallet, {})
+        held[token["mint"]] = held.get(token["mint"], 0.0) + amount
+        return self._frame("buy", wallet, token, sol, amount)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self
+
+    def __next__(self) -> Dict:
+        self.timestamp += max(1, int(self.rng.expovariate(1 / self.mean_gap_ms)))
+
+        if self._recent and self.rng.random() < self.duplicate_rate:
+            return dict(self.rng.choice(self._recent))
+
+        if not self.tokens or self.rng.random() < self.launch_rate:
+            token = self._launch()
+            creator = self.zipf_wallet()
+            self.count += 1
+            frame = {"signature": b58encode(hashlib.sha256(f"create:{self.seed}:{self.count}".encode()).digest() * 2),
+                     "mint": token["mint"], "traderPublicKey": creator, "txType": "create",
+                     "name": token["name"], "symbol": token["symbol"], "pool": "pump",
+                     "timestamp": self.timestamp}
+        elif self._burst:
+            token, left = self._burst[-1]
+            if left <= 1:
+                self._burst.pop()
+            else:
+                self._burst[-1] = (token, left - 1)
+            frame = self._buy(self.zipf_wallet(), token)
+        else:
+            frame = self._trade()
+
+        self._recent.append(frame)
+        if len(self._recent) > 1000:
+            del self._recent[:500]
+        return frame
+
+
+def generate(events: int, seed: int = 42, **kwargs) -> Iterator[Dict]:
+    """First `events` frames of the stream for this seed"""
+    kwargs.setdefault("wallets", wallet_count(events))
+    return itertools.islice(WorkloadGenerator(seed=seed, **kwargs), events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic pump.fun event stream as JSONL")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="output path (.gz to compress)")
+    args = parser.parse_args()
+
+    opener = gzip.open if args.out.endswith(".gz") else open
+    with opener(args.out, "wt") as f:
+        for frame in generate(args.events, args.seed):
+            f.write(json.dumps(frame, separators=(",", ":")) + "\n")
+    print(f"Wrote {args.events} frames to {args.out}")
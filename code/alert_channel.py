@@ -0,0 +1,134 @@
+"""
+Smart Money Tracker - Alert Channel
+Push queued alerts from the monitor to the bot over a Unix domain socket
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import logging
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ALERT_SOCKET_PATH = os.getenv("ALERT_SOCKET_PATH", "data/alerts.sock")
+
+# Seconds to wait before retrying a connection to an absent listener
+RECONNECT_DELAY = 5.0
+
+# Pushed payloads handled at once by the bot; reading pauses beyond this
+MAX_PENDING_ALERTS = 256
+
+
+class AlertPublisher:
+    """Monitor side: send alert payloads to the bot as newline-delimited JSON
+
+    publish() is thread-safe, so the batch writer can hand over alerts
+    right after its commit. Delivery is best effort: if the bot is not
+    listening, the alert_history rows written in the same transaction are
+    picked up by the bot's catch-up poll instead.
+    """
+
+    def __init__(self, path: str = ALERT_SOCKET_PATH, metrics=REGISTRY):
+        self.path = path
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._retry_at = 0.0
+        self._pushed = metrics.counter("alerts_pushed_total", "Alert payloads (one per trade) pushed to the bot")
+        self._missed = metrics.counter("alerts_push_missed_total", "Alert payloads left for the bot's catch-up poll")
+
+    def publish(self, payloads: List[Dict]):
+        """Queue payloads for sending (safe to call from any thread)"""
+        if self._loop is None or not payloads:
+            return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, payloads)
+
+    async def run(self):
+        """Drain published payloads onto the socket"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        try:
+            while True:
+                payloads = await self._queue.get()
+                await self._send(payloads)
+        finally:
+            self._loop = None
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    async def _connect(self) -> bool:
+        if self._writer is not None:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            _, self._writer = await asyncio.open_unix_connection(self.path)
+            logger.info(f"Connected to alert listener at {self.path}")
+            return True
+        except (OSError, ConnectionError) as e:
+            self._retry_at = time.monotonic() + RECONNECT_DELAY
+            logger.debug(f"Alert listener unavailable at {self.path}: {e}")
+            return False
+
+    async def _send(self, payloads: List[Dict]):
+        if not await self._connect():
+            self._missed.inc(len(payloads))
+            return
+        try:
+            data = "".join(json.dumps(p, separators=(",", ":")) + "\n" for p in payloads)
+            self._writer.write(data.encode())
+            await self._writer.drain()
+            self._pushed.inc(len(payloads))
+        except (OSError, ConnectionError) as e:
+            logger.warning(f"Lost alert listener connection: {e}")
+            self._writer.close()
+            self._writer = None
+            self._missed.inc(len(payloads))
+
+
+async def serve_alerts(handler: Callable[[Dict], Awaitable[None]],
+                       path: str = ALERT_SOCKET_PATH,
+                       max_pending: int = MAX_PENDING_ALERTS) -> asyncio.AbstractServer:
+    """Bot side: listen on the socket and call handler for every payload
+
+    At most max_pending handlers run at once; handler errors are logged.
+    """
+    tasks: Set[asyncio.Task] = set()
+    slots = asyncio.Semaphore(max_pending)
+
+    async def run(payload: Dict):
+        try:
+            await handler(payload)
+        except Exception as e:
+            logger.error(f"Error handling pushed alert: {e}")
+        finally:
+            slots.release()
+
+    async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Dropping malformed alert payload")
+                    continue
+                await slots.acquire()
+                task = asyncio.create_task(run(payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle_client, path)
+    logger.info(f"Listening for pushed alerts on {path}")
+    return server
@@ -0,0 +1,82 @@
+"""
+Smart Money Tracker - Alert Subscription Index
+In-memory map from wallet address to its active alert configs
+"""
+
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AlertConfig:
+    """One active subscription to a wallet's buys"""
+
+    __slots__ = ('id', 'alert_type', 'destination', 'min_performance_score', 'min_buy_amount_sol')
+
+    def __init__(self, id: int, alert_type: str, destination: str,
+                 min_performance_score: float, min_buy_amount_sol: float):
+        self.id = id
+        self.alert_type = alert_type
+        self.destination = destination
+        self.min_performance_score = min_performance_score
+        self.min_buy_amount_sol = min_buy_amount_sol
+
+
+class AlertIndex:
+    """Active alert configs by wallet, reloaded when alert_configs changes
+
+    Triggers on alert_configs bump the single-row alert_config_version
+    table, so refresh() is one primary-key read when nothing changed. The
+    tracker calls it at the start of every write batch, which bounds how
+    long a new /track or /untrack can go unnoticed to one flush interval.
+    """
+
+    def __init__(self):
+        self._by_wallet: Dict[str, Tuple[AlertConfig, ...]] = {}
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return sum(len(configs) for configs in self._by_wallet.values())
+
+    def __contains__(self, wallet: str) -> bool:
+        return wallet in self._by_wallet
+
+    def wallets(self) -> List[str]:
+        return list(self._by_wallet)
+
+    def get(self, wallet: str) -> Tuple[AlertConfig, ...]:
+        """Active configs for a wallet (empty for untracked wallets)"""
+        return self._by_wallet.get(wallet, ())
+
+    def load(self, cursor):
+        """Reload every active alert config"""
+        cursor.execute("SELECT version FROM alert_config_version WHERE id = 1")
+        row = cursor.fetchone()
+        version = row[0] if row else 0
+
+        cursor.execute("""
+            SELECT id, wallet_address, alert_type, alert_destination,
+                   min_performance_score, min_buy_amount_sol
+            FROM alert_configs
+            WHERE is_active = 1
+        """)
+        by_wallet: Dict[str, list] = {}
+        for config_id, wallet, alert_type, destination, min_score, min_buy in cursor.fetchall():
+            by_wallet.setdefault(wallet, []).append(
+                AlertConfig(config_id, alert_type, destination, min_score, min_buy))
+
+        self._by_wallet = {wallet: tuple(configs) for wallet, configs in by_wallet.items()}
+        if self.version is not None and version != self.version:
+            logger.info(f"Alert configs changed (v{self.version} -> v{version}), "
+                        f"{len(self)} active for {len(self._by_wallet)} wallets")
+        self.version = version
+
+    def refresh(self, cursor) -> bool:
+        """Reload if alert_configs changed since the last load"""
+        cursor.execute("SELECT version FROM alert_config_version WHERE id = 1")
+        row = cursor.fetchone()
+        if self.version is not None and row and row[0] == self.version:
+            return False
+        self.load(cursor)
+        return True
@@ -0,0 +1,113 @@
+"""
+Smart Money Tracker - Alert Latency Report
+Per-stage percentiles of how stale alerts were, from alert_history
+
+Usage: python code/alert_latency.py [--since 24h] [--until 1h] [--db data/smart_money_tracker.db] [--json]
+       (STORAGE_URL or --storage selects a PostgreSQL database instead)
+
+Every alert row carries the on-chain trade time (event_at), when the
+monitor received the frame (received_at), queued the alert (queued_at),
+when the bot picked it up (dequeued_at) and when Telegram acknowledged it
+(acked_at). The report reads a queued_at range from the covering index
+idx_alert_history_latency, so it never touches the table itself (on
+PostgreSQL, once the visibility map is current).
+
+Trade timestamps only have whole-second resolution, so the feed and total
+stages carry up to a second of error.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Dict, List, Optional, Sequence
+
+from db import DEFAULT_DB_PATH, DEFAULT_SHARDS
+from metrics import percentile
+from storage import LATENCY_COLUMNS, STORAGE_URL, Storage, get_storage
+
+# (stage, from column, to column)
+STAGES = (
+    ("feed", "event_at", "received_at"),         # on-chain trade to monitor receive
+    ("ingest", "received_at", "queued_at"),      # receive to alert queued in the batch
+    ("push", "queued_at", "dequeued_at"),        # queued to bot pickup (push or catch-up)
+    ("send", "dequeued_at", "acked_at"),         # pickup to Telegram acknowledgement
+    ("total", "event_at", "acked_at"),
+)
+COLUMNS = LATENCY_COLUMNS
+PERCENTILES = (50, 95, 99)
+
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """Epoch seconds from either an epoch timestamp or an age like 90m / 24h / 7d"""
+    match = DURATION_PATTERN.match(value.strip())
+    if match is None:
+        return float(value)
+    now = time.time() if now is None else now
+    return now - float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+async def latency_report(storage: Storage, since: float, until: Optional[float] = None) -> Dict:
+    """Per-stage count, p50/p95/p99 and max (milliseconds) of alerts queued in [since, until)"""
+    until = time.time() if until is None else until
+    return summarize(await storage.alert_latency_rows(since, until), since, until)
+
+
+def summarize(rows: Sequence[tuple], since: float, until: float) -> Dict:
+    """latency_report() from already fetched COLUMNS rows"""
+    stages = {}
+    for stage, start, end in STAGES:
+        i, j = COLUMNS.index(start), COLUMNS.index(end)
+        samples: List[float] = sorted(
+            row[j] - row[i] for row in rows if row[i] is not None and row[j] is not None)
+        summary = {"count": len(samples)}
+        for q in PERCENTILES:
+            summary[f"p{q}"] = round(percentile(samples, q) * 1000, 1)
+        summary["max"] = round(samples[-1] * 1000, 1) if samples else 0.0
+        stages[stage] = summary
+
+    return {
+        "since": since,
+        "until": until,
+        "alerts": len(rows),
+        "acknowledged": stages["send"]["count"],
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict):
+    print(f"Alerts queued {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(report['since']))} to "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(report['until']))}: "
+          f"{report['alerts']} ({report['acknowledged']} acknowledged)")
+    print(f"  {'stage':<8}{'count':>8}" + "".join(f"{f'p{q} ms':>12}" for q in PERCENTILES) + f"{'max ms':>12}")
+    for stage, summary in report["stages"].items():
+        print(f"  {stage:<8}{summary['count']:>8}"
+              + "".join(f"{summary[f'p{q}']:>12.1f}" for q in PERCENTILES)
+              + f"{summary['max']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert latency percentiles per pipeline stage")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database to report on")
+    parser.add_argument("--storage", default=STORAGE_URL,
+                        help="storage URL, e.g. postgresql://... (default: STORAGE_URL, else --db)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS,
+                        help="ingest shards the database is split into (default: INGEST_SHARDS)")
+    parser.add_argument("--since", default="24h",
+                        help="window start: epoch seconds or an age such as 30m, 24h, 7d (default: 24h)")
+    parser.add_argument("--until", default=None, help="window end, same forms (default: now)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    now = time.time()
+    storage = get_storage(args.storage, args.db, args.shards)
+    report = asyncio.run(latency_report(storage, parse_time(args.since, now),
+                                        parse_time(args.until, now) if args.until else now))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,215 @@
+"""
+Smart Money Tracker - Alert Sender
+Concurrent Telegram sender that respects the Bot API rate limits
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+import logging
+
+from telegram.error import RetryAfter
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Telegram Bot API limits: ~30 messages/s overall, 1 message/s per chat
+GLOBAL_RATE = 30.0
+PER_CHAT_RATE = 1.0
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/s up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token can be taken (0 if one is available now)"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        return max(wait, self.paused_until - now, 0.0)
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds` (e.g. after a 429)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Wait for and take one token"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = self.delay()
+                if wait <= 0:
+                    self.take()
+                    return
+                await asyncio.sleep(wait)
+
+
+class _Job:
+    __slots__ = ('kwargs', 'future', 'attempts')
+
+    def __init__(self, kwargs: Dict, future: asyncio.Future):
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+
+
+class _Chat:
+    __slots__ = ('bucket', 'pending', 'scheduled')
+
+    def __init__(self, rate: float):
+        self.bucket = TokenBucket(rate)
+        self.pending: Deque[_Job] = deque()
+        # True while the chat is waiting in (or being served from) the ready queue
+        self.scheduled = False
+
+
+class AlertSender:
+    """Pool of workers sending messages concurrently under rate limits
+
+    Each chat has its own bucket and at most one message in flight, so one
+    slow or flood-limited chat never holds up the others. A worker takes
+    the next chat whose bucket has a token, then waits on the global
+    bucket before calling send_func. A 429 (RetryAfter) pauses only that
+    chat's bucket and puts the message back at the front of its queue.
+    """
+
+    def __init__(self, send_func: Callable[..., Awaitable], global_rate: float = GLOBAL_RATE,
+                 per_chat_rate: float = PER_CHAT_RATE, workers: int = 8, max_retries: int = 3,
+                 metrics=REGISTRY):
+        self.send_func = send_func
+        self.per_chat_rate = per_chat_rate
+        self.workers = workers
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate)
+        self._chats: Dict[str, _Chat] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self._sent = metrics.counter("telegram_messages_sent_total", "Messages accepted by Telegram")
+        self._failed = metrics.counter("telegram_messages_failed_total", "Messages dropped after errors")
+        self._limited = metrics.counter("telegram_rate_limited_total", "429 responses from Telegram")
+        self._queued = metrics.gauge("telegram_messages_queued", "Messages waiting for a rate slot")
+        self._latency = metrics.latency("telegram_send_seconds", "Submit to Telegram response")
+
+    def start(self):
+        """Start the worker tasks (called on first send if not done earlier)"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def send(self, chat_id: str, **kwargs) -> bool:
+        """Queue one message and wait until it is sent (True) or given up (False)"""
+        self.start()
+        chat_id = str(chat_id)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(self.per_chat_rate)
+
+        job = _Job(kwargs, asyncio.get_running_loop().create_future())
+        chat.pending.append(job)
+        self._queued.set(self._queued.value + 1)
+        self._schedule(chat_id, chat)
+
+        started = time.monotonic()
+        sent = await job.future
+        if sent:
+            self._latency.observe(time.monotonic() - started)
+        return sent
+
+    def _schedule(self, chat_id: str, chat: _Chat):
+        """Put the chat on the ready queue once its bucket has a token"""
+        if chat.scheduled:
+            return
+        if not chat.pending:
+            # Forget idle chats once their rate window has passed
+            wait = chat.bucket.delay()
+            if wait <= 0:
+                self._chats.pop(chat_id, None)
+            else:
+                asyncio.get_running_loop().call_later(wait, self._prune, chat_id)
+            return
+
+        chat.scheduled = True
+        wait = chat.bucket.delay()
+        if wait <= 0:
+            self._ready.put_nowait(chat_id)
+        else:
+            asyncio.get_running_loop().call_later(wait, self._ready.put_nowait, chat_id)
+
+    def _prune(self, chat_id: str):
+        chat = self._chats.get(chat_id)
+        if chat is not None and not chat.scheduled and not chat.pending and chat.bucket.delay() <= 0:
+            del self._chats[chat_id]
+
+    def _finish(self, job: _Job, sent: bool):
+        self._queued.set(self._queued.value - 1)
+        if not job.future.done():
+            job.future.set_result(sent)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            chat = self._chats[chat_id]
+            job = chat.pending.popleft()
+            try:
+                if job.future.done():  # caller went away
+                    self._finish(job, False)
+                    continue
+
+                # The chat's token was available when it was scheduled
+                await self._global.acquire()
+                chat.bucket.take()
+                job.attempts += 1
+                try:
+                    await self.send_func(chat_id=chat_id, **job.kwargs)
+                except RetryAfter as e:
+                    retry_after = e.retry_after
+                    if isinstance(retry_after, timedelta):
+                        retry_after = retry_after.total_seconds()
+                    self._limited.inc()
+                    chat.bucket.pause(retry_after)
+                    if job.attempts <= self.max_retries:
+                        logger.warning(f"Rate limited on chat {chat_id}, retrying in {retry_after}s")
+                        chat.pending.appendleft(job)
+                    else:
+                        logger.error(f"Giving up on message to {chat_id} after {job.attempts} attempts")
+                        self._failed.inc()
+                        self._finish(job, False)
+                except Exception as e:
+                    logger.error(f"Failed to send message to {chat_id}: {e}")
+                    self._failed.inc()
+                    self._finish(job, False)
+                else:
+                    self._sent.inc()
+                    self._finish(job, True)
+            finally:
+                chat.scheduled = False
+                self._schedule(chat_id, chat)
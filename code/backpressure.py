@@ -0,0 +1,240 @@
+"""
+Smart Money Tracker - Ingest Backpressure
+What the reader does when the batch writer falls behind
+
+Policies for putting events on the bounded ingest queue:
+
+- block: wait for room (the reader, and so the WebSocket, slows down)
+- shed:  once the queue passes a high watermark, drop low-value events:
+         small buys from wallets nobody subscribes to and whose score is
+         below a threshold. Everything else still waits for room.
+- spill: when the queue is full, append events to a local journal and
+         feed them back in order as the writer catches up. While the
+         journal holds anything, new events go behind it so per-wallet
+         order is kept.
+
+No policy ever drops an event that could trigger an alert. Only buys raise
+alerts, and buys from subscribed wallets are never shed.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, List, Optional, Set, Tuple
+import logging
+
+from events import TradeEvent
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("block", "shed", "spill")
+
+
+class SpillJournal:
+    """Append-only JSONL file of overflowed events, read back in order
+
+    Lines are [received (epoch seconds), tx_type, wallet, token, name,
+    symbol, sol_amount, token_amount, signature, timestamp_ms]. Every
+    append is flushed to the OS (and fsynced with sync=True). Reading only
+    moves an offset; the owner calls truncate() once the writer has
+    committed everything read, so a crash replays events rather than
+    losing them (the signature index drops any already stored).
+
+    Events left by a previous run are replayed on start. A torn last line,
+    as a crash mid-write leaves it, is cut off; lines that fail to parse
+    are skipped and counted.
+    """
+
+    def __init__(self, path: str, sync: bool = False, metrics=REGISTRY):
+        self.path = path
+        self.sync = sync
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        self.pending = 0
+        complete = 0
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break
+            self.pending += 1
+            complete += len(line)
+        if complete < self._file.tell():
+            logger.warning(f"Spill journal {path}: dropping a torn last line")
+            self._file.truncate(complete)
+        self._read_offset = 0
+        # Lines handed out by read() since the file was last emptied
+        self.read_total = 0
+        self._skipped = metrics.counter("ingest_spill_lines_skipped_total", "Unreadable spill journal lines skipped")
+        if self.pending:
+            logger.info(f"Spill journal {path} holds {self.pending} events from a previous run")
+
+    def __len__(self) -> int:
+        return self.pending
+
+    def append(self, received: float, event: TradeEvent):
+        row = [received, event.tx_type, event.wallet, event.token, event.name, event.symbol,
+               event.sol_amount, event.token_amount, event.signature, event.timestamp_ms]
+        self._file.write(json.dumps(row, separators=(",", ":")).encode() + b"\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.pending += 1
+
+    def read(self, limit: int) -> List[Tuple[float, TradeEvent]]:
+        """Next `limit` events (oldest first) as (received epoch seconds, event)"""
+        self._file.seek(self._read_offset)
+        items = []
+        while len(items) < limit and self.pending:
+            line = self._file.readline()
+            if not line:
+                break
+            self.pending -= 1
+            self.read_total += 1
+            try:
+                row = json.loads(line)
+                items.append((row[0], TradeEvent(*row[1:])))
+            except (ValueError, TypeError, IndexError) as e:
+                logger.warning(f"Skipping unreadable spill journal line: {e}")
+                self._skipped.inc()
+        self._read_offset = self._file.tell()
+        return items
+
+    def truncate(self):
+        """Empty the file; only call once everything read is committed"""
+        if self.pending:
+            raise RuntimeError("spill journal still holds unread events")
+        self._file.truncate(0)
+        self._read_offset = 0
+        self.read_total = 0
+
+    def close(self):
+        self._file.close()
+
+
+class Backpressure:
+    """Admission to the ingest queue under one of POLICIES"""
+
+    def __init__(self, policy: str = "block", shed_watermark: float = 0.8,
+                 shed_max_sol: float = 0.5, shed_max_score: float = 50.0,
+                 spill_path: Optional[str] = None, spill_sync: bool = False, refresh_interval: float = 30,
+                 is_subscribed: Callable[[str], bool] = lambda wallet: False,
+                 load_notable: Callable[[float], Set[str]] = lambda score: set(),
+                 metrics=REGISTRY):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown backpressure policy {policy!r} (expected one of {POLICIES})")
+        self.policy = policy
+        self.shed_watermark = shed_watermark
+        self.shed_max_sol = shed_max_sol
+        self.shed_max_score = shed_max_score
+        self.refresh_interval = refresh_interval
+        self.is_subscribed = is_subscribed
+        self.load_notable = load_notable
+
+        # Wallets scoring at or above shed_max_score (refreshed periodically)
+        self._notable: Set[str] = set()
+        self.journal: Optional[SpillJournal] = None
+        if policy == "spill":
+            if spill_path is None:
+                raise ValueError("spill policy needs a spill_path")
+            self.journal = SpillJournal(spill_path, sync=spill_sync, metrics=metrics)
+
+        self._blocked = metrics.counter("ingest_backpressure_blocked_total", "Puts that waited for queue room")
+        self._shed_low_value = metrics.counter(
+            "ingest_shed_low_value_buy_total", "Small buys from unsubscribed low-score wallets dropped")
+        self._spilled_full = metrics.counter(
+            "ingest_spilled_queue_full_total", "Events spilled to the journal because the queue was full")
+        self._spilled_behind = metrics.counter(
+            "ingest_spilled_behind_journal_total", "Events spilled to keep order behind the journal")
+        self._unspilled = metrics.counter("ingest_unspilled_total", "Journal events fed back to the queue")
+        self._journal_pending = metrics.gauge("ingest_spill_pending", "Events waiting in the spill journal")
+
+    def sheddable(self, event: TradeEvent) -> bool:
+        """Lowest-value events: small buys nobody can be alerted on"""
+        return (event.tx_type == "buy"
+                and event.sol_amount < self.shed_max_sol
+                and not self.is_subscribed(event.wallet)
+                and event.wallet not in self._notable)
+
+    async def put(self, queue: asyncio.Queue, item: Tuple[float, TradeEvent]):
+        """Admit one (received perf_counter, event) item"""
+        if self.policy == "shed":
+            if queue.maxsize and queue.qsize() >= queue.maxsize * self.shed_watermark \
+                    and self.sheddable(item[1]):
+                self._shed_low_value.inc()
+                return
+        elif self.policy == "spill":
+            if self.journal.pending:
+                self._spill(item, self._spilled_behind)
+                return
+            if queue.full():
+                self._spill(item, self._spilled_full)
+                return
+
+        if queue.full():
+            self._blocked.inc()
+        await queue.put(item)
+
+    def _spill(self, item: Tuple[float, TradeEvent], reason):
+        received, event = item
+        # Stored as wall time so the latency survives a restart
+        self.journal.append(time.time() - (time.perf_counter() - received), event)
+        reason.inc()
+        self._journal_pending.set(self.journal.pending)
+
+    async def _unspill(self, queue: asyncio.Queue, resume_below: float = 0.5):
+        """Feed journal events back once the queue has drained below half
+
+        The file is emptied once it has been read to the end and the writer
+        has committed every queued item (queue.join()) with nothing read
+        from the journal in between.
+        """
+        journal = self.journal
+        settled: Optional[asyncio.Future] = None
+        settled_at = 0
+        try:
+            while True:
+                room = int(queue.maxsize * resume_below) - queue.qsize() if queue.maxsize else 1000
+                if journal.pending and room > 0:
+                    now_wall, now_perf = time.time(), time.perf_counter()
+                    for received, event in journal.read(room):
+                        queue.put_nowait((now_perf - (now_wall - received), event))
+                        self._unspilled.inc()
+                    self._journal_pending.set(journal.pending)
+
+                if not journal.pending and journal.read_total:
+                    if settled is None or settled_at != journal.read_total:
+                        if settled is not None:
+                            settled.cancel()
+                        settled = asyncio.ensure_future(queue.join())
+                        settled_at = journal.read_total
+                    elif settled.done():
+                        settled = None
+                        journal.truncate()
+                await asyncio.sleep(0.01)
+        finally:
+            if settled is not None:
+                settled.cancel()
+
+    async def _refresh_notable(self):
+        while True:
+            try:
+                self._notable = await asyncio.to_thread(self.load_notable, self.shed_max_score)
+            except Exception as e:
+                logger.error(f"Error loading wallet scores for load shedding: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def run(self, queue: asyncio.Queue):
+        """Background work for the active policy"""
+        if self.policy == "shed":
+            await self._refresh_notable()
+        elif self.policy == "spill":
+            await self._unspill(queue)
+
+    async def drain(self):
+        """Wait until every spilled event is read back and the journal emptied"""
+        while self.journal is not None and (self.journal.pending or self.journal.read_total):
+            await asyncio.sleep(0.01)
@@ -0,0 +1,129 @@
+"""
+Smart Money Tracker - Shared Test Fixtures
+The storage backend fixture and the synthetic trade stream the tests replay
+
+PostgreSQL runs when TEST_POSTGRES_DSN points at a server the tests may
+create and drop schemas on, e.g.
+    TEST_POSTGRES_DSN=postgresql://postgres@localhost/postgres pytest code
+"""
+
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+
+import pytest
+
+from smart_money_monitor import SmartMoneyTracker
+from storage import SQLiteStorage
+
+POSTGRES_DSN = os.getenv("TEST_POSTGRES_DSN")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "conformance.db"))
+        yield storage
+        storage.close()
+        return
+
+    if not POSTGRES_DSN:
+        pytest.skip("TEST_POSTGRES_DSN not set")
+    asyncpg = pytest.importorskip("asyncpg")
+    from storage_postgres import PostgresStorage
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+
+    async def admin(sql: str):
+        conn = await asyncpg.connect(POSTGRES_DSN)
+        try:
+            await conn.execute(sql)
+        finally:
+            await conn.close()
+
+    asyncio.run(admin(f"CREATE SCHEMA {schema}"))
+    storage = PostgresStorage(POSTGRES_DSN, schema=schema)
+    try:
+        yield storage
+    finally:
+        storage.close()
+        asyncio.run(admin(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def make_tracker(storage, tmp_path) -> SmartMoneyTracker:
+    return SmartMoneyTracker(db_path=str(tmp_path / "tracker.db"), storage=storage)
+
+
+def count(storage, sql: str, params=()) -> int:
+    with storage.read() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def make_events(seed: int = 7, count: int = 3000):
+    """Buys and 1-3 way partial sells across a few wallets and tokens"""
+    rng = random.Random(seed)
+    wallets = [f"Wallet{i:038d}" for i in range(8)]
+    tokens = [f"Mint{i:040d}" for i in range(5)]
+    held = defaultdict(float)
+    start = int(time.time()) - 3600
+    events = []
+
+    for i in range(count):
+        wallet, token = rng.choice(wallets), rng.choice(tokens)
+        key = (wallet, token)
+        if held[key] > 0 and rng.random() < 0.55:
+            # Scale out: sell a fraction, sometimes more than is held
+            amount = held[key] * rng.choice([0.1, 0.25, 0.5, 1.0, 1.3])
+            held[key] = max(held[key] - amount, 0)
+            action = 'sell'
+        else:
+            amount = rng.uniform(1e5, 5e6)
+            held[key] += amount
+            action = 'buy'
+
+        events.append({
+            'txType': action,
+            'traderPublicKey': wallet,
+            'mint': token,
+            'solAmount': rng.uniform(0.05, 3.0),
+            'tokenAmount': amount,
+            'signature': f"sig{seed}-{i}",
+            'timestamp': (start + i) * 1000,
+            'symbol': 'TEST',
+        })
+    return events
+
+
+def reference_pnl(events):
+    """Brute-force FIFO matching: rescan every lot list on every sell
+
+    Returns realized PnL per wallet and the token amount still open.
+    """
+    lots = defaultdict(list)
+    pnl = defaultdict(float)
+
+    for e in events:
+        key = (e['traderPublicKey'], e['mint'])
+        if e['txType'] == 'buy':
+            lots[key].append([e['tokenAmount'], e['solAmount']])
+            continue
+
+        remaining = e['tokenAmount']
+        for lot in lots[key]:
+            if remaining <= 0:
+                break
+            if lot[0] <= 0:
+                continue
+            take = min(remaining, lot[0])
+            entry_sol = lot[1] * take / lot[0]
+            exit_sol = e['solAmount'] * take / e['tokenAmount']
+            pnl[e['traderPublicKey']] += exit_sol - entry_sol
+            lot[0] -= take
+            lot[1] -= entry_sol
+            remaining -= take
+
+    open_tokens = sum(lot[0] for lot_list in lots.values() for lot in lot_list)
+    return pnl, open_tokens
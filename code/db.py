@@ -0,0 +1,243 @@
+"""
+Smart Money Tracker - Database Connections
+Shared SQLite connection layer for the monitor, bot and dashboard
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("DB_PATH", "data/smart_money_tracker.db")
+DEFAULT_SHARDS = int(os.getenv("INGEST_SHARDS", "1"))
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "data" / "smart_money_tracker_schema.sql"
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 64 * 1024          # 64 MiB page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024       # 256 MiB memory-mapped I/O
+STATEMENT_CACHE = 256               # prepared statements kept per connection
+
+# Sharded mode: per-shard files hold everything keyed by wallet. IDs are
+# offset per shard so rows stay unique when the shards are read together.
+SHARDED_TABLES = ("wallets", "trades", "positions", "performance_snapshots",
+                  "alert_configs", "alert_history", "tokens", "wallet_daily", "token_daily")
+SEQUENCE_TABLES = ("trades", "positions", "performance_snapshots", "alert_configs", "alert_history")
+SHARD_ID_SPACING = 1 << 40
+MAX_SHARDS = 10                     # SQLite's default limit on attached databases
+
+# Columns added to tables after their first release: (table, column, type).
+# CREATE TABLE IF NOT EXISTS leaves older databases alone, so init_schema
+# adds any of these that are missing before running the schema script.
+ADDED_COLUMNS = (
+    ("alert_history", "event_at", "REAL"),
+    ("alert_history", "received_at", "REAL"),
+    ("alert_history", "queued_at", "REAL"),
+    ("alert_history", "dequeued_at", "REAL"),
+    ("alert_history", "acked_at", "REAL"),
+)
+
+
+class Database:
+    """One persistent writer connection plus a pool of read-only readers
+
+    The writer runs in WAL mode with synchronous=NORMAL, so commits only
+    fsync at checkpoints and readers never block it. All connections keep
+    a large prepared-statement cache, so the hot queries are parsed once
+    per process instead of once per trade.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, pool_size: int = 4):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.RLock()
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+
+    def _tune(self, conn: sqlite3.Connection):
+        """Apply per-connection pragmas"""
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+    @property
+    def writer(self) -> sqlite3.Connection:
+        """Persistent read-write connection (created on first use)"""
+        with self._write_lock:
+            if self._writer is None:
+                conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                       cached_statements=STATEMENT_CACHE)
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+                self._tune(conn)
+                self._writer = conn
+            return self._writer
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of the writer; commits on success, rolls back on error"""
+        with self._write_lock:
+            conn = self.writer
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE)
+        self._tune(conn)
+        return conn
+
+    @contextmanager
+    def write_for(self, wallet: str) -> Iterator[sqlite3.Connection]:
+        """Writer for rows owned by `wallet` (the only writer when unsharded)"""
+        with self.write() as conn:
+            yield conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled read-only connection"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                can_open = self._reader_count < self.pool_size
+                if can_open:
+                    self._reader_count += 1
+            if can_open:
+                try:
+                    conn = self._open_reader()
+                except Exception:
+                    with self._reader_lock:
+                        self._reader_count -= 1
+                    raise
+            else:
+                conn = self._readers.get()
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def init_schema(self, schema_path: Path = SCHEMA_PATH):
+        """Create tables and indexes if they don't exist"""
+        with open(schema_path, 'r') as f:
+            schema = f.read()
+        with self.write() as conn:
+            for table, column, kind in ADDED_COLUMNS:
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if columns and column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+                    logger.info(f"Added column {table}.{column}")
+            conn.executescript(schema)
+
+    def close(self):
+        """Close the writer and all idle readers"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
+
+
+def shard_for(wallet: str, shards: int) -> int:
+    """Shard that owns a wallet (stable across processes and restarts)"""
+    return zlib.crc32(wallet.encode()) % shards
+
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    """Per-shard files next to db_path: data/x.db -> data/x.shard0.db, ..."""
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{i}{ext or '.db'}" for i in range(shards)]
+
+
+class ShardedDatabase(Database):
+    """The per-shard files written by sharded ingest, read as one database
+
+    Each reader attaches every shard and shadows the sharded tables with
+    TEMP views that UNION ALL them, so existing queries run unchanged.
+    Writes must name the wallet they belong to (write_for) and go to that
+    wallet's shard.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, shards: int = 2, pool_size: int = 4):
+        if not 1 < shards <= MAX_SHARDS:
+            raise ValueError(f"shards must be between 2 and {MAX_SHARDS}, got {shards}")
+        super().__init__(db_path, pool_size)
+        self.shards = [Database(path, pool_size) for path in shard_paths(db_path, shards)]
+
+    def write(self):
+        raise RuntimeError("sharded database: use write_for(wallet) to pick the shard")
+
+    @contextmanager
+    def write_for(self, wallet: str) -> Iterator[sqlite3.Connection]:
+        with self.shards[shard_for(wallet, len(self.shards))].write() as conn:
+            yield conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        for i, shard in enumerate(self.shards):
+            uri = Path(shard.db_path).resolve().as_uri() + "?mode=ro"
+            conn.execute(f"ATTACH DATABASE ? AS s{i}", (uri,))
+            conn.execute(f"PRAGMA s{i}.cache_size = -{CACHE_SIZE_KIB // len(self.shards)}")
+            conn.execute(f"PRAGMA s{i}.mmap_size = {MMAP_SIZE}")
+        for table in SHARDED_TABLES:
+            union = " UNION ALL ".join(f"SELECT * FROM s{i}.{table}" for i in range(len(self.shards)))
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+        return conn
+
+    def init_schema(self, schema_path: Path = SCHEMA_PATH):
+        """Create every shard and offset its ID sequences"""
+        for i, shard in enumerate(self.shards):
+            shard.init_schema(schema_path)
+            with shard.write() as conn:
+                for table in SEQUENCE_TABLES:
+                    conn.execute("""
+                        INSERT INTO sqlite_sequence (name, seq)
+                        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+                    """, (table, i * SHARD_ID_SPACING, table))
+
+    def close(self):
+        super().close()
+        for shard in self.shards:
+            shard.close()
+
+
+_databases: Dict[Tuple[str, int], Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path: str = DEFAULT_DB_PATH, shards: int = 1) -> Database:
+    """Process-wide shared Database for a given path (ShardedDatabase if shards > 1)"""
+    key = (os.path.abspath(db_path), shards)
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = ShardedDatabase(db_path, shards) if shards > 1 else Database(db_path)
+            _databases[key] = db
+        return db
@@ -0,0 +1,140 @@
+"""
+Smart Money Tracker - Feed Events
+Decode pump.fun WebSocket frames into compact typed trade events
+"""
+
+import json
+import time
+from typing import Dict, Optional, Set, Union
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib decoder is used instead
+    orjson = None
+
+# Both decoders raise ValueError subclasses on bad input
+_loads = orjson.loads if orjson is not None else json.loads
+
+TRADE_TYPES = ('buy', 'sell')
+
+
+class TradeEvent:
+    """One buy or sell from the feed, with amounts already converted"""
+
+    __slots__ = ('tx_type', 'wallet', 'token', 'name', 'symbol', 'sol_amount',
+                 'token_amount', 'signature', 'timestamp_ms')
+
+    def __init__(self, tx_type: str, wallet: Optional[str], token: Optional[str],
+                 name: str, symbol: str, sol_amount: float, token_amount: float,
+                 signature: Optional[str], timestamp_ms: Optional[int]):
+        self.tx_type = tx_type
+        self.wallet = wallet
+        self.token = token
+        self.name = name
+        self.symbol = symbol
+        self.sol_amount = sol_amount
+        self.token_amount = token_amount
+        self.signature = signature
+        self.timestamp_ms = timestamp_ms
+
+    def __repr__(self) -> str:
+        return (f"TradeEvent({self.tx_type} {self.wallet} {self.token} "
+                f"{self.sol_amount} SOL / {self.token_amount} tokens)")
+
+    @classmethod
+    def from_dict(cls, event: Dict) -> Optional['TradeEvent']:
+        """Build from a decoded feed message (None for non-trade messages)"""
+        tx_type = event.get('txType')
+        if tx_type not in TRADE_TYPES:
+            return None
+        timestamp = event.get('timestamp')
+        return cls(
+            tx_type,
+            event.get('traderPublicKey'),
+            event.get('mint'),
+            event.get('name', 'Unknown'),
+            event.get('symbol', 'UNKNOWN'),
+            float(event.get('solAmount', 0)),
+            float(event.get('tokenAmount', 0)),
+            event.get('signature'),
+            int(timestamp) if timestamp is not None else None,
+        )
+
+
+def is_trade_frame(frame: Union[str, bytes]) -> bool:
+    """Cheap substring check that rejects frames which cannot be trades
+
+    Subscription acks carry no txType and token launches are "create", so
+    both are dropped without being parsed. This only ever rules frames out;
+    anything it lets through is still checked after decoding.
+    """
+    if isinstance(frame, bytes):
+        return b'"txType"' in frame and b'"txType":"create"' not in frame
+    return '"txType"' in frame and '"txType":"create"' not in frame
+
+
+def decode_trade(frame: Union[str, bytes]) -> Optional[TradeEvent]:
+    """Parse a raw frame into a TradeEvent (None for non-trades and bad JSON)"""
+    if not is_trade_frame(frame):
+        return None
+    try:
+        event = _loads(frame)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    try:
+        return TradeEvent.from_dict(event)
+    except (TypeError, ValueError):
+        return None
+
+
+def as_trade_event(event: Union[TradeEvent, Dict, None]) -> Optional[TradeEvent]:
+    """Accept either a TradeEvent or a decoded message dict"""
+    if event is None or isinstance(event, TradeEvent):
+        return event
+    try:
+        return TradeEvent.from_dict(event)
+    except (TypeError, ValueError):
+        return None
+
+
+class RecentSignatures:
+    """Transaction signatures seen in roughly the last `ttl` seconds
+
+    Two sets rotate every ttl/2 seconds (or when the newer one holds half
+    of max_size), so a signature is remembered for between ttl/2 and ttl
+    seconds and memory stays bounded. Used to drop frames the feed sends
+    twice - after a reconnect, or on overlapping account and token
+    subscriptions - before they cost any database work.
+    """
+
+    def __init__(self, ttl: float = 600, max_size: int = 1_000_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._current: Set[str] = set()
+        self._previous: Set[str] = set()
+        self._rotated_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def __contains__(self, signature: str) -> bool:
+        return signature in self._current or signature in self._previous
+
+    def add(self, signature: str) -> bool:
+        """Remember a signature; False if it was already seen recently"""
+        now = time.monotonic()
+        if now - self._rotated_at >= self.ttl / 2 or len(self._current) >= self.max_size // 2:
+            self._previous = self._current
+            self._current = set()
+            self._rotated_at = now
+        if signature in self._current or signature in self._previous:
+            return False
+        self._current.add(signature)
+        return True
+
+    def discard(self, signature: str):
+        """Forget a signature whose write was rolled back, so a resend is applied"""
+        self._current.discard(signature)
+        self._previous.discard(signature)
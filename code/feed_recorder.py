@@ -0,0 +1,217 @@
+"""
+Smart Money Tracker - Feed Recorder
+Capture raw WebSocket frames to rotating, compressed, indexed segment files
+
+Each segment is a gzip file made of independent members ("blocks") of up
+to `index_every` newline-delimited envelopes {"t": <receive time>, "f":
+"<raw frame>"}. Because every block is a complete gzip member, reading can
+start at any block offset. The sidecar index records the byte offset and
+first timestamp of each block plus the segment's first/last timestamps:
+
+    feed-20240101-120000.jsonl.gz
+    feed-20240101-120000.idx.json
+"""
+
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx.json"
+
+
+class FeedRecorder:
+    """Append frames from the event loop; compress and write them on a thread
+
+    record() only timestamps the frame and puts it on a bounded queue, so
+    recording never adds receive latency. If the writer thread falls behind
+    and the queue fills, frames are dropped and counted rather than
+    blocking the reader.
+    """
+
+    def __init__(self, directory: str, segment_seconds: float = 3600,
+                 segment_bytes: int = 256 * 1024 * 1024, index_every: int = 1000,
+                 flush_interval: float = 5.0, queue_size: int = 100000, metrics=REGISTRY):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple[float, str]]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+        # Writer-thread state for the open segment
+        self._file = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._index: Optional[Dict] = None
+        self._block: List[bytes] = []
+        self._block_first_t: Optional[float] = None
+
+        self._recorded = metrics.counter("feed_frames_recorded_total", "Raw frames written to segments")
+        self._dropped = metrics.counter("feed_frames_dropped_total", "Raw frames dropped (recorder backlog)")
+        self._segments = metrics.counter("feed_segments_written_total", "Feed segments closed")
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="feed-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Recording raw feed to {self.directory}")
+
+    def record(self, frame, received: Optional[float] = None):
+        """Queue one raw frame (non-blocking; safe to call from the event loop)"""
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf-8", errors="replace")
+        try:
+            self._queue.put_nowait((time.time() if received is None else received, frame))
+        except queue.Full:
+            self._dropped.inc()
+
+    def close(self):
+        """Flush queued frames and close the current segment"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Quiet feed: make what we have durable
+                self._flush_block()
+                continue
+
+            if item is None:
+                self._close_segment()
+                return
+
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Feed recorder write failed: {e}")
+                self._dropped.inc()
+
+    def _write(self, received: float, frame: str):
+        if self._file is not None and (
+                received - self._opened_at >= self.segment_seconds
+                or self._file.tell() >= self.segment_bytes):
+            self._close_segment()
+        if self._file is None:
+            self._open_segment(received)
+
+        if not self._block:
+            self._block_first_t = received
+        self._block.append(json.dumps({"t": received, "f": frame}, separators=(",", ":")).encode() + b"\n")
+        if self._index["first_t"] is None:
+            self._index["first_t"] = received
+        self._index["last_t"] = received
+        self._index["frames"] += 1
+        self._recorded.inc()
+
+        if len(self._block) >= self.index_every:
+            self._flush_block()
+
+    def _open_segment(self, received: float):
+        stamp = datetime.fromtimestamp(received, tz=timezone.utc).strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.directory, f"feed-{stamp}")
+        suffix = 0
+        while os.path.exists(base + SEGMENT_SUFFIX):
+            suffix += 1
+            base = os.path.join(self.directory, f"feed-{stamp}-{suffix}")
+        self._path = base + SEGMENT_SUFFIX
+        self._file = open(self._path, "wb")
+        self._opened_at = received
+        self._index = {"segment": os.path.basename(self._path), "first_t": None, "last_t": None,
+                       "frames": 0, "blocks": []}
+
+    def _flush_block(self):
+        """Write the pending frames as one gzip member and index its offset"""
+        if not self._block:
+            return
+        self._index["blocks"].append({
+            "offset": self._file.tell(),
+            "first_t": self._block_first_t,
+            "frame": self._index["frames"] - len(self._block),
+        })
+        self._file.write(gzip.compress(b"".join(self._block), compresslevel=6))
+        self._file.flush()
+        self._block = []
+        self._write_index()
+
+    def _write_index(self):
+        index_path = self._path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, separators=(",", ":"))
+        os.replace(tmp_path, index_path)
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._flush_block()
+        self._file.close()
+        self._segments.inc()
+        logger.info(f"Closed feed segment {self._path} ({self._index['frames']} frames)")
+        self._file = None
+        self._index = None
+
+
+def load_indexes(directory: str) -> List[Dict]:
+    """Sidecar indexes of every segment in a directory, oldest first"""
+    indexes = []
+    for index_path in glob.glob(os.path.join(directory, "feed-*" + INDEX_SUFFIX)):
+        with open(index_path) as f:
+            index = json.load(f)
+        index["path"] = os.path.join(directory, index["segment"])
+        indexes.append(index)
+    return sorted(indexes, key=lambda index: (index["first_t"] or 0, index["segment"]))
+
+
+def read_range(directory: str, start: Optional[float] = None,
+               end: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+    """Yield (receive time, raw frame) recorded in [start, end]
+
+    Segments outside the range are skipped from their index alone, and
+    within a segment reading starts at the last block that begins at or
+    before `start`, so only the blocks covering the range are decompressed.
+    """
+    for index in load_indexes(directory):
+        if index["first_t"] is None:
+            continue
+        if start is not None and index["last_t"] < start:
+            continue
+        if end is not None and index["first_t"] > end:
+            break
+
+        offset = 0
+        if start is not None:
+            for block in index["blocks"]:
+                if block["first_t"] > start:
+                    break
+                offset = block["offset"]
+
+        with open(index["path"], "rb") as raw:
+            raw.seek(offset)
+            with gzip.GzipFile(fileobj=raw) as f:
+                for line in f:
+                    envelope = json.loads(line)
+                    t = envelope["t"]
+                    if start is not None and t < start:
+                        continue
+                    if end is not None and t > end:
+                        return
+                    yield t, envelope["f"]
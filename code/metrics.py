@@ -0,0 +1,186 @@
+"""
+Smart Money Tracker - Runtime Metrics
+Lightweight in-process counters, gauges and latency histograms
+
+Every process keeps its metrics in REGISTRY. render_prometheus() formats
+them in the Prometheus text exposition format, served at /metrics by the
+dashboard and by serve_metrics() in the monitor and bot.
+"""
+
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds (seconds): 100us to 1 minute
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """q-th percentile (0-100) of already sorted samples (0.0 if empty)"""
+    if not samples:
+        return 0.0
+    index = min(int(round(q / 100 * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    """Point-in-time value that can go up and down"""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class LatencyTracker:
+    """Count, sum, max and bucket histogram of observed durations (seconds)
+
+    The most recent samples are also kept so percentiles can be read off
+    a sliding window. Observing is a bisect and a few increments, cheap
+    enough for every event on the hot path.
+    """
+
+    def __init__(self, name: str, help: str = "", window: int = 1024,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent = deque(maxlen=window)
+        self.buckets = tuple(buckets)
+        # Per-bucket (not cumulative) counts; the extra slot is +Inf
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.recent.append(seconds)
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """q-th percentile (0-100) of the recent samples"""
+        return percentile(sorted(self.recent), q)
+
+
+class MetricsRegistry:
+    """Named collection of metrics shared by a process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def latency(self, name: str, help: str = "", window: int = 1024,
+                buckets: Sequence[float] = DEFAULT_BUCKETS) -> LatencyTracker:
+        return self._get_or_create(LatencyTracker, name, help, window=window, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Flatten all metrics into a name -> value dict"""
+        out = {}
+        for name, metric in list(self._metrics.items()):
+            if isinstance(metric, LatencyTracker):
+                out[f"{name}_count"] = metric.count
+                out[f"{name}_mean"] = metric.mean
+                out[f"{name}_max"] = metric.max
+                out[f"{name}_p50"] = metric.percentile(50)
+            else:
+                out[name] = metric.value
+        return out
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            if isinstance(metric, LatencyTracker):
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(metric.buckets, metric.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+                lines.append(f"{name}_sum {metric.total:.9g}")
+                lines.append(f"{name}_count {metric.count}")
+            else:
+                kind = "counter" if isinstance(metric, Counter) else "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {metric.value:.9g}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default registry
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def serve_metrics(port: int, host: str = "127.0.0.1",
+                        registry: MetricsRegistry = REGISTRY) -> asyncio.AbstractServer:
+    """Minimal HTTP listener answering GET /metrics on the running loop"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            # Skip the headers; no request body is expected
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", registry.render_prometheus().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
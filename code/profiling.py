@@ -0,0 +1,195 @@
+"""
+Smart Money Tracker - Profiling Hooks
+On-demand CPU profiles and event-loop stall reports for a running process
+
+    kill -USR1 <pid>   sample every thread for PROFILE_SECONDS and write a
+                       folded-stack profile to PROFILE_DIR
+    kill -USR2 <pid>   toggle the event-loop lag monitor
+
+Profiles use the folded format (one "thread;outer;...;inner count" line
+per distinct stack) read by flamegraph.pl, speedscope and inferno. The
+lag monitor logs the event loop thread's stack whenever a callback holds
+the loop longer than LOOP_LAG_MS, and records the lag as the
+event_loop_lag_seconds histogram. Setting LOOP_LAG_MS starts it on.
+
+Nothing runs until a signal arrives: no sampler thread, no heartbeat.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+import logging
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_INTERVAL = 0.005            # seconds between stack samples
+DEFAULT_LAG_MS = 100
+
+
+def folded_stack(frame, thread_name: str) -> str:
+    """One stack as "thread;outermost;...;innermost" """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples every thread's stack on a background thread for a fixed time"""
+
+    def __init__(self, directory: str = PROFILE_DIR, interval: float = PROFILE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, label: str) -> Optional[str]:
+        """Begin a profile; returns the path it will be written to (None if one is running)"""
+        if self.running:
+            logger.warning("A profile is already being captured")
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory,
+                            f"{label}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        self._thread = threading.Thread(target=self._sample, args=(seconds, path),
+                                        name="profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Profiling for {seconds:.0f}s into {path}")
+        return path
+
+    def _sample(self, seconds: float, path: str):
+        stacks: Counter = Counter()
+        me = threading.get_ident()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[folded_stack(frame, names.get(ident, str(ident)))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profile written to {path} ({samples} samples, {len(stacks)} stacks)")
+
+
+class LoopLagMonitor:
+    """Heartbeat on the loop plus a watchdog thread that reports stalls
+
+    The heartbeat wakes every threshold / 4 and records how late it woke.
+    When it has not run for longer than the threshold, the watchdog logs
+    what the loop thread is executing at that moment, once per stall.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_LAG_MS / 1000, metrics=REGISTRY):
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._lag = metrics.latency("event_loop_lag_seconds", "Event loop wake-up delay")
+        self._stalls = metrics.counter("event_loop_stalls_total", "Callbacks that held the loop past the threshold")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def _heartbeat(self):
+        period = self.threshold / 4
+        while True:
+            expected = time.monotonic() + period
+            await asyncio.sleep(period)
+            self._beat = now = time.monotonic()
+            self._lag.observe(max(0.0, now - expected))
+
+    def _watch(self, stopped: threading.Event):
+        reported = None
+        while not stopped.wait(self.threshold / 4):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled <= self.threshold or beat == reported:
+                continue
+            reported = beat
+            self._stalls.inc()
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(unavailable)\n"
+            logger.warning(f"Event loop blocked for {stalled * 1000:.0f}ms+ in:\n{stack}")
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, args=(self._stopped,),
+                         name="loop-lag-watchdog", daemon=True).start()
+        logger.info(f"Event loop lag monitor on (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stopped.set()
+        logger.info("Event loop lag monitor off")
+
+
+class ProfilingControl:
+    """Signal handlers driving the profiler and lag monitor for one process"""
+
+    def __init__(self, label: str, directory: str = PROFILE_DIR, seconds: float = PROFILE_SECONDS,
+                 lag_ms: Optional[float] = None):
+        self.label = label
+        self.seconds = seconds
+        if lag_ms is None:
+            lag_ms = float(os.getenv("LOOP_LAG_MS", "0"))
+        self.start_lag_monitor = lag_ms > 0
+        self.profiler = SamplingProfiler(directory)
+        self.lag_monitor = LoopLagMonitor((lag_ms or DEFAULT_LAG_MS) / 1000)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def toggle_lag_monitor(self):
+        if self.lag_monitor.running:
+            self.lag_monitor.stop()
+        else:
+            self.lag_monitor.start()
+
+    def install(self):
+        """Register SIGUSR1/SIGUSR2 on the running loop (call from the main thread)"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.profiler.start, self.seconds, self.label)
+            loop.add_signal_handler(signal.SIGUSR2, self.toggle_lag_monitor)
+        except (NotImplementedError, AttributeError, RuntimeError) as e:
+            # No POSIX signals here (Windows, or not the main thread)
+            logger.debug(f"Profiling signals unavailable: {e}")
+            return
+        self._loop = loop
+        if self.start_lag_monitor:
+            self.lag_monitor.start()
+
+    def uninstall(self):
+        if self._loop is None:
+            return
+        self._loop.remove_signal_handler(signal.SIGUSR1)
+        self._loop.remove_signal_handler(signal.SIGUSR2)
+        if self.lag_monitor.running:
+            self.lag_monitor.stop()
+        self._loop = None
@@ -0,0 +1,359 @@
+"""
+Smart Money Tracker - Offline Replay
+Feed a recorded pump.fun event file through the monitor's ingest pipeline
+
+Usage: python code/replay.py events.jsonl.gz [--db data/replay.db] [--speed 10] [--shards 4]
+
+Input is JSONL, optionally gzip or zstd compressed (detected from the
+file header). Each line is either a raw feed frame or a recorder envelope
+{"t": <receive time, epoch seconds>, "f": "<raw frame>"}. A directory of
+feed recorder segments can be given instead, optionally narrowed to a
+time range with --start/--end. With --shards N the frames are routed to
+N ingest worker processes by wallet, as the monitor does with
+INGEST_SHARDS, and written to per-shard databases next to --db.
+--storage postgresql://... replays into PostgreSQL instead of --db.
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+import logging
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst recordings
+    zstandard = None
+
+from backpressure import POLICIES
+from db import Database, get_database, shard_paths
+from events import TradeEvent, decode_trade
+from feed_recorder import read_range
+from metrics import REGISTRY, percentile
+from sharded_ingest import ShardedIngest
+from smart_money_monitor import SmartMoneyTracker
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Per-event latency samples kept for the percentile report
+LATENCY_SAMPLES = 1_000_000
+
+
+def open_events(path: str) -> io.TextIOBase:
+    """Open a JSONL recording, transparently decompressing gzip or zstd"""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if magic.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd compressed; pip install zstandard to replay it")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_frames(path: str, start: Optional[float] = None,
+                end: Optional[float] = None) -> Iterator[Tuple[Optional[float], str]]:
+    """Yield (receive time or None, raw frame) for every line of a recording"""
+    if os.path.isdir(path):
+        yield from read_range(path, start, end)
+        return
+
+    with open_events(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{"t":'):
+                try:
+                    envelope = json.loads(line)
+                    yield envelope["t"], envelope["f"]
+                    continue
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    pass
+            yield None, line
+
+
+def event_time(event: TradeEvent, received: Optional[float]) -> Optional[float]:
+    """Seconds timestamp used to pace a replay"""
+    if received is not None:
+        return received
+    return event.timestamp_ms / 1000 if event.timestamp_ms is not None else None
+
+
+def db_summary(db: Database) -> Dict:
+    """Row counts and leaderboard after a replay"""
+    with db.read() as conn:
+        summary = {
+            "wallets": conn.execute("SELECT COUNT(*) FROM wallets").fetchone()[0],
+            "trades": conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0],
+            "open_positions": conn.execute(
+                "SELECT COUNT(*) FROM positions WHERE status = 'open'").fetchone()[0],
+            "closed_positions": conn.execute(
+                "SELECT COUNT(*) FROM positions WHERE status = 'closed'").fetchone()[0],
+            "alerts": dict(conn.execute(
+                "SELECT status, COUNT(*) FROM alert_history GROUP BY status").fetchall()),
+        }
+        leaders = conn.execute("""
+            SELECT address, performance_score, total_trades, wins
+            FROM wallets
+            WHERE total_trades >= 5
+            ORDER BY performance_score DESC
+            LIMIT 5
+        """).fetchall()
+    summary["leaderboard"] = [
+        {"address": address, "score": round(score, 1), "total_trades": total,
+         "win_rate": round(wins / total * 100, 1) if total else 0}
+        for address, score, total, wins in leaders
+    ]
+    return summary
+
+
+def backpressure_summary() -> Dict:
+    """Per-reason shed/spill counts from this process's metrics"""
+    snapshot = REGISTRY.snapshot()
+    return {name: snapshot[name] for name in (
+        "ingest_backpressure_blocked_total", "ingest_shed_low_value_buy_total",
+        "ingest_spilled_queue_full_total", "ingest_spilled_behind_journal_total", "ingest_unspilled_total",
+    ) if name in snapshot}
+
+
+class Pacer:
+    """Sleep so events are released at recorded time divided by `speed`"""
+
+    def __init__(self, speed: Optional[float]):
+        self.speed = speed
+        self.first_event = self.first_wall = None
+
+    async def wait(self, t: Optional[float]):
+        if not self.speed or t is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self.first_event is None:
+            self.first_event, self.first_wall = t, loop.time()
+        delay = self.first_wall + (t - self.first_event) / self.speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def replay(path: str, db_path: str, speed: Optional[float] = None,
+                 limit: Optional[int] = None, start: Optional[float] = None,
+                 end: Optional[float] = None, **tracker_kwargs) -> Dict:
+    """Replay a recording into db_path and return throughput, latency and DB state
+
+    speed=None replays as fast as the pipeline accepts events; otherwise
+    recorded inter-event gaps are divided by `speed`. Per-event latency is
+    enqueue to commit, so at full speed it includes time spent waiting in
+    the ingest queue.
+    """
+    latency = REGISTRY.latency("ingest_event_seconds", "Event received to committed",
+                               window=LATENCY_SAMPLES)
+    tracker = SmartMoneyTracker(db_path=db_path, **tracker_kwargs)
+    counts = {"frames": 0, "events": 0, "non_trade": 0}
+
+    pacer = Pacer(speed)
+
+    async def source(queue: asyncio.Queue):
+        for received, frame in read_frames(path, start, end):
+            if limit is not None and counts["events"] >= limit:
+                break
+            counts["frames"] += 1
+            event = tracker.decode(frame)
+            if event is None:
+                counts["non_trade"] += 1
+                continue
+
+            await pacer.wait(event_time(event, received))
+            counts["events"] += 1
+            tracker._events_received.inc()
+            await tracker.enqueue(queue, time.perf_counter(), event)
+
+    started = time.perf_counter()
+    # Never push replayed alerts to a live bot
+    await tracker.run_pipeline(source, publish_alerts=False)
+    elapsed = time.perf_counter() - started
+    tracker.flush_scores()
+
+    events = counts["events"]
+    return {
+        "file": path,
+        "speed": speed,
+        "frames": counts["frames"],
+        "events": events,
+        "non_trade_frames": counts["non_trade"],
+        "trades_processed": tracker._events_processed.value,
+        "duplicates_dropped": tracker._duplicates_dropped.value,
+        "duplicates_db": tracker._duplicates_db.value,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(events / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(latency.percentile(50) * 1000, 3),
+            "p99": round(latency.percentile(99) * 1000, 3),
+            "max": round(latency.max * 1000, 3),
+        },
+        "backpressure": backpressure_summary(),
+        "batches": tracker._batch_latency.count,
+        "batch_ms": {
+            "p50": round(tracker._batch_latency.percentile(50) * 1000, 3),
+            "p99": round(tracker._batch_latency.percentile(99) * 1000, 3),
+        },
+        "db": db_summary(tracker.db),
+    }
+
+
+async def replay_sharded(path: str, db_path: str, shards: int, speed: Optional[float] = None,
+                         limit: Optional[int] = None, start: Optional[float] = None,
+                         end: Optional[float] = None, **tracker_kwargs) -> Dict:
+    """replay() through `shards` worker processes; same report shape
+
+    Latency is measured from dispatch in the reader to commit in a worker,
+    so it includes the hand-off between processes. Frames are only
+    decoded in the reader when pacing needs their timestamps.
+    """
+    ingest = ShardedIngest(db_path, shards, publish_alerts=False,
+                           tracker_kwargs=tracker_kwargs, latency_window=LATENCY_SAMPLES)
+    counts = {"frames": 0, "events": 0, "non_trade": 0}
+    pacer = Pacer(speed)
+
+    async def source(ingest: ShardedIngest):
+        for received, frame in read_frames(path, start, end):
+            if limit is not None and counts["events"] >= limit:
+                break
+            counts["frames"] += 1
+            if speed:
+                event = decode_trade(frame)
+                if event is not None:
+                    await pacer.wait(event_time(event, received))
+            if await ingest.dispatch(frame):
+                counts["events"] += 1
+            else:
+                counts["non_trade"] += 1
+
+    started = time.perf_counter()
+    summaries = await ingest.run(source)
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(sample for summary in summaries for sample in summary["latency"])
+    events = counts["events"]
+    return {
+        "file": path,
+        "speed": speed,
+        "shards": shards,
+        "frames": counts["frames"],
+        "events": events,
+        "non_trade_frames": counts["non_trade"],
+        "trades_processed": sum(summary["trades"] for summary in summaries),
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(events / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(samples, 50) * 1000, 3),
+            "p99": round(percentile(samples, 99) * 1000, 3),
+            "max": round(max((summary["latency_max"] for summary in summaries), default=0.0) * 1000, 3),
+        },
+        "batches": sum(summary["batches"] for summary in summaries),
+        "per_shard": [
+            {"shard": summary["shard"], "events": summary["events"], "trades": summary["trades"],
+             "seconds": round(summary["seconds"], 3)}
+            for summary in summaries
+        ],
+        "db": db_summary(get_database(db_path, shards)),
+    }
+
+
+def print_report(result: Dict):
+    lat = result["latency_ms"]
+    db = result["db"]
+    print(f"Replayed {result['events']} events ({result['trades_processed']} trades written) "
+          f"from {result['file']} in {result['seconds']:.2f}s")
+    if "duplicates_dropped" in result:
+        print(f"Duplicates: {result['duplicates_dropped']} dropped in memory, "
+              f"{result['duplicates_db']} caught by the signature index")
+    print(f"Throughput: {result['events_per_second']:.0f} events/s over {result['batches']} batches"
+          + (f" on {result['shards']} shards" if "shards" in result else ""))
+    line = f"Per-event latency: p50 {lat['p50']:.2f}ms | p99 {lat['p99']:.2f}ms | max {lat['max']:.2f}ms"
+    if "batch_ms" in result:
+        line += (f" (batch commit p50 {result['batch_ms']['p50']:.2f}ms | "
+                 f"p99 {result['batch_ms']['p99']:.2f}ms)")
+    print(line)
+    pressure = {name: value for name, value in result.get("backpressure", {}).items() if value}
+    if pressure:
+        print("Backpressure: " + " | ".join(f"{name[7:]} {value:.0f}" for name, value in pressure.items()))
+    print(f"DB: {db['wallets']} wallets | {db['trades']} trades | "
+          f"{db['open_positions']} open / {db['closed_positions']} closed positions | "
+          f"alerts {db['alerts'] or 'none'}")
+    for i, w in enumerate(db["leaderboard"], 1):
+        print(f"  {i}. {w['address'][:8]}... score {w['score']} "
+              f"({w['total_trades']} trades, {w['win_rate']}% WR)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded pump.fun events through the monitor")
+    parser.add_argument("path", help="JSONL recording (.gz / .zst accepted) or feed segment directory")
+    parser.add_argument("--db", default="data/replay.db", help="database to replay into")
+    parser.add_argument("--fresh", action="store_true", help="delete the database first")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="speed-up factor over recorded time (default: as fast as possible)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after N events")
+    parser.add_argument("--start", type=float, default=None,
+                        help="segment directories only: first receive time (epoch seconds)")
+    parser.add_argument("--end", type=float, default=None,
+                        help="segment directories only: last receive time (epoch seconds)")
+    parser.add_argument("--overflow", choices=POLICIES, default=os.getenv("INGEST_OVERFLOW_POLICY", "block"),
+                        help="ingest queue backpressure policy (default: block)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="ingest worker processes, routed by wallet (default: 1, in-process)")
+    parser.add_argument("--storage", default=None,
+                        help="storage URL to replay into instead of --db, e.g. postgresql://...")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    if args.storage and args.shards > 1:
+        parser.error("--shards writes SQLite shard files and cannot be combined with --storage")
+
+    if args.fresh:
+        paths = [args.db] + (shard_paths(args.db, args.shards) if args.shards > 1 else [])
+        for path in paths:
+            spill = os.path.splitext(path)[0] + ".spill.jsonl"
+            for stale in (path, path + "-wal", path + "-shm", spill):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+    # Per-trade logs (including sells of positions opened before the
+    # recording started) would dominate the measurement
+    logging.getLogger("smart_money_monitor").setLevel(logging.ERROR)
+
+    tracker_kwargs = dict(
+        batch_size=int(os.getenv("INGEST_BATCH_SIZE", "200")),
+        flush_interval=float(os.getenv("INGEST_FLUSH_MS", "50")) / 1000,
+        queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "10000")),
+        backpressure_kwargs=dict(
+            policy=args.overflow,
+            shed_watermark=float(os.getenv("INGEST_SHED_WATERMARK", "0.8")),
+            shed_max_sol=float(os.getenv("INGEST_SHED_MAX_SOL", "0.5")),
+            shed_max_score=float(os.getenv("INGEST_SHED_MAX_SCORE", "50")),
+        ),
+    )
+    if args.storage:
+        tracker_kwargs["storage"] = get_storage(args.storage, args.db)
+    if args.shards > 1:
+        result = asyncio.run(replay_sharded(
+            args.path, args.db, args.shards, speed=args.speed, limit=args.limit,
+            start=args.start, end=args.end, **tracker_kwargs))
+    else:
+        result = asyncio.run(replay(
+            args.path, args.db, speed=args.speed, limit=args.limit, start=args.start, end=args.end,
+            **tracker_kwargs))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
@@ -0,0 +1,172 @@
+"""
+Smart Money Tracker - Trade Retention
+Rolls trades older than a horizon into daily per-wallet and per-token
+aggregates and deletes the raw rows in small batches
+
+Only the rolling windows and the "recent trades" views read trades, so
+old rows just add index maintenance to every insert. Compaction keeps
+`trades` to the last RETENTION_DAYS and leaves daily totals behind:
+
+    wallet_daily    buys, sells and SOL volume per wallet per UTC day
+    token_daily     the same per token, plus the day's low/high price
+
+Each batch is one short transaction that deletes the oldest rows with
+DELETE ... RETURNING and folds exactly those rows into the rollups, so a
+crash between batches never double counts or loses a trade. The writer
+only ever waits for one batch at a time.
+
+Positions and wallet stats never read trades older than the 7d windows,
+so the horizon has a floor of MIN_RETENTION_DAYS. Trades of alerts still
+waiting in the queue are kept until the bot settles them.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+MIN_RETENTION_DAYS = 8              # rolling 7d windows reload from raw trades
+RETENTION_BATCH = 1000              # trades deleted per transaction (~25ms on SQLite)
+
+# Oldest trades first; alert_trades() still joins the queued ones
+DELETE_OLDEST = """
+    DELETE FROM trades WHERE id IN (
+        SELECT id FROM trades
+        WHERE timestamp < ?
+            AND id NOT IN (SELECT trade_id FROM alert_history WHERE status = 'queued')
+        ORDER BY timestamp
+        LIMIT ?
+    )
+    RETURNING wallet_address, token_address, token_symbol, action, amount_sol,
+              price_at_trade, timestamp
+"""
+
+UPSERT_WALLET_DAY = """
+    INSERT INTO wallet_daily (wallet_address, day, buys, sells, buy_volume_sol, sell_volume_sol)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (wallet_address, day) DO UPDATE SET
+        buys = wallet_daily.buys + excluded.buys,
+        sells = wallet_daily.sells + excluded.sells,
+        buy_volume_sol = wallet_daily.buy_volume_sol + excluded.buy_volume_sol,
+        sell_volume_sol = wallet_daily.sell_volume_sol + excluded.sell_volume_sol
+"""
+
+UPSERT_TOKEN_DAY = """
+    INSERT INTO token_daily (token_address, day, token_symbol, buys, sells,
+                             buy_volume_sol, sell_volume_sol, low_price, high_price)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (token_address, day) DO UPDATE SET
+        token_symbol = COALESCE(excluded.token_symbol, token_daily.token_symbol),
+        buys = token_daily.buys + excluded.buys,
+        sells = token_daily.sells + excluded.sells,
+        buy_volume_sol = token_daily.buy_volume_sol + excluded.buy_volume_sol,
+        sell_volume_sol = token_daily.sell_volume_sol + excluded.sell_volume_sol,
+        low_price = CASE WHEN token_daily.low_price IS NULL OR excluded.low_price < token_daily.low_price
+                         THEN excluded.low_price ELSE token_daily.low_price END,
+        high_price = CASE WHEN token_daily.high_price IS NULL OR excluded.high_price > token_daily.high_price
+                          THEN excluded.high_price ELSE token_daily.high_price END
+"""
+
+
+def rollup(rows: List[tuple]) -> Tuple[List[tuple], List[tuple]]:
+    """Fold deleted trade rows into (wallet_daily, token_daily) upsert rows"""
+    wallets: Dict[Tuple[str, int], list] = {}
+    tokens: Dict[Tuple[str, int], list] = {}
+    for wallet, token, symbol, action, sol, price, timestamp in rows:
+        day = timestamp // DAY_SECONDS * DAY_SECONDS
+        sold = action == 'sell'
+        w = wallets.setdefault((wallet, day), [0, 0, 0.0, 0.0])
+        t = tokens.setdefault((token, day), [None, 0, 0, 0.0, 0.0, None, None])
+        w[sold] += 1
+        w[2 + sold] += sol
+        t[1 + sold] += 1
+        t[3 + sold] += sol
+        if symbol:
+            t[0] = symbol
+        if price:
+            t[5] = price if t[5] is None else min(t[5], price)
+            t[6] = price if t[6] is None else max(t[6], price)
+    return ([(wallet, day, *w) for (wallet, day), w in wallets.items()],
+            [(token, day, *t) for (token, day), t in tokens.items()])
+
+
+class TradeRetention:
+    """Incremental compaction of trades older than horizon_days
+
+    compacted_before is the watermark: every trade with an earlier
+    timestamp has been rolled up or is about to be, so the monitor drops
+    late events older than it instead of re-inserting trades whose
+    signatures are gone. horizon_days=0 turns compaction off.
+    """
+
+    def __init__(self, storage, horizon_days: float = 0, batch_size: int = RETENTION_BATCH,
+                 pause: float = 0.1, metrics=REGISTRY):
+        if horizon_days and horizon_days < MIN_RETENTION_DAYS:
+            raise ValueError(f"retention horizon must be at least {MIN_RETENTION_DAYS} days, "
+                             f"got {horizon_days}")
+        self.db = storage
+        self.horizon_days = horizon_days
+        self.batch_size = batch_size
+        # Sleep between batches so the writer gets the lock in between
+        self.pause = pause
+        self.compacted_before = 0
+        self._compacted = metrics.counter("retention_trades_compacted_total", "Trades rolled up and deleted")
+        self._watermark = metrics.gauge("retention_compacted_before", "Trades before this time are rolled up")
+        self._batch_latency = metrics.latency("retention_batch_seconds", "One compaction batch transaction")
+
+    def load(self, cursor):
+        """Read the watermark left by earlier runs"""
+        cursor.execute("SELECT compacted_before FROM retention_state WHERE id = 1")
+        row = cursor.fetchone()
+        self.compacted_before = row[0] if row else 0
+        self._watermark.set(self.compacted_before)
+
+    def cutoff(self, now: Optional[float] = None) -> int:
+        """Start of the oldest UTC day that is kept raw"""
+        now = time.time() if now is None else now
+        return int(now - self.horizon_days * DAY_SECONDS) // DAY_SECONDS * DAY_SECONDS
+
+    def advance(self, before: int):
+        """Raise the watermark to `before` (it never moves back)"""
+        if before <= self.compacted_before:
+            return
+        # Late events are dropped from here on, before any row is deleted
+        self.compacted_before = before
+        self._watermark.set(before)
+        with self.db.write() as conn:
+            conn.execute("UPDATE retention_state SET compacted_before = ? WHERE id = 1 AND compacted_before < ?",
+                         (before, before))
+
+    def compact_batch(self, before: int) -> int:
+        """Roll up and delete up to batch_size trades older than `before`"""
+        started = time.perf_counter()
+        with self.db.write() as conn:
+            rows = conn.execute(DELETE_OLDEST, (before, self.batch_size)).fetchall()
+            wallet_days, token_days = rollup(rows)
+            conn.executemany(UPSERT_WALLET_DAY, wallet_days)
+            conn.executemany(UPSERT_TOKEN_DAY, token_days)
+        self._batch_latency.observe(time.perf_counter() - started)
+        self._compacted.inc(len(rows))
+        return len(rows)
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Compact everything older than the horizon; returns trades removed"""
+        if not self.horizon_days:
+            return 0
+        before = self.cutoff(now)
+        self.advance(before)
+
+        removed = 0
+        while True:
+            deleted = self.compact_batch(before)
+            removed += deleted
+            if deleted < self.batch_size:
+                break
+            time.sleep(self.pause)
+        if removed:
+            logger.info(f"Retention: rolled up {removed} trades before {before}")
+        return removed
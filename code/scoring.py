@@ -0,0 +1,223 @@
+"""
+Smart Money Tracker - Wallet Scoring
+Performance score formula, deferred bulk rescoring of dirty wallets and
+vectorized rescoring of the whole wallets table
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # optional: rescore_all_wallets falls back to the scalar formula
+    np = None
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MIN_TRADES_FOR_SCORE = 3
+RESCORE_CHUNK = 500
+FULL_RESCORE_CHUNK = 50000
+
+
+def compute_performance_score(total: int, wins: int, roi_7d: float, vol_7d: float,
+                              last_active: int, now: int) -> float:
+    """Calculate 0-100 performance score for one wallet"""
+    if total is None or total < MIN_TRADES_FOR_SCORE:  # Need at least 3 trades
+        return 0
+
+    # Win rate component (40%)
+    win_rate = (wins / total * 100) if total > 0 else 0
+    win_score = win_rate * 0.4
+
+    # ROI component (30%) - normalize to 0-100
+    roi_score = min(max(roi_7d / 10, 0), 100) * 0.3
+
+    # Volume component (15%) - normalize (50 SOL = 100 points)
+    vol_score = min(vol_7d / 50 * 100, 100) * 0.15
+
+    # Recency bonus (15%)
+    if last_active >= now - 86400:  # Active in last 24h
+        recency_score = 100 * 0.15
+    elif last_active >= now - 604800:  # Active in last 7d
+        recency_score = 50 * 0.15
+    else:
+        recency_score = 0
+
+    return win_score + roi_score + vol_score + recency_score
+
+
+def compute_performance_scores(total, wins, roi_7d, vol_7d, last_active, now: int):
+    """Vectorized compute_performance_score over NumPy arrays
+
+    Applies the same operations in the same order as the scalar formula so
+    both produce identical floats. NULL inputs (NaN) count as 0.
+    """
+    total = np.nan_to_num(np.asarray(total, dtype=np.float64))
+    wins = np.nan_to_num(np.asarray(wins, dtype=np.float64))
+    roi_7d = np.nan_to_num(np.asarray(roi_7d, dtype=np.float64))
+    vol_7d = np.nan_to_num(np.asarray(vol_7d, dtype=np.float64))
+    last_active = np.nan_to_num(np.asarray(last_active, dtype=np.float64))
+
+    # Win rate component (40%)
+    safe_total = np.where(total > 0, total, 1)
+    win_rate = np.where(total > 0, wins / safe_total * 100, 0)
+    win_score = win_rate * 0.4
+
+    # ROI component (30%)
+    roi_score = np.minimum(np.maximum(roi_7d / 10, 0), 100) * 0.3
+
+    # Volume component (15%)
+    vol_score = np.minimum(vol_7d / 50 * 100, 100) * 0.15
+
+    # Recency bonus (15%)
+    recency_score = np.where(last_active >= now - 86400, 100 * 0.15,
+                             np.where(last_active >= now - 604800, 50 * 0.15, 0))
+
+    score = win_score + roi_score + vol_score + recency_score
+    return np.where(total >= MIN_TRADES_FOR_SCORE, score, 0.0)
+
+
+def rescore_all_wallets(db, now: Optional[int] = None,
+                        chunk_size: int = FULL_RESCORE_CHUNK) -> Tuple[int, int]:
+    """Recompute performance_score for every wallet
+
+    Walks the wallets table in primary-key order, one chunk per short write
+    transaction so ingest is never blocked for long. Each chunk is scored in
+    one vectorized pass (or the scalar formula without NumPy) and only rows
+    whose score changed are written back with executemany. This is what
+    lets the recency bonus decay for wallets that have stopped trading.
+
+    Returns (wallets scanned, rows written).
+    """
+    now = int(time.time()) if now is None else now
+    scanned = written = 0
+    last_address = ""
+
+    while True:
+        with db.write() as conn:
+            rows = conn.execute("""
+                SELECT address, total_trades, wins, roi_7d, volume_7d, last_active, performance_score
+                FROM wallets
+                WHERE address > ?
+                ORDER BY address
+                LIMIT ?
+            """, (last_address, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            if np is not None:
+                columns = list(zip(*rows))
+                current = np.array(columns[6], dtype=np.float64)
+                scores = compute_performance_scores(columns[1], columns[2], columns[3],
+                                                    columns[4], columns[5], now)
+                changed = np.flatnonzero(scores != current)
+                updates = [(float(scores[i]), rows[i][0]) for i in changed]
+            else:
+                updates = []
+                for address, total, wins, roi_7d, vol_7d, last_active, current in rows:
+                    score = compute_performance_score(total, wins, roi_7d or 0, vol_7d or 0,
+                                                      last_active or 0, now)
+                    if score != current:
+                        updates.append((score, address))
+
+            if updates:
+                conn.executemany("""
+                    UPDATE wallets SET performance_score = ? WHERE address = ?
+                """, updates)
+
+        scanned += len(rows)
+        written += len(updates)
+        last_address = rows[-1][0]
+
+    return scanned, written
+
+
+class ScoreScheduler:
+    """Dirty-wallet set that is rescored in bulk instead of on every trade
+
+    Trades only mark their wallet dirty. rescore() later reads the dirty
+    wallets' rows in chunks, recomputes their scores and writes back the
+    ones that changed with a single executemany. rescore() can also be
+    called for one wallet when an alert decision needs a fresh score.
+    """
+
+    def __init__(self, metrics=REGISTRY):
+        # wallet -> wall time it was first marked dirty since its last rescore
+        self._dirty: Dict[str, float] = {}
+        self._marks = metrics.counter("scoring_trades_marked_total", "Trades that dirtied a wallet score")
+        self._writes = metrics.counter("scoring_rows_written_total", "performance_score rows rewritten")
+        self._rescored = metrics.counter("scoring_wallets_rescored_total", "Wallet scores recomputed")
+        self._urgent = metrics.counter("scoring_urgent_rescores_total", "Immediate rescores for alert checks")
+        self._pending = metrics.gauge("scoring_dirty_wallets", "Wallets waiting to be rescored")
+        self._amplification = metrics.gauge("scoring_writes_per_trade", "Score writes per trade")
+        self._lag = metrics.latency("scoring_visible_lag_seconds", "Trade to visible score delay")
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, wallet: str):
+        self._marks.inc()
+        if wallet not in self._dirty:
+            self._dirty[wallet] = time.time()
+            self._pending.set(len(self._dirty))
+
+    def is_dirty(self, wallet: str) -> bool:
+        return wallet in self._dirty
+
+    def pending(self) -> List[str]:
+        return list(self._dirty)
+
+    def rescore(self, cursor, wallets: Optional[Iterable[str]] = None, urgent: bool = False) -> int:
+        """Recompute scores for the given wallets (default: all dirty ones)
+
+        Returns the number of rows whose score changed.
+        """
+        wallets = self.pending() if wallets is None else list(wallets)
+        if not wallets:
+            return 0
+
+        if urgent:
+            self._urgent.inc()
+
+        now = int(time.time())
+        updates = []
+        for start in range(0, len(wallets), RESCORE_CHUNK):
+            chunk = wallets[start:start + RESCORE_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT address, total_trades, wins, roi_7d, volume_7d, last_active, performance_score
+                FROM wallets
+                WHERE address IN ({placeholders})
+            """, chunk)
+            for address, total, wins, roi_7d, vol_7d, last_active, current in cursor.fetchall():
+                score = compute_performance_score(total, wins, roi_7d, vol_7d, last_active, now)
+                if score != current:
+                    updates.append((score, address))
+
+        if updates:
+            cursor.executemany("""
+                UPDATE wallets SET performance_score = ? WHERE address = ?
+            """, updates)
+
+        wall_now = time.time()
+        for wallet in wallets:
+            marked_at = self._dirty.pop(wallet, None)
+            if marked_at is not None:
+                self._lag.observe(wall_now - marked_at)
+
+        self._rescored.inc(len(wallets))
+        self._writes.inc(len(updates))
+        self._pending.set(len(self._dirty))
+        if self._marks.value:
+            self._amplification.set(self._writes.value / self._marks.value)
+        return len(updates)
+
+    def requeue(self, wallets: Iterable[str]):
+        """Put wallets back after a failed rescore transaction"""
+        now = time.time()
+        for wallet in wallets:
+            self._dirty.setdefault(wallet, now)
+        self._pending.set(len(self._dirty))
@@ -0,0 +1,250 @@
+"""
+Smart Money Tracker - Sharded Ingest
+Spread trade processing over worker processes by wallet address
+
+The reader (WebSocket or replay file) routes each raw trade frame to one
+of N worker processes by a hash of its traderPublicKey. Every worker runs
+an ordinary SmartMoneyTracker pipeline on its own shard database, so a
+wallet's positions, stats and score only ever live in one process and no
+cross-process locking is needed. The bot and dashboard read the shards
+together through ShardedDatabase.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import queue
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+from db import DEFAULT_DB_PATH, ShardedDatabase, shard_for, shard_paths
+from events import is_trade_frame
+from metrics import REGISTRY, serve_metrics
+
+logger = logging.getLogger(__name__)
+
+WALLET_PATTERN = re.compile(r'"traderPublicKey"\s*:\s*"([^"]+)"')
+
+
+def frame_wallet(frame: str) -> Optional[str]:
+    """traderPublicKey of a raw frame, found without parsing the whole frame"""
+    match = WALLET_PATTERN.search(frame)
+    if match is not None:
+        return match.group(1)
+    # Escaped or unusual layouts: fall back to a real parse
+    try:
+        wallet = json.loads(frame).get("traderPublicKey")
+    except (ValueError, AttributeError):
+        return None
+    return wallet if isinstance(wallet, str) else None
+
+
+def run_shard(index: int, db_path: str, inbox, results, publish_alerts: bool,
+              tracker_kwargs: Dict, log_level: int, latency_window: int):
+    """Worker process: decode and apply the frames routed to one shard
+
+    Batches of (enqueued at, raw frame) arrive on `inbox` until a None
+    sentinel; a summary of the run is put on `results` before exiting.
+    """
+    # Imported here so the reader process never loads the tracker
+    from smart_money_monitor import SmartMoneyTracker
+
+    logging.getLogger("smart_money_monitor").setLevel(log_level)
+    latency = REGISTRY.latency("ingest_event_seconds", "Event received to committed", window=latency_window)
+    tracker = SmartMoneyTracker(db_path=db_path, **tracker_kwargs)
+    tracker.profile_label = f"shard{index}"
+
+    async def source(queue: asyncio.Queue):
+        while True:
+            batch = await asyncio.to_thread(inbox.get)
+            if batch is None:
+                return
+            for received, frame in batch:
+                event = tracker.decode(frame)
+                if event is None:
+                    continue
+                tracker._events_received.inc()
+                await tracker.enqueue(queue, received, event)
+
+    started = time.perf_counter()
+    asyncio.run(tracker.run_pipeline(source, publish_alerts=publish_alerts))
+    tracker.flush_scores()
+    tracker.db.close()
+    results.put({
+        "shard": index,
+        "events": tracker._events_received.value,
+        "trades": tracker._events_processed.value,
+        "seconds": time.perf_counter() - started,
+        "batches": tracker._batch_latency.count,
+        "latency": list(latency.recent),
+        "latency_max": latency.max,
+    })
+
+
+class ShardedIngest:
+    """Reader side of sharded ingest: one worker process per shard
+
+    Frames are buffered per shard and handed over in batches of up to
+    `dispatch_batch` (or every `dispatch_interval` seconds), which keeps
+    pickling and pipe overhead off the per-frame path. Each worker's inbox
+    is bounded, so a slow shard applies backpressure to the reader instead
+    of growing without limit.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, shards: int = 2,
+                 dispatch_batch: int = 256, dispatch_interval: float = 0.02,
+                 inbox_batches: int = 64, publish_alerts: bool = True,
+                 tracker_kwargs: Optional[Dict] = None, latency_window: int = 1024,
+                 metrics_port: Optional[int] = None, metrics=REGISTRY):
+        self.db_path = db_path
+        self.shards = shards
+        self.dispatch_batch = dispatch_batch
+        self.dispatch_interval = dispatch_interval
+        self.inbox_batches = inbox_batches
+        self.publish_alerts = publish_alerts
+        self.tracker_kwargs = tracker_kwargs or {}
+        self.latency_window = latency_window
+        # The reader serves /metrics on metrics_port, shard i on metrics_port + 1 + i
+        self.metrics_port = metrics_port
+
+        # spawn, not fork: the reader already has an event loop and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes = []
+        self._workers = []
+        self._results = None
+        self._pending: List[List[Tuple[float, str]]] = [[] for _ in range(shards)]
+        self._send_locks: List[asyncio.Lock] = []
+        self._running = False
+
+        self._dispatched = metrics.counter("ingest_frames_dispatched_total", "Trade frames routed to shard workers")
+        self._unrouted = metrics.counter("ingest_frames_unrouted_total", "Trade frames with no wallet to route by")
+
+    def start(self):
+        """Create the shard databases and start the workers"""
+        database = ShardedDatabase(self.db_path, self.shards)
+        database.init_schema()
+        database.close()
+
+        self._results = self._context.Queue()
+        self._send_locks = [asyncio.Lock() for _ in range(self.shards)]
+        log_level = logging.getLogger("smart_money_monitor").getEffectiveLevel()
+        for index, path in enumerate(shard_paths(self.db_path, self.shards)):
+            inbox = self._context.Queue(maxsize=self.inbox_batches)
+            tracker_kwargs = dict(self.tracker_kwargs)
+            if self.metrics_port:
+                tracker_kwargs["metrics_port"] = self.metrics_port + 1 + index
+            worker = self._context.Process(
+                target=run_shard, name=f"ingest-shard-{index}", daemon=True,
+                args=(index, path, inbox, self._results, self.publish_alerts,
+                      tracker_kwargs, log_level, self.latency_window))
+            worker.start()
+            self._inboxes.append(inbox)
+            self._workers.append(worker)
+        logger.info(f"Started {self.shards} ingest shards for {self.db_path}")
+
+    async def dispatch(self, frame, received: Optional[float] = None) -> bool:
+        """Route one raw frame to its wallet's shard (False if it is not a trade)
+
+        received is the frame's socket receive time (epoch seconds), if known.
+        """
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf-8", errors="replace")
+        if not is_trade_frame(frame):
+            return False
+        wallet = frame_wallet(frame)
+        if wallet is None:
+            self._unrouted.inc()
+            return False
+
+        shard = shard_for(wallet, self.shards)
+        pending = self._pending[shard]
+        arrived = time.perf_counter()
+        if received is not None:
+            arrived -= time.time() - received
+        pending.append((arrived, frame))
+        if len(pending) >= self.dispatch_batch:
+            await self._send(shard)
+        return True
+
+    async def _send(self, shard: int):
+        async with self._send_locks[shard]:
+            batch = self._pending[shard]
+            if not batch:
+                return
+            self._pending[shard] = []
+            inbox = self._inboxes[shard]
+            try:
+                inbox.put_nowait(batch)
+            except queue.Full:
+                # The worker is behind: wait for room off the event loop
+                await asyncio.to_thread(inbox.put, batch)
+            self._dispatched.inc(len(batch))
+
+    async def flush(self):
+        """Hand every buffered frame to its worker"""
+        for shard in range(self.shards):
+            await self._send(shard)
+
+    async def _flush_loop(self):
+        while self._running:
+            await asyncio.sleep(self.dispatch_interval)
+            await self.flush()
+
+    async def _watch_workers(self, interval: float = 1.0):
+        """Fail fast if a worker dies; its shard would silently stop ingesting"""
+        while True:
+            await asyncio.sleep(interval)
+            for worker in self._workers:
+                if not worker.is_alive():
+                    raise RuntimeError(f"{worker.name} exited with code {worker.exitcode}")
+
+    async def stop(self) -> List[Dict]:
+        """Drain every shard and return the workers' run summaries"""
+        await self.flush()
+        for inbox in self._inboxes:
+            await asyncio.to_thread(inbox.put, None)
+
+        summaries = []
+        while len(summaries) < len(self._workers):
+            if not any(worker.is_alive() for worker in self._workers) and self._results.empty():
+                break
+            try:
+                summaries.append(await asyncio.to_thread(self._results.get, True, 1.0))
+            except queue.Empty:
+                continue
+        for worker in self._workers:
+            await asyncio.to_thread(worker.join)
+        self._inboxes = []
+        self._workers = []
+        return sorted(summaries, key=lambda summary: summary["shard"])
+
+    async def run(self, source: Callable[["ShardedIngest"], Awaitable[None]]) -> List[Dict]:
+        """Start the workers, let source(self) dispatch frames, then drain and stop"""
+        self.start()
+        server = await serve_metrics(self.metrics_port) if self.metrics_port else None
+        self._running = True
+        flusher = asyncio.create_task(self._flush_loop())
+        feeding = asyncio.create_task(source(self))
+        watcher = asyncio.create_task(self._watch_workers())
+        try:
+            await asyncio.wait({feeding, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if watcher.done():
+                feeding.cancel()
+                watcher.result()
+            feeding.result()
+        except BaseException:
+            for task in (flusher, feeding, watcher):
+                task.cancel()
+            raise
+        finally:
+            if server is not None:
+                server.close()
+        watcher.cancel()
+
+        # Let an in-progress hand-off finish: a cancelled put would still
+        # complete on its thread, possibly after the stop sentinel
+        self._running = False
+        await flusher
+        return await self.stop()
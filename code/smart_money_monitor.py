@@ -4,340 +4,849 @@ Tracks pump.fun trades and identifies high-performing wallets
 """
 
 import asyncio
-import websockets
-import json
-import sqlite3
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Union
 import logging
+import os
+
+from alert_channel import AlertPublisher
+from alert_index import AlertIndex
+from backpressure import Backpressure
+from db import DEFAULT_DB_PATH, get_database
+from events import RecentSignatures, TradeEvent, as_trade_event, decode_trade
+from feed_recorder import FeedRecorder
+from metrics import REGISTRY, serve_metrics
+from profiling import ProfilingControl
+from retention import TradeRetention
+from sharded_ingest import ShardedIngest
+from storage import STORAGE_URL, SQLiteStorage, Storage, get_storage
+from subscriptions import FEED_URL, SubscriptionManager
+from scoring import ScoreScheduler, rescore_all_wallets
+from wallet_stats import WalletStatsEngine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class Lot:
+    """Remaining size and cost basis of one open position row"""
+    
+    __slots__ = ('id', 'entry_timestamp', 'entry_price', 'tokens', 'sol')
+    
+    def __init__(self, id: int, entry_timestamp: int, entry_price: float,
+                 sol: float, tokens: float):
+        self.id = id
+        self.entry_timestamp = entry_timestamp
+        self.entry_price = entry_price
+        self.sol = sol
+        self.tokens = tokens
+
+class Fill:
+    """Slice of a lot matched by a sell"""
+    
+    __slots__ = ('lot', 'tokens', 'entry_sol', 'exit_sol', 'closes_lot')
+    
+    def __init__(self, lot: Lot, tokens: float, entry_sol: float, exit_sol: float, closes_lot: bool):
+        self.lot = lot
+        self.tokens = tokens
+        self.entry_sol = entry_sol
+        self.exit_sol = exit_sol
+        self.closes_lot = closes_lot
+    
+    @property
+    def profit_sol(self) -> float:
+        return self.exit_sol - self.entry_sol
+
+class LotLedger:
+    """FIFO lots of open positions keyed by (wallet, token)
+    
+    Sells are matched token-for-token against the oldest lots. A lot that
+    is only partly sold is split: the sold slice is realized and the rest
+    stays open with a proportionally reduced cost basis. Every lot is fully
+    consumed at most once and a sell splits at most one lot, so matching is
+    amortized constant time per sell.
+    
+    Rebuilt from `positions` at startup and kept in step with every open
+    and close. A wallet whose writes were rolled back is marked stale and
+    its lots are re-read from the database on next access.
+    """
+    
+    # Relative tolerance for treating a fill as consuming the whole lot
+    FULL_FILL_TOLERANCE = 1e-9
+    
+    def __init__(self):
+        self._open: Dict[Tuple[str, str], deque] = {}
+        self._stale: set = set()
+    
+    def __len__(self) -> int:
+        return sum(len(lots) for lots in self._open.values())
+    
+    def _add_rows(self, rows):
+        for pos_id, wallet, token, entry_ts, entry_price, entry_sol, entry_tokens in rows:
+            self.add(wallet, token, Lot(pos_id, entry_ts, entry_price, entry_sol, entry_tokens))
+    
+    def load(self, cursor):
+        """Rebuild the ledger from all open positions"""
+        self._open = {}
+        self._stale.clear()
+        cursor.execute("""
+            SELECT id, wallet_address, token_address, entry_timestamp, entry_price,
+                   entry_amount_sol, entry_amount_tokens
+            FROM positions
+            WHERE status = 'open'
+            ORDER BY entry_timestamp ASC, id ASC
+        """)
+        self._add_rows(cursor.fetchall())
+        logger.info(f"Loaded {len(self)} open lots")
+    
+    def _reload_wallet(self, cursor, wallet: str):
+        self._stale.discard(wallet)
+        for key in [k for k in self._open if k[0] == wallet]:
+            del self._open[key]
+        cursor.execute("""
+            SELECT id, wallet_address, token_address, entry_timestamp, entry_price,
+                   entry_amount_sol, entry_amount_tokens
+            FROM positions
+            WHERE wallet_address = ? AND status = 'open'
+            ORDER BY entry_timestamp ASC, id ASC
+        """, (wallet,))
+        self._add_rows(cursor.fetchall())
+    
+    def add(self, wallet: str, token: str, lot: Lot):
+        """Record a newly opened lot"""
+        lots = self._open.get((wallet, token))
+        if lots is None:
+            self._open[(wallet, token)] = deque([lot])
+        elif not lots or lots[-1].entry_timestamp <= lot.entry_timestamp:
+            lots.append(lot)
+        else:
+            # Out-of-order buy: keep the deque sorted by entry time
+            index = len(lots)
+            while index > 0 and lots[index - 1].entry_timestamp > lot.entry_timestamp:
+                index -= 1
+            lots.insert(index, lot)
+    
+    def match_sell(self, cursor, wallet: str, token: str, tokens: float, sol: float) -> List[Fill]:
+        """Consume lots oldest-first for a sell of `tokens` for `sol`
+        
+        Sell proceeds are attributed to each slice pro rata by token count.
+        A sell without a token amount closes the oldest whole lot, and any
+        part of a sell beyond the open lots is left unmatched.
+        """
+        if wallet in self._stale:
+            self._reload_wallet(cursor, wallet)
+        
+        key = (wallet, token)
+        lots = self._open.get(key)
+        if not lots:
+            return []
+        
+        fills = []
+        if tokens <= 0:
+            lot = lots.popleft()
+            fills.append(Fill(lot, lot.tokens, lot.sol, sol, True))
+        else:
+            remaining = tokens
+            while remaining > 0 and lots:
+                lot = lots[0]
+                exit_sol = sol * min(remaining, lot.tokens) / tokens
+                if remaining >= lot.tokens * (1 - self.FULL_FILL_TOLERANCE):
+                    lots.popleft()
+                    fills.append(Fill(lot, lot.tokens, lot.sol, exit_sol, True))
+                    remaining -= lot.tokens
+                else:
+                    entry_sol = lot.sol * remaining / lot.tokens
+                    lot.tokens -= remaining
+                    lot.sol -= entry_sol
+                    fills.append(Fill(lot, remaining, entry_sol, exit_sol, False))
+                    remaining = 0
+        
+        if not lots:
+            del self._open[key]
+        return fills
+    
+    def invalidate(self, wallet: str):
+        """Mark a wallet for reload after its writes were rolled back"""
+        self._stale.add(wallet)
+
 class SmartMoneyTracker:
-    def __init__(self, db_path: str = "data/smart_money_tracker.db"):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 batch_size: int = 200, flush_interval: float = 0.05,
+                 queue_size: int = 10000, window_sweep_interval: float = 300,
+                 score_interval: float = 10, full_rescore_interval: float = 900,
+                 recorder: Optional[FeedRecorder] = None,
+                 subscription_kwargs: Optional[Dict] = None,
+                 backpressure_kwargs: Optional[Dict] = None,
+                 dedupe_seconds: float = 600, metrics_port: Optional[int] = None,
+                 storage: Optional[Storage] = None, retention_days: float = 0,
+                 retention_interval: float = 3600):
         self.db_path = db_path
-        self.ws_url = "wss://pumpportal.fun/api/data"
+        # SQLite at db_path unless another backend is passed in
+        self.db = storage if storage is not None else SQLiteStorage(db_path)
+        self.ws_url = FEED_URL
+        
+        # Options for the SubscriptionManager that decides which account and
+        # token trade streams the reader follows
+        self.subscription_kwargs = subscription_kwargs or {}
+        
+        # Optional capture of every raw frame for replay and debugging
+        self.recorder = recorder
+        
+        # Ingest pipeline settings: the writer commits once per micro-batch,
+        # flushing when batch_size events are pending or flush_interval
+        # seconds have passed since the first one arrived
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        
+        # How often expired 24h/7d window values are flushed to `wallets`
+        self.window_sweep_interval = window_sweep_interval
+        self._windows_swept_once = False
+        
+        # Scores are recomputed in bulk every score_interval seconds, or
+        # immediately when an alert decision depends on them
+        self.score_interval = score_interval
+        
+        # Every wallet is rescored on this cadence so recency decays for
+        # wallets that stopped trading
+        self.full_rescore_interval = full_rescore_interval
+        
+        self.metrics = REGISTRY
+        self._queue_depth = self.metrics.gauge("ingest_queue_depth", "Events waiting for the writer")
+        self._events_received = self.metrics.counter("ingest_events_received_total", "Trade frames decoded by the reader")
+        self._events_processed = self.metrics.counter("ingest_events_processed_total", "Trades written to the database")
+        self._batch_size_last = self.metrics.gauge("ingest_batch_size", "Size of the last committed batch")
+        self._batch_latency = self.metrics.latency("ingest_batch_seconds", "Time to apply and commit one batch")
+        self._event_latency = self.metrics.latency("ingest_event_seconds", "Event received to committed")
+        
+        # Per-stage latency histograms, served at /metrics on metrics_port
+        self.metrics_port = metrics_port
+        # Names this process's profiles (SIGUSR1) in PROFILE_DIR
+        self.profile_label = "monitor"
+        self._frame_wait = self.metrics.latency(
+            "feed_frame_wait_seconds", "Frame received on the socket to picked up by the reader")
+        self._decode_latency = self.metrics.latency("ingest_decode_seconds", "JSON decode of one feed frame")
+        self._queue_wait = self.metrics.latency(
+            "ingest_queue_wait_seconds", "Frame received to picked up by the batch writer")
+        self._apply_latency = self.metrics.latency(
+            "ingest_apply_seconds", "SQL to apply one trade, alert checks included")
+        self._commit_latency = self.metrics.latency("ingest_commit_seconds", "Commit of one batch transaction")
+        self._alert_check_latency = self.metrics.latency("alert_check_seconds", "_check_alerts for one buy")
+        self._score_flush_latency = self.metrics.latency(
+            "scoring_flush_seconds", "Bulk rescore of the dirty wallets")
+        self._urgent_score_latency = self.metrics.latency(
+            "scoring_urgent_seconds", "Rescore of one wallet for an alert decision")
+        
+        # Per-wallet closed-position totals, kept in step with `positions`
+        self.wallet_stats = WalletStatsEngine()
+        
+        # FIFO lots of open positions by (wallet, token) for sell matching
+        self.open_positions = LotLedger()
+        
+        # Wallets whose performance_score needs recomputing
+        self.scores = ScoreScheduler(self.metrics)
+        # Active alert subscriptions by wallet
+        self.alert_index = AlertIndex()
+        
+        # Signatures already queued, so resent frames are dropped before any
+        # DB work (the trades.signature UNIQUE index remains the safety net)
+        self.recent_signatures = RecentSignatures(dedupe_seconds)
+        self._duplicates_dropped = self.metrics.counter(
+            "ingest_duplicates_dropped_total", "Frames dropped by the in-memory signature filter")
+        self._duplicates_db = self.metrics.counter(
+            "ingest_duplicates_db_total", "Trades ignored by the signature UNIQUE index")
+        
+        # What the reader does when the queue is full: block, shed low-value
+        # buys or spill to a journal next to the database
+        backpressure_kwargs = dict(backpressure_kwargs or {})
+        backpressure_kwargs.setdefault('spill_path', os.path.splitext(db_path)[0] + '.spill.jsonl')
+        self.backpressure = Backpressure(is_subscribed=self.alert_index.__contains__,
+                                         load_notable=self._wallets_scoring_at_least,
+                                         metrics=self.metrics, **backpressure_kwargs)
+        
+        # Alerts queued by the current batch, pushed to the bot after commit
+        self.alert_publisher: Optional[AlertPublisher] = None
+        self._batch_alerts: List[Dict] = []
+        # Receive time of the event being applied, for alert latency tracing
+        self._event_received_at: Optional[float] = None
+        
+        self._full_rescore_latency = self.metrics.latency("scoring_full_rescore_seconds", "Time to rescore every wallet")
+        self._full_rescore_writes = self.metrics.counter("scoring_full_rescore_rows_written_total", "Scores changed by full rescores")
+        
+        # Trades older than retention_days are rolled up into daily
+        # aggregates and deleted every retention_interval seconds (0 = keep all)
+        self.retention = TradeRetention(self.db, retention_days, metrics=self.metrics)
+        self.retention_interval = retention_interval
+        self._late_dropped = self.metrics.counter(
+            "ingest_late_dropped_total", "Trades older than the retention watermark")
+        
         self.init_database()
         
     def init_database(self):
         """Initialize database with schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.db.init_schema()
+        logger.info(f"Database initialized ({self.db.name})")
+        
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            self.wallet_stats.load(cursor, int(time.time()))
+            self.open_positions.load(cursor)
+            self.alert_index.load(cursor)
+            self.retention.load(cursor)
+    
+    def check_wallet_stats(self, repair: bool = True) -> List[Dict]:
+        """Verify in-memory wallet stats against the SQL aggregates
         
-        # Read and execute schema
-        with open('data/smart_money_tracker_schema.sql', 'r') as f:
-            schema = f.read()
-            cursor.executescript(schema)
+        Mismatching wallets are reloaded from SQL and their `wallets` row
+        rewritten unless repair is False. Returns the mismatches found.
+        """
+        with self.db.session() as cursor:
+            mismatches = self.wallet_stats.check_consistency(cursor)
+            if repair:
+                for wallet in {m['wallet'] for m in mismatches}:
+                    self.wallet_stats.invalidate(wallet)
+                    self._update_wallet_stats(cursor, wallet)
         
-        conn.commit()
-        conn.close()
-        logger.info(f"Database initialized at {self.db_path}")
+        for m in mismatches[:20]:
+            logger.warning(f"Wallet stats mismatch | {m['wallet'][:8]}... | "
+                           f"{m['field']}: memory={m['memory']} sql={m['sql']}")
+        return mismatches
     
-    def process_trade(self, event: Dict) -> bool:
+    def process_trade(self, event: Union[TradeEvent, Dict]) -> bool:
         """Process a trade event and update wallet performance"""
+        return self.process_batch([event]) == 1
+    
+    def process_batch(self, events: List[Union[TradeEvent, Dict]],
+                      received_at: Optional[List[float]] = None) -> int:
+        """Apply a batch of trade events in a single transaction
+        
+        Each event runs inside its own savepoint so a bad event is rolled
+        back on its own without losing the rest of the batch. Backends that
+        defer writes to commit (PostgreSQL) can only fail the whole batch
+        there; it is then retried one event per transaction. Decoded
+        message dicts are accepted too and converted to TradeEvents.
+        received_at, if given, holds each event's receive time (epoch
+        seconds) for alert latency tracing. Returns the number of trades
+        written.
+        """
+        processed = 0
+        if received_at is None:
+            received_at = [None] * len(events)
+        pairs = [(as_trade_event(event), received) for event, received in zip(events, received_at)]
+        pairs = [(event, received) for event, received in pairs if event is not None]
+        events = [event for event, _ in pairs]
+        
         try:
-            # Extract trade data
-            tx_type = event.get('txType')
-            if tx_type not in ['buy', 'sell']:
-                return False
-            
-            wallet = event.get('traderPublicKey')
-            token_addr = event.get('mint')
-            token_name = event.get('name', 'Unknown')
-            token_symbol = event.get('symbol', 'UNKNOWN')
-            sol_amount = float(event.get('solAmount', 0))
-            token_amount = float(event.get('tokenAmount', 0))
-            signature = event.get('signature')
-            timestamp = int(event.get('timestamp', time.time() * 1000)) // 1000
-            
-            # Get token price (SOL per token)
-            price = sol_amount / token_amount if token_amount > 0 else 0
-            
-            if not wallet or not token_addr or sol_amount <= 0:
-                return False
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Ensure wallet exists
-            self._ensure_wallet_exists(cursor, wallet, timestamp)
-            
-            # Insert trade
-            cursor.execute("""
-                INSERT OR IGNORE INTO trades 
-                (wallet_address, token_address, token_name, token_symbol, action, 
-                 amount_sol, amount_tokens, timestamp, price_at_trade, signature)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (wallet, token_addr, token_name, token_symbol, tx_type, 
-                  sol_amount, token_amount, timestamp, price, signature))
-            
-            trade_id = cursor.lastrowid
-            
-            # Handle position tracking
-            if tx_type == 'buy':
-                self._open_position(cursor, wallet, token_addr, token_name, token_symbol,
-                                  trade_id, timestamp, price, sol_amount, token_amount)
-            elif tx_type == 'sell':
-                self._close_position(cursor, wallet, token_addr, trade_id, 
-                                   timestamp, price, sol_amount, token_amount)
-            
-            # Update wallet stats
-            self._update_wallet_stats(cursor, wallet)
-            
-            # Calculate performance score
-            self._calculate_performance_score(cursor, wallet)
-            
-            # Check if we should trigger alerts
-            if tx_type == 'buy':
-                self._check_alerts(cursor, wallet, trade_id, sol_amount)
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"{tx_type.upper()} | {wallet[:8]}... | {token_symbol} | {sol_amount:.2f} SOL")
-            return True
+            with self.db.session() as cursor:
+                self._batch_alerts = []
+                
+                # Pick up /track and /untrack changes made since the last batch
+                self.alert_index.refresh(cursor)
+                cursor.prepare_trades([event.signature for event in events if event.signature])
+                
+                for event, self._event_received_at in pairs:
+                    cursor.savepoint()
+                    queued = len(self._batch_alerts)
+                    started = time.perf_counter()
+                    try:
+                        if self._apply_trade(cursor, event):
+                            processed += 1
+                        cursor.release()
+                    except Exception as e:
+                        cursor.rollback_to()
+                        del self._batch_alerts[queued:]
+                        self._invalidate_state([event])
+                        logger.error(f"Error processing trade: {e}")
+                    self._apply_latency.observe(time.perf_counter() - started)
+                
+                # Leaving the block commits
+                committing = time.perf_counter()
+            self._commit_latency.observe(time.perf_counter() - committing)
             
+            # alert_history rows are committed, so the bot can mark them sent
+            if self.alert_publisher is not None:
+                self.alert_publisher.publish(self._batch_alerts)
         except Exception as e:
-            logger.error(f"Error processing trade: {e}")
+            self._invalidate_state(events)
+            self._batch_alerts = []
+            self._event_received_at = None
+            if len(pairs) > 1:
+                logger.error(f"Error committing batch of {len(events)} events, retrying one at a time: {e}")
+                return sum(self.process_batch([event], [received]) for event, received in pairs)
+            logger.error(f"Error committing batch of {len(events)} events: {e}")
+            processed = 0
+        finally:
+            self._batch_alerts = []
+            self._event_received_at = None
+        
+        return processed
+    
+    def _invalidate_state(self, events: List[TradeEvent]):
+        """Force in-memory state for these events' wallets to reload from the DB
+        
+        Their signatures are forgotten too, so a resent frame is applied.
+        """
+        for event in events:
+            if event.signature:
+                self.recent_signatures.discard(event.signature)
+            wallet = event.wallet
+            if wallet:
+                self.wallet_stats.invalidate(wallet)
+                self.open_positions.invalidate(wallet)
+                self.scores.requeue([wallet])
+    
+    def _apply_trade(self, cursor, event: TradeEvent) -> bool:
+        """Write a single trade event using the batch cursor"""
+        # Extract trade data
+        tx_type = event.tx_type
+        wallet = event.wallet
+        token_addr = event.token
+        token_name = event.name
+        token_symbol = event.symbol
+        sol_amount = event.sol_amount
+        token_amount = event.token_amount
+        signature = event.signature
+        if event.timestamp_ms is not None:
+            timestamp = event.timestamp_ms // 1000
+        else:
+            timestamp = int(time.time())
+        
+        # Get token price (SOL per token)
+        price = sol_amount / token_amount if token_amount > 0 else 0
+        
+        if not wallet or not token_addr or sol_amount <= 0:
+            return False
+        
+        if timestamp < self.retention.compacted_before:
+            # Its day is already rolled up and its signature may be gone
+            self._late_dropped.inc()
+            return False
+        
+        # Ensure wallet exists
+        self._ensure_wallet_exists(cursor, wallet, timestamp)
+        
+        # Insert trade
+        trade_id = cursor.insert_trade(wallet, token_addr, token_name, token_symbol, tx_type,
+                                       sol_amount, token_amount, timestamp, price, signature)
+        if trade_id is None:
+            # Already stored, so apply nothing else
+            self._duplicates_db.inc()
             return False
+        
+        # Handle position tracking
+        if tx_type == 'buy':
+            self.wallet_stats.record_buy(cursor, wallet, timestamp, sol_amount, int(time.time()))
+            self._open_position(cursor, wallet, token_addr, token_name, token_symbol,
+                              trade_id, timestamp, price, sol_amount, token_amount)
+        elif tx_type == 'sell':
+            self._close_position(cursor, wallet, token_addr, trade_id, 
+                               timestamp, price, sol_amount, token_amount)
+        
+        # Update wallet stats
+        self._update_wallet_stats(cursor, wallet)
+        
+        # Defer performance score to the next bulk rescore
+        self.scores.mark_dirty(wallet)
+        
+        # Check if we should trigger alerts
+        if tx_type == 'buy':
+            started = time.perf_counter()
+            event_at = event.timestamp_ms / 1000 if event.timestamp_ms is not None else None
+            self._check_alerts(cursor, wallet, trade_id, sol_amount,
+                               token_addr, token_name, token_symbol, timestamp, event_at)
+            self._alert_check_latency.observe(time.perf_counter() - started)
+        
+        logger.info(f"{tx_type.upper()} | {wallet[:8]}... | {token_symbol} | {sol_amount:.2f} SOL")
+        return True
     
     def _ensure_wallet_exists(self, cursor, wallet: str, timestamp: int):
-        """Create wallet record if it doesn't exist"""
-        cursor.execute("""
-            INSERT OR IGNORE INTO wallets (address, first_seen, last_active)
-            VALUES (?, ?, ?)
-        """, (wallet, timestamp, timestamp))
-        
-        # Update last_active
-        cursor.execute("""
-            UPDATE wallets SET last_active = ? WHERE address = ?
-        """, (timestamp, wallet))
+        """Create wallet record if it doesn't exist and update last_active"""
+        cursor.ensure_wallet(wallet, timestamp)
     
     def _open_position(self, cursor, wallet: str, token: str, name: str, symbol: str,
                        trade_id: int, timestamp: int, price: float, sol: float, tokens: float):
         """Open a new position when wallet buys"""
-        cursor.execute("""
-            INSERT INTO positions 
-            (wallet_address, token_address, token_name, token_symbol, entry_trade_id,
-             entry_timestamp, entry_price, entry_amount_sol, entry_amount_tokens, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'open')
-        """, (wallet, token, name, symbol, trade_id, timestamp, price, sol, tokens))
+        position_id = cursor.open_position(wallet, token, name, symbol, trade_id,
+                                           timestamp, price, sol, tokens)
+        self.open_positions.add(wallet, token, Lot(position_id, timestamp, price, sol, tokens))
     
     def _close_position(self, cursor, wallet: str, token: str, trade_id: int,
                         timestamp: int, price: float, sol: float, tokens: float):
-        """Close existing position when wallet sells"""
-        # Find oldest open position for this wallet+token
-        cursor.execute("""
-            SELECT id, entry_timestamp, entry_price, entry_amount_sol, entry_amount_tokens
-            FROM positions
-            WHERE wallet_address = ? AND token_address = ? AND status = 'open'
-            ORDER BY entry_timestamp ASC
-            LIMIT 1
-        """, (wallet, token))
-        
-        position = cursor.fetchone()
-        if not position:
+        """Close or split open positions FIFO when wallet sells"""
+        fills = self.open_positions.match_sell(cursor, wallet, token, tokens, sol)
+        if not fills:
             logger.warning(f"No open position found for {wallet[:8]}... selling {token[:8]}...")
             return
         
-        pos_id, entry_ts, entry_price, entry_sol, entry_tokens = position
-        
-        # Calculate profit
-        profit_sol = sol - entry_sol
-        profit_percent = (profit_sol / entry_sol * 100) if entry_sol > 0 else 0
-        hold_time_mins = (timestamp - entry_ts) // 60
-        
-        # Update position
-        cursor.execute("""
-            UPDATE positions
-            SET exit_trade_id = ?, exit_timestamp = ?, exit_price = ?,
-                exit_amount_sol = ?, profit_sol = ?, profit_percent = ?,
-                hold_time_mins = ?, status = 'closed'
-            WHERE id = ?
-        """, (trade_id, timestamp, price, sol, profit_sol, profit_percent, hold_time_mins, pos_id))
+        now = int(time.time())
+        for fill in fills:
+            lot = fill.lot
+            
+            # Calculate profit on the matched slice
+            profit_sol = fill.profit_sol
+            profit_percent = (profit_sol / fill.entry_sol * 100) if fill.entry_sol > 0 else 0
+            hold_time_mins = (timestamp - lot.entry_timestamp) // 60
+            
+            if fill.closes_lot:
+                # Update position
+                cursor.close_position(lot.id, trade_id, timestamp, price, fill.exit_sol,
+                                      profit_sol, profit_percent, hold_time_mins)
+            else:
+                # Partial fill: record the sold slice as its own closed row
+                # and shrink the open row to what is left
+                cursor.split_position(lot.id, fill.entry_sol, fill.tokens, trade_id, timestamp,
+                                      price, fill.exit_sol, profit_sol, profit_percent,
+                                      hold_time_mins, lot.sol, lot.tokens)
+            
+            self.wallet_stats.record_close(cursor, wallet, profit_sol, hold_time_mins,
+                                           fill.entry_sol, timestamp, now)
     
     def _update_wallet_stats(self, cursor, wallet: str):
         """Update wallet statistics based on closed positions"""
-        # Count wins/losses
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN profit_sol > 0 THEN 1 ELSE 0 END) as wins,
-                SUM(CASE WHEN profit_sol <= 0 THEN 1 ELSE 0 END) as losses,
-                SUM(profit_sol) as total_profit,
-                AVG(hold_time_mins) as avg_hold
-            FROM positions
-            WHERE wallet_address = ? AND status = 'closed'
-        """, (wallet,))
-        
-        stats = cursor.fetchone()
-        if not stats or stats[0] == 0:
+        # Win/loss totals come from the incremental accumulator
+        stats = self.wallet_stats.get(cursor, wallet)
+        if stats.total == 0:
             return
         
-        total, wins, losses, total_profit, avg_hold = stats
+        total, wins, losses = stats.total, stats.wins, stats.losses
+        total_profit, avg_hold = stats.total_profit, stats.avg_hold
         
-        # Calculate 24h and 7d metrics
+        # 24h and 7d metrics from the hourly rolling windows
         now = int(time.time())
-        day_ago = now - 86400
-        week_ago = now - 604800
-        
-        # Volume metrics
-        cursor.execute("""
-            SELECT SUM(amount_sol) 
-            FROM trades 
-            WHERE wallet_address = ? AND action = 'buy' AND timestamp >= ?
-        """, (wallet, day_ago))
-        vol_24h = cursor.fetchone()[0] or 0
+        windows = self.wallet_stats.windows(cursor, wallet, now)
+        windows.written = windows.sums(now)
+        vol_24h, vol_7d, roi_24h, roi_7d = windows.written
         
-        cursor.execute("""
-            SELECT SUM(amount_sol)
-            FROM trades
-            WHERE wallet_address = ? AND action = 'buy' AND timestamp >= ?
-        """, (wallet, week_ago))
-        vol_7d = cursor.fetchone()[0] or 0
-        
-        # ROI metrics (profit from positions closed in period)
-        cursor.execute("""
-            SELECT SUM(profit_sol), SUM(entry_amount_sol)
-            FROM positions
-            WHERE wallet_address = ? AND status = 'closed' 
-                AND exit_timestamp >= ?
-        """, (wallet, day_ago))
-        roi_24h_data = cursor.fetchone()
-        roi_24h = (roi_24h_data[0] / roi_24h_data[1] * 100) if roi_24h_data[1] else 0
+        # Update wallet record
+        cursor.update_wallet_stats(wallet, total, wins, losses, total_profit, avg_hold,
+                                   vol_24h, vol_7d, roi_24h, roi_7d)
+    
+    def sweep_windows(self) -> int:
+        """Expire rolling windows and bulk-write changed values to `wallets`"""
+        now = int(time.time())
         
-        cursor.execute("""
-            SELECT SUM(profit_sol), SUM(entry_amount_sol)
-            FROM positions
-            WHERE wallet_address = ? AND status = 'closed'
-                AND exit_timestamp >= ?
-        """, (wallet, week_ago))
-        roi_7d_data = cursor.fetchone()
-        roi_7d = (roi_7d_data[0] / roi_7d_data[1] * 100) if roi_7d_data[1] else 0
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            
+            if not self._windows_swept_once:
+                # Wallets idle for over a week have no buckets in memory, so
+                # clear any window values they were left with before restart
+                cursor.execute("""
+                    UPDATE wallets
+                    SET volume_24h = 0, volume_7d = 0, roi_24h = 0, roi_7d = 0
+                    WHERE last_active < ?
+                        AND (volume_24h != 0 OR volume_7d != 0 OR roi_24h != 0 OR roi_7d != 0)
+                """, (now - 604800,))
+                self._windows_swept_once = True
+            
+            rows = self.wallet_stats.sweep(cursor, now)
+            cursor.executemany("""
+                UPDATE wallets
+                SET volume_24h = ?, volume_7d = ?, roi_24h = ?, roi_7d = ?
+                WHERE address = ?
+            """, rows)
         
-        # Update wallet record
-        cursor.execute("""
-            UPDATE wallets
-            SET total_trades = ?,
-                wins = ?,
-                losses = ?,
-                total_profit_sol = ?,
-                avg_hold_time_mins = ?,
-                volume_24h = ?,
-                volume_7d = ?,
-                roi_24h = ?,
-                roi_7d = ?
-            WHERE address = ?
-        """, (total, wins, losses, total_profit, avg_hold, vol_24h, vol_7d, 
-              roi_24h, roi_7d, wallet))
+        return len(rows)
     
     def _calculate_performance_score(self, cursor, wallet: str):
-        """Calculate 0-100 performance score for wallet"""
+        """Calculate 0-100 performance score for wallet right now"""
+        started = time.perf_counter()
+        self.scores.rescore(cursor, [wallet], urgent=True)
+        self._urgent_score_latency.observe(time.perf_counter() - started)
+    
+    def flush_scores(self) -> int:
+        """Rescore every dirty wallet in one transaction"""
+        wallets = []
+        started = time.perf_counter()
+        try:
+            with self.db.write() as conn:
+                wallets = self.scores.pending()
+                written = self.scores.rescore(conn.cursor(), wallets)
+        except Exception:
+            self.scores.requeue(wallets)
+            raise
+        if wallets:
+            self._score_flush_latency.observe(time.perf_counter() - started)
+        return written
+    
+    def rescore_all(self) -> int:
+        """Vectorized rescore of the whole wallets table"""
+        started = time.perf_counter()
+        scanned, written = rescore_all_wallets(self.db)
+        elapsed = time.perf_counter() - started
+        
+        self._full_rescore_latency.observe(elapsed)
+        self._full_rescore_writes.inc(written)
+        logger.info(f"Full rescore: {scanned} wallets, {written} changed in {elapsed:.2f}s")
+        return written
+    
+    def _check_alerts(self, cursor, wallet: str, trade_id: int, sol_amount: float,
+                      token_addr: str = '', token_name: str = 'Unknown',
+                      token_symbol: str = 'UNKNOWN', timestamp: Optional[int] = None,
+                      event_at: Optional[float] = None):
+        """Check if this trade should trigger any alerts"""
+        configs = [c for c in self.alert_index.get(wallet) if sol_amount >= c.min_buy_amount_sol]
+        if not configs:
+            return
+        
+        # The threshold decision needs an up-to-date score
+        if self.scores.is_dirty(wallet):
+            self._calculate_performance_score(cursor, wallet)
+        
         cursor.execute("""
-            SELECT total_trades, wins, losses, roi_7d, volume_7d, last_active
-            FROM wallets
-            WHERE address = ?
+            SELECT performance_score FROM wallets WHERE address = ?
         """, (wallet,))
+        score = cursor.fetchone()[0]
         
-        data = cursor.fetchone()
-        if not data or data[0] < 3:  # Need at least 3 trades
-            score = 0
-        else:
-            total, wins, losses, roi_7d, vol_7d, last_active = data
+        alerts = [(c.id, c.alert_type, c.destination)
+                  for c in configs if score >= c.min_performance_score]
+        if not alerts:
+            return
+        
+        # Queue alerts (durable record; also pushed to the bot after commit)
+        queued_at = time.time()
+        destinations = []
+        for alert_id, alert_type, destination in alerts:
+            history_id = cursor.queue_alert(alert_id, wallet, trade_id, queued_at,
+                                            event_at, self._event_received_at)
+            destinations.append({
+                'alert_id': history_id,
+                'alert_type': alert_type,
+                'chat_id': destination,
+            })
+        
+        # One payload per trade, rendered once by the bot for every subscriber
+        stats = self.wallet_stats.get(cursor, wallet)
+        self._batch_alerts.append({
+            'wallet': wallet,
+            'trade_id': trade_id,
+            'token_address': token_addr,
+            'token_name': token_name,
+            'token_symbol': token_symbol,
+            'amount_sol': sol_amount,
+            'wallet_score': score,
+            'win_rate': (stats.wins / stats.total * 100) if stats.total > 0 else 0,
+            'total_trades': stats.total,
+            'wins': stats.wins,
+            'losses': stats.losses,
+            'event_timestamp': timestamp,
+            'queued_at': queued_at,
+            'alerts': destinations,
+        })
+        
+        logger.info(f"🚨 ALERT QUEUED: {wallet[:8]}... (score: {score:.1f}) -> {len(alerts)} subscribers")
+    
+    async def monitor(self):
+        """Main monitoring loop - receive trades and hand them to the batch writer"""
+        if self.recorder is not None:
+            self.recorder.start()
+        try:
+            await self.run_pipeline(self._receive)
+        finally:
+            if self.recorder is not None:
+                await asyncio.to_thread(self.recorder.close)
+    
+    async def run_pipeline(self, source, publish_alerts: bool = True):
+        """Run the batch writer and background tasks while source(queue) feeds events
+        
+        Returns once the source is exhausted and every queued event is committed.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = []
+        server = await serve_metrics(self.metrics_port) if self.metrics_port else None
+        profiling = ProfilingControl(self.profile_label)
+        profiling.install()
+        if publish_alerts:
+            self.alert_publisher = AlertPublisher(metrics=self.metrics)
+            tasks.append(asyncio.create_task(self.alert_publisher.run()))
+        tasks.append(asyncio.create_task(self._write_batches(queue)))
+        tasks.append(asyncio.create_task(self.backpressure.run(queue)))
+        tasks.append(asyncio.create_task(self._report_metrics(queue)))
+        tasks.append(asyncio.create_task(self._sweep_windows_loop()))
+        tasks.append(asyncio.create_task(self._score_loop()))
+        tasks.append(asyncio.create_task(self._full_rescore_loop()))
+        if self.retention.horizon_days:
+            tasks.append(asyncio.create_task(self._retention_loop()))
+        for task in tasks:
+            task.add_done_callback(self._log_task_failure)
+        
+        try:
+            await source(queue)
+            await self.backpressure.drain()
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if server is not None:
+                server.close()
+            profiling.uninstall()
+    
+    @staticmethod
+    def _log_task_failure(task: asyncio.Task):
+        """Surface a background task that died instead of letting it fail silently"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+    
+    def decode(self, message) -> Optional[TradeEvent]:
+        """Decode one feed frame (None for non-trade frames and bad JSON)"""
+        started = time.perf_counter()
+        event = decode_trade(message)
+        self._decode_latency.observe(time.perf_counter() - started)
+        return event
+    
+    async def _receive(self, queue: asyncio.Queue):
+        """Reader stage - enqueue decoded events from the subscribed feed connections"""
+        subscriptions = SubscriptionManager(self.db, self.ws_url, recorder=self.recorder,
+                                            **self.subscription_kwargs)
+        async for received, message in subscriptions.feed():
+            now = time.time()
+            self._frame_wait.observe(now - received)
+            # Socket receive time on the writer's perf_counter clock, so the
+            # alert trace includes frame wait and decode
+            arrived = time.perf_counter() - (now - received)
+            event = self.decode(message)
+            if event is None:
+                continue
             
-            # Win rate component (40%)
-            win_rate = (wins / total * 100) if total > 0 else 0
-            win_score = win_rate * 0.4
+            self._events_received.inc()
+            await self.enqueue(queue, arrived, event)
+    
+    async def enqueue(self, queue: asyncio.Queue, received: float, event: TradeEvent):
+        """Hand an event to the writer, applying the backpressure policy"""
+        if event.signature and not self.recent_signatures.add(event.signature):
+            self._duplicates_dropped.inc()
+            return
+        await self.backpressure.put(queue, (received, event))
+    
+    def _wallets_scoring_at_least(self, score: float) -> Set[str]:
+        """Wallets whose stored performance_score is at least `score`"""
+        with self.db.read() as conn:
+            rows = conn.execute("""
+                SELECT address FROM wallets WHERE performance_score >= ?
+            """, (score,)).fetchall()
+        return {address for (address,) in rows}
+    
+    async def _write_batches(self, queue: asyncio.Queue):
+        """Writer stage - drain (received_at, event) items in micro-batches, one transaction each"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
             
-            # ROI component (30%) - normalize to 0-100
-            roi_score = min(max(roi_7d / 10, 0), 100) * 0.3
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
             
-            # Volume component (15%) - normalize (50 SOL = 100 points)
-            vol_score = min(vol_7d / 50 * 100, 100) * 0.15
+            self._queue_depth.set(queue.qsize())
             
-            # Recency bonus (15%)
-            now = int(time.time())
-            if last_active >= now - 86400:  # Active in last 24h
-                recency_score = 100 * 0.15
-            elif last_active >= now - 604800:  # Active in last 7d
-                recency_score = 50 * 0.15
-            else:
-                recency_score = 0
+            # Commit off the event loop so fsyncs never stall the reader
+            started = time.perf_counter()
+            for received, _ in batch:
+                self._queue_wait.observe(started - received)
+            wall_offset = time.time() - started
+            try:
+                processed = await asyncio.to_thread(
+                    self.process_batch, [event for _, event in batch],
+                    [wall_offset + received for received, _ in batch])
+            except Exception as e:
+                logger.error(f"Error writing batch: {e}")
+                processed = 0
             
-            score = win_score + roi_score + vol_score + recency_score
-        
-        cursor.execute("""
-            UPDATE wallets SET performance_score = ? WHERE address = ?
-        """, (score, wallet))
+            committed = time.perf_counter()
+            self._batch_latency.observe(committed - started)
+            self._batch_size_last.set(len(batch))
+            self._events_processed.inc(processed)
+            for received, _ in batch:
+                self._event_latency.observe(committed - received)
+                queue.task_done()
     
-    def _check_alerts(self, cursor, wallet: str, trade_id: int, sol_amount: float):
-        """Check if this trade should trigger any alerts"""
-        cursor.execute("""
-            SELECT ac.id, ac.alert_type, ac.alert_destination, w.performance_score
-            FROM alert_configs ac
-            JOIN wallets w ON ac.wallet_address = w.address
-            WHERE ac.wallet_address = ? 
-                AND ac.is_active = 1
-                AND w.performance_score >= ac.min_performance_score
-                AND ? >= ac.min_buy_amount_sol
-        """, (wallet, sol_amount))
-        
-        alerts = cursor.fetchall()
-        for alert_id, alert_type, destination, score in alerts:
-            # Queue alert (will be processed by separate alert service)
-            cursor.execute("""
-                INSERT INTO alert_history (alert_config_id, wallet_address, trade_id, sent_at, status)
-                VALUES (?, ?, ?, ?, 'queued')
-            """, (alert_id, wallet, trade_id, int(time.time())))
-            
-            logger.info(f"🚨 ALERT QUEUED: {wallet[:8]}... (score: {score:.1f}) -> {alert_type}")
+    async def _sweep_windows_loop(self):
+        """Periodically expire 24h/7d windows for wallets that stopped trading"""
+        while True:
+            try:
+                updated = await asyncio.to_thread(self.sweep_windows)
+                if updated:
+                    logger.info(f"Window sweep updated {updated} wallets")
+            except Exception as e:
+                logger.error(f"Error sweeping rolling windows: {e}")
+            await asyncio.sleep(self.window_sweep_interval)
     
-    async def monitor(self):
-        """Main monitoring loop - connect to WebSocket and process trades"""
-        subscription_payload = {
-            "method": "subscribeNewToken"
-        }
-        
+    async def _score_loop(self):
+        """Rescore dirty wallets on a fixed cadence"""
+        while True:
+            await asyncio.sleep(self.score_interval)
+            try:
+                await asyncio.to_thread(self.flush_scores)
+            except Exception as e:
+                logger.error(f"Error rescoring wallets: {e}")
+    
+    async def _full_rescore_loop(self):
+        """Periodically rescore every wallet"""
+        while True:
+            await asyncio.sleep(self.full_rescore_interval)
+            try:
+                await asyncio.to_thread(self.rescore_all)
+            except Exception as e:
+                logger.error(f"Error during full rescore: {e}")
+    
+    async def _retention_loop(self):
+        """Periodically roll up and delete trades past the retention horizon"""
         while True:
             try:
-                async with websockets.connect(self.ws_url) as websocket:
-                    await websocket.send(json.dumps(subscription_payload))
-                    logger.info("Connected to pump.fun WebSocket, monitoring trades...")
-                    
-                    async for message in websocket:
-                        try:
-                            event = json.loads(message)
-                            self.process_trade(event)
-                        except json.JSONDecodeError:
-                            continue
-                        except Exception as e:
-                            logger.error(f"Error processing message: {e}")
-                            
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("WebSocket connection closed, reconnecting in 5s...")
-                await asyncio.sleep(5)
+                await asyncio.to_thread(self.retention.run_once)
             except Exception as e:
-                logger.error(f"WebSocket error: {e}, reconnecting in 10s...")
-                await asyncio.sleep(10)
+                logger.error(f"Error compacting old trades: {e}")
+            await asyncio.sleep(self.retention_interval)
+    
+    async def _report_metrics(self, queue: asyncio.Queue, interval: float = 60):
+        """Periodically log ingest pipeline metrics"""
+        while True:
+            await asyncio.sleep(interval)
+            self._queue_depth.set(queue.qsize())
+            logger.info(
+                f"Ingest | queue: {queue.qsize()} | "
+                f"received: {self._events_received.value} | "
+                f"processed: {self._events_processed.value} | "
+                f"batches: {self._batch_latency.count} | "
+                f"batch avg: {self._batch_latency.mean * 1000:.1f}ms | "
+                f"batch max: {self._batch_latency.max * 1000:.1f}ms"
+            )
+            snapshot = self.metrics.snapshot()
+            logger.info(
+                f"Scoring | dirty: {snapshot['scoring_dirty_wallets']} | "
+                f"writes/trade: {snapshot['scoring_writes_per_trade']:.3f} | "
+                f"urgent: {snapshot['scoring_urgent_rescores_total']} | "
+                f"lag avg: {snapshot['scoring_visible_lag_seconds_mean']:.1f}s | "
+                f"lag max: {snapshot['scoring_visible_lag_seconds_max']:.1f}s"
+            )
 
     def get_leaderboard(self, limit: int = 20) -> List[Dict]:
         """Get top performing wallets"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT address, performance_score, total_trades, wins, losses, 
-                   total_profit_sol, roi_7d, volume_7d, last_active
-            FROM wallets
-            WHERE total_trades >= 5
-            ORDER BY performance_score DESC
-            LIMIT ?
-        """, (limit,))
+        with self.db.read() as conn:
+            rows = conn.execute("""
+                SELECT address, performance_score, total_trades, wins, losses, 
+                       total_profit_sol, roi_7d, volume_7d, last_active
+                FROM wallets
+                WHERE total_trades >= 5
+                ORDER BY performance_score DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
         
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
                 'address': row[0],
                 'score': round(row[1], 1),
@@ -351,9 +860,74 @@ class SmartMoneyTracker:
                 'last_active': row[8]
             })
         
-        conn.close()
         return results
 
+async def monitor_sharded(ingest: ShardedIngest, recorder: Optional[FeedRecorder] = None,
+                          subscription_kwargs: Optional[Dict] = None):
+    """Sharded monitor - the feed reader routes frames to per-shard worker processes"""
+    frame_wait = REGISTRY.latency(
+        "feed_frame_wait_seconds", "Frame received on the socket to picked up by the reader")
+    
+    async def source(ingest: ShardedIngest):
+        subscriptions = SubscriptionManager(get_database(ingest.db_path, ingest.shards),
+                                            recorder=recorder, **(subscription_kwargs or {}))
+        async for received, message in subscriptions.feed():
+            frame_wait.observe(time.time() - received)
+            await ingest.dispatch(message, received)
+    
+    if recorder is not None:
+        recorder.start()
+    profiling = ProfilingControl("reader")
+    profiling.install()
+    try:
+        await ingest.run(source)
+    finally:
+        profiling.uninstall()
+        if recorder is not None:
+            await asyncio.to_thread(recorder.close)
+
 if __name__ == "__main__":
-    tracker = SmartMoneyTracker()
-    asyncio.run(tracker.monitor())
+    tracker_kwargs = dict(
+        batch_size=int(os.getenv("INGEST_BATCH_SIZE", "200")),
+        flush_interval=float(os.getenv("INGEST_FLUSH_MS", "50")) / 1000,
+        queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "10000")),
+        window_sweep_interval=float(os.getenv("WINDOW_SWEEP_SECONDS", "300")),
+        score_interval=float(os.getenv("SCORE_INTERVAL_SECONDS", "10")),
+        full_rescore_interval=float(os.getenv("FULL_RESCORE_SECONDS", "900")),
+        retention_days=float(os.getenv("RETENTION_DAYS", "0")),
+        retention_interval=float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600")),
+        backpressure_kwargs=dict(
+            policy=os.getenv("INGEST_OVERFLOW_POLICY", "block"),
+            shed_watermark=float(os.getenv("INGEST_SHED_WATERMARK", "0.8")),
+            shed_max_sol=float(os.getenv("INGEST_SHED_MAX_SOL", "0.5")),
+            shed_max_score=float(os.getenv("INGEST_SHED_MAX_SCORE", "50")),
+            spill_sync=os.getenv("INGEST_SPILL_FSYNC", "0") == "1",
+        ),
+    )
+    recorder = FeedRecorder(
+        os.getenv("FEED_RECORD_DIR"),
+        segment_seconds=float(os.getenv("FEED_SEGMENT_SECONDS", "3600")),
+    ) if os.getenv("FEED_RECORD_DIR") else None
+    subscription_kwargs = dict(
+        keys_per_connection=int(os.getenv("FEED_KEYS_PER_CONNECTION", "500")),
+        batch_size=int(os.getenv("FEED_SUBSCRIBE_BATCH", "100")),
+        refresh_interval=float(os.getenv("FEED_REFRESH_SECONDS", "30")),
+        max_hot_tokens=int(os.getenv("FEED_HOT_TOKENS", "200")),
+        hot_token_seconds=float(os.getenv("FEED_HOT_TOKEN_SECONDS", "900")),
+    )
+    
+    # /metrics listener; shard workers take the ports after it
+    metrics_port = int(os.getenv("METRICS_PORT", "0")) or None
+    
+    shards = int(os.getenv("INGEST_SHARDS", "1"))
+    if shards > 1 and STORAGE_URL and not STORAGE_URL.startswith("sqlite:"):
+        raise SystemExit("INGEST_SHARDS splits SQLite files; leave it at 1 with a PostgreSQL STORAGE_URL")
+    if shards > 1:
+        ingest = ShardedIngest(DEFAULT_DB_PATH, shards, tracker_kwargs=tracker_kwargs,
+                               metrics_port=metrics_port)
+        asyncio.run(monitor_sharded(ingest, recorder, subscription_kwargs))
+    else:
+        tracker = SmartMoneyTracker(recorder=recorder, subscription_kwargs=subscription_kwargs,
+                                    metrics_port=metrics_port, storage=get_storage(STORAGE_URL, shards=1),
+                                    **tracker_kwargs)
+        asyncio.run(tracker.monitor())
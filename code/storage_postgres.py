@@ -0,0 +1,471 @@
+"""
+Smart Money Tracker - PostgreSQL Storage
+asyncpg-backed Storage for deployments with concurrent writers
+
+One asyncpg pool runs on a private event loop thread. The bot and
+dashboard await it from their own loops; the monitor's writer thread and
+the shared sync helpers block on it through DB-API style adapters.
+
+Ingest sessions buffer the per-trade writes instead of sending one
+statement per row. Trade, position and alert ids are reserved in blocks
+from their sequences so callers still get ids back immediately. At commit
+(or before any read that might see them) the buffer is flushed as:
+
+    wallets     one executemany of INSERT ... ON CONFLICT DO UPDATE
+    trades      COPY into a temp staging table, then INSERT ... SELECT
+    positions   one executemany per kind of position and stats write
+    the rest    executemany per run of identical statements, in order
+
+Each kind only depends on rows written by the kinds before it, so a
+batch costs a fixed number of round trips however its events interleave.
+
+Signatures already stored are looked up once per batch (prepare_trades),
+so duplicate frames are still reported as duplicates without a round
+trip per trade. Constraint errors, including a signature another writer
+stored since that lookup, surface at flush time and fail the whole
+transaction; the monitor then retries that batch one event per
+transaction, so as on SQLite only the bad event is lost.
+
+Sync writers (write, write_for, session) take turns on one lock, like
+db.Database's single writer connection.
+"""
+
+import asyncio
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import logging
+
+try:
+    import asyncpg
+except ImportError:  # optional: only needed for STORAGE_URL=postgresql://...
+    asyncpg = None
+
+from storage import (CLOSE_POSITION, INSERT_CLOSED_SLICE, SHRINK_POSITION, UPDATE_WALLET_STATS,
+                     UPSERT_WALLET, Storage)
+
+logger = logging.getLogger(__name__)
+
+PG_SCHEMA_PATH = Path(__file__).resolve().parent.parent / "data" / "smart_money_tracker_schema.pg.sql"
+
+ID_BLOCK = 512                      # ids reserved per sequence round trip
+SCHEMA_LOCK = 0x534d54              # advisory lock serializing init_schema across processes
+
+TRADE_INSERT_COLUMNS = ("id", "wallet_address", "token_address", "token_name", "token_symbol", "action",
+                        "amount_sol", "amount_tokens", "timestamp", "price_at_trade", "signature")
+
+# Per-connection staging table for COPY; emptied after every flush
+CREATE_TRADE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS trades_staging (
+        id BIGINT, wallet_address TEXT, token_address TEXT, token_name TEXT, token_symbol TEXT,
+        action TEXT, amount_sol DOUBLE PRECISION, amount_tokens DOUBLE PRECISION,
+        timestamp BIGINT, price_at_trade DOUBLE PRECISION, signature TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+OPEN_POSITION = """
+    INSERT INTO positions
+    (id, wallet_address, token_address, token_name, token_symbol, entry_trade_id,
+     entry_timestamp, entry_price, entry_amount_sol, entry_amount_tokens, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'open')
+"""
+
+QUEUE_ALERT = """
+    INSERT INTO alert_history (id, alert_config_id, wallet_address, trade_id, sent_at, status,
+                               event_at, received_at, queued_at)
+    VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)
+"""
+
+# Named session writes, flushed in this order after wallets and trades.
+# Slices read only entry columns, which shrinks and closes never touch.
+BUFFERED_SQL = {
+    "positions": OPEN_POSITION,
+    "slices": INSERT_CLOSED_SLICE,
+    "shrinks": SHRINK_POSITION,
+    "closes": CLOSE_POSITION,
+    "stats": UPDATE_WALLET_STATS,
+    "alerts": QUEUE_ALERT,
+}
+BUFFERS = ("wallets", "trades", *BUFFERED_SQL, "ops")
+
+PLACEHOLDER = re.compile(r"\?")
+CREDENTIALS = re.compile(r"//[^/@]*@")
+
+
+@lru_cache(maxsize=512)
+def translate(sql: str) -> str:
+    """? placeholders to asyncpg's $1, $2, ..."""
+    count = iter(range(1, 1 << 16))
+    return PLACEHOLDER.sub(lambda _: f"${next(count)}", sql)
+
+
+def returns_rows(sql: str) -> bool:
+    head = sql.lstrip()[:6].upper()
+    return head in ("SELECT", "VALUES") or head.startswith("WITH") or " RETURNING " in sql.upper()
+
+
+def status_rowcount(status: str) -> int:
+    """Rows affected from a command tag such as 'UPDATE 3' or 'INSERT 0 1'"""
+    last = status.rsplit(" ", 1)[-1]
+    return int(last) if last.isdigit() else -1
+
+
+class PostgresConnection:
+    """DB-API style view of one pooled asyncpg connection for sync callers
+
+    execute() returns the connection itself, so both conn.execute(...)
+    .fetchall() and cursor-style use work. Rows come back as tuples.
+    """
+
+    def __init__(self, storage: "PostgresStorage", conn):
+        self._storage = storage
+        self._conn = conn
+        self._rows: List[tuple] = []
+        self._next = 0
+        self.rowcount = -1
+
+    def cursor(self, *args) -> "PostgresConnection":
+        return self
+
+    def _run(self, coro):
+        return self._storage._call(coro)
+
+    def _query(self, sql: str, params: Sequence) -> "PostgresConnection":
+        self._rows = [tuple(row) for row in self._run(self._conn.fetch(translate(sql), *params))]
+        self._next = 0
+        self.rowcount = len(self._rows)
+        return self
+
+    def execute(self, sql: str, params: Sequence = ()) -> "PostgresConnection":
+        if returns_rows(sql):
+            return self._query(sql, params)
+        status = self._run(self._conn.execute(translate(sql), *params))
+        self._rows, self._next = [], 0
+        self.rowcount = status_rowcount(status)
+        return self
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> "PostgresConnection":
+        rows = [tuple(row) for row in rows]
+        if rows:
+            self._run(self._conn.executemany(translate(sql), rows))
+        self.rowcount = len(rows)
+        return self
+
+    def fetchone(self) -> Optional[tuple]:
+        if self._next >= len(self._rows):
+            return None
+        self._next += 1
+        return self._rows[self._next - 1]
+
+    def fetchall(self) -> List[tuple]:
+        rows = self._rows[self._next:]
+        self._next = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class PostgresSession(PostgresConnection):
+    """Ingest cursor that buffers writes and flushes them in bulk
+
+    Any query flushes first, so reads always see this session's writes.
+    A savepoint is only sent to the server if a flush happens while it is
+    open; otherwise rolling back just truncates the buffer.
+    """
+
+    def __init__(self, storage: "PostgresStorage", conn):
+        super().__init__(storage, conn)
+        self._buffers: Dict[str, list] = {kind: [] for kind in BUFFERS}
+        # Signatures stored or buffered, and the ones already looked up
+        self._signatures: Set[str] = set()
+        self._checked: Set[str] = set()
+        # Open savepoint: buffer lengths when it was taken, signatures added
+        # since, and whether it has been sent to the server
+        self._mark: Optional[Tuple[int, ...]] = None
+        self._mark_signatures: List[str] = []
+        self._mark_sent = False
+
+    def _flush_parts(self, parts: Dict[str, list]):
+        if parts["wallets"]:
+            # Same result as upserting one by one: first_seen from the first
+            # occurrence, last_active from the last
+            latest: Dict[str, Tuple[str, int, int]] = {}
+            for wallet, first_seen, last_active in parts["wallets"]:
+                seen = latest.get(wallet)
+                latest[wallet] = (wallet, seen[1] if seen else first_seen, last_active)
+            self._run(self._conn.executemany(translate(UPSERT_WALLET), list(latest.values())))
+        if parts["trades"]:
+            self._run(self._copy_trades(parts["trades"]))
+        for kind, sql in BUFFERED_SQL.items():
+            rows = parts[kind]
+            if kind == "stats":
+                # Stats are absolute totals, so only each wallet's last one counts
+                rows = list({row[-1]: row for row in rows}.values())
+            if rows:
+                self._run(self._conn.executemany(translate(sql), rows))
+        ops = parts["ops"]
+        start = 0
+        while start < len(ops):
+            sql = ops[start][0]
+            end = start
+            while end < len(ops) and ops[end][0] == sql:
+                end += 1
+            self._run(self._conn.executemany(sql, [args for _, args in ops[start:end]]))
+            start = end
+
+    async def _copy_trades(self, trades: List[tuple]):
+        await self._conn.copy_records_to_table("trades_staging", records=trades,
+                                               columns=TRADE_INSERT_COLUMNS)
+        columns = ", ".join(TRADE_INSERT_COLUMNS)
+        # No ON CONFLICT: a signature another writer stored after
+        # prepare_trades must fail the batch, since rows buffered since point
+        # at the id reserved for it. The per-event retry then sees a duplicate.
+        await self._conn.execute(f"""
+            INSERT INTO trades ({columns})
+            SELECT {columns} FROM trades_staging
+        """)
+        await self._conn.execute("TRUNCATE trades_staging")
+
+    def flush(self):
+        """Send everything buffered so far"""
+        buffers = self._buffers
+        if self._mark is not None and not self._mark_sent:
+            self._flush_parts({kind: buffers[kind][:n] for kind, n in zip(BUFFERS, self._mark)})
+            self._run(self._conn.execute("SAVEPOINT trade"))
+            self._mark_sent = True
+            self._flush_parts({kind: buffers[kind][n:] for kind, n in zip(BUFFERS, self._mark)})
+        else:
+            self._flush_parts(buffers)
+        self._buffers = {kind: [] for kind in BUFFERS}
+
+    def execute(self, sql: str, params: Sequence = ()) -> "PostgresSession":
+        if returns_rows(sql):
+            self.flush()
+            return self._query(sql, params)
+        self._buffers["ops"].append((translate(sql), tuple(params)))
+        self.rowcount = -1
+        return self
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> "PostgresSession":
+        sql = translate(sql)
+        self._buffers["ops"].extend((sql, tuple(row)) for row in rows)
+        self.rowcount = -1
+        return self
+
+    def savepoint(self):
+        self._mark = tuple(len(self._buffers[kind]) for kind in BUFFERS)
+        self._mark_signatures = []
+        self._mark_sent = False
+
+    def release(self):
+        if self._mark_sent:
+            self._run(self._conn.execute("RELEASE SAVEPOINT trade"))
+        self._mark = None
+
+    def rollback_to(self):
+        if self._mark_sent:
+            # Everything buffered since the flush belongs to this savepoint too
+            self._buffers = {kind: [] for kind in BUFFERS}
+            self._run(self._conn.execute("ROLLBACK TO SAVEPOINT trade"))
+            self._run(self._conn.execute("RELEASE SAVEPOINT trade"))
+        elif self._mark is not None:
+            for kind, n in zip(BUFFERS, self._mark):
+                del self._buffers[kind][n:]
+        self._signatures.difference_update(self._mark_signatures)
+        self._mark = None
+
+    def prepare_trades(self, signatures: Iterable[str]):
+        """Look up which of these signatures are already stored, in one query"""
+        pending = [s for s in set(signatures) if s and s not in self._checked]
+        if not pending:
+            return
+        rows = self._run(self._conn.fetch(
+            "SELECT signature FROM trades WHERE signature = ANY($1::text[])", pending))
+        self._signatures.update(row[0] for row in rows)
+        self._checked.update(pending)
+
+    def ensure_wallet(self, wallet: str, timestamp: int):
+        self._buffers["wallets"].append((wallet, timestamp, timestamp))
+
+    def insert_trade(self, wallet: str, token: str, name: str, symbol: str, action: str,
+                     sol: float, tokens: float, timestamp: int, price: float,
+                     signature: Optional[str]) -> Optional[int]:
+        """New trade's id, None if its signature is already stored"""
+        if signature:
+            if signature not in self._checked:
+                self.prepare_trades([signature])
+            if signature in self._signatures:
+                return None
+            self._signatures.add(signature)
+            self._mark_signatures.append(signature)
+        trade_id = self._storage.reserve_id("trades")
+        self._buffers["trades"].append((trade_id, wallet, token, name, symbol, action, float(sol),
+                             float(tokens), timestamp, float(price), signature))
+        return trade_id
+
+    def open_position(self, wallet: str, token: str, name: str, symbol: str, trade_id: int,
+                      timestamp: int, price: float, sol: float, tokens: float) -> int:
+        position_id = self._storage.reserve_id("positions")
+        self._buffers["positions"].append((position_id, wallet, token, name, symbol, trade_id,
+                                           timestamp, float(price), float(sol), float(tokens)))
+        return position_id
+
+    def close_position(self, position_id: int, trade_id: int, timestamp: int, price: float,
+                       exit_sol: float, profit_sol: float, profit_percent: float, hold_time_mins: int):
+        self._buffers["closes"].append((trade_id, timestamp, float(price), float(exit_sol),
+                                        float(profit_sol), float(profit_percent), hold_time_mins,
+                                        position_id))
+
+    def split_position(self, position_id: int, entry_sol: float, tokens: float, trade_id: int,
+                       timestamp: int, price: float, exit_sol: float, profit_sol: float,
+                       profit_percent: float, hold_time_mins: int,
+                       remaining_sol: float, remaining_tokens: float):
+        self._buffers["slices"].append((float(entry_sol), float(tokens), trade_id, timestamp,
+                                        float(price), float(exit_sol), float(profit_sol),
+                                        float(profit_percent), hold_time_mins, position_id))
+        self._buffers["shrinks"].append((float(remaining_sol), float(remaining_tokens), position_id))
+
+    def update_wallet_stats(self, wallet: str, total: int, wins: int, losses: int,
+                            total_profit: float, avg_hold: Optional[float], vol_24h: float,
+                            vol_7d: float, roi_24h: float, roi_7d: float):
+        self._buffers["stats"].append((total, wins, losses, float(total_profit),
+                                       None if avg_hold is None else float(avg_hold),
+                                       float(vol_24h), float(vol_7d), float(roi_24h),
+                                       float(roi_7d), wallet))
+
+    def queue_alert(self, config_id: int, wallet: str, trade_id: int, queued_at: float,
+                    event_at: Optional[float], received_at: Optional[float]) -> int:
+        alert_id = self._storage.reserve_id("alert_history")
+        self._buffers["alerts"].append((alert_id, config_id, wallet, trade_id, int(queued_at),
+                                        event_at, received_at, queued_at))
+        return alert_id
+
+
+class PostgresStorage(Storage):
+    """Storage on PostgreSQL through an asyncpg connection pool"""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10,
+                 schema: Optional[str] = None):
+        if asyncpg is None:
+            raise RuntimeError("PostgreSQL storage needs asyncpg (pip install asyncpg)")
+        self.dsn = dsn
+        self.name = CREDENTIALS.sub("//", dsn)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="postgres", daemon=True)
+        self._thread.start()
+        settings = {"search_path": schema} if schema else None
+        self._pool = self._call(self._create_pool(
+            dsn=dsn, min_size=min_size, max_size=max_size, server_settings=settings))
+        self._ids: Dict[str, Deque[int]] = {}
+        self._ids_lock = threading.Lock()
+        # One sync writer at a time, as with db.Database: the monitor's
+        # periodic jobs share in-memory state with ingest and rely on it
+        self._write_lock = threading.RLock()
+
+    @staticmethod
+    async def _init_connection(conn):
+        await conn.execute(CREATE_TRADE_STAGING)
+
+    async def _create_pool(self, **kwargs):
+        # The pool binds to the loop it is created on
+        return await asyncpg.create_pool(init=self._init_connection, **kwargs)
+
+    async def _acquire(self):
+        return await self._pool.acquire()
+
+    def _call(self, coro):
+        """Run a coroutine on the pool's loop and wait for it (sync callers)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _await(self, coro):
+        """Run a coroutine on the pool's loop (async callers on another loop)"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def reserve_id(self, table: str) -> int:
+        """Next id for a BIGSERIAL table, from a block reserved in one round trip"""
+        with self._ids_lock:
+            ids = self._ids.get(table)
+            if not ids:
+                rows = self._call(self._pool.fetch(
+                    "SELECT nextval(pg_get_serial_sequence($1, 'id')) FROM generate_series(1, $2)",
+                    table, ID_BLOCK))
+                ids = self._ids[table] = deque(row[0] for row in rows)
+            return ids.popleft()
+
+    @contextmanager
+    def read(self) -> Iterator[PostgresConnection]:
+        conn = self._call(self._acquire())
+        try:
+            yield PostgresConnection(self, conn)
+        finally:
+            self._call(self._pool.release(conn))
+
+    @contextmanager
+    def _transaction(self, adapter) -> Iterator:
+        with self._write_lock:
+            conn = self._call(self._acquire())
+            transaction = conn.transaction()
+            try:
+                self._call(transaction.start())
+                try:
+                    cursor = adapter(self, conn)
+                    yield cursor
+                    if isinstance(cursor, PostgresSession):
+                        cursor.flush()
+                except BaseException:
+                    self._call(transaction.rollback())
+                    raise
+                self._call(transaction.commit())
+            finally:
+                self._call(self._pool.release(conn))
+
+    def write(self):
+        return self._transaction(PostgresConnection)
+
+    def write_for(self, wallet: str):
+        return self._transaction(PostgresConnection)
+
+    def session(self):
+        return self._transaction(PostgresSession)
+
+    def init_schema(self, schema_path: Path = PG_SCHEMA_PATH):
+        """Create tables and indexes if they don't exist (one process at a time)"""
+        with open(schema_path, 'r') as f:
+            schema = f.read()
+        with self.write() as conn:
+            conn.execute(f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK})")
+            self._call(conn._conn.execute(schema))
+
+    def close(self):
+        self._call(self._pool.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _fetch_rows(self, sql: str, params: Sequence) -> List[tuple]:
+        return [tuple(row) for row in await self._pool.fetch(translate(sql), *params)]
+
+    async def _transact_rows(self, statements: Sequence[Tuple[str, Sequence]]) -> List[int]:
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                return [status_rowcount(await conn.execute(translate(sql), *params))
+                        for sql, params in statements]
+
+    async def _executemany_rows(self, sql: str, rows: Sequence[Sequence]):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(translate(sql), rows)
+
+    async def _fetch(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        return await self._await(self._fetch_rows(sql, params))
+
+    async def _transact(self, wallet: str, statements: Sequence[Tuple[str, Sequence]]) -> List[int]:
+        return await self._await(self._transact_rows(statements))
+
+    async def _executemany(self, wallet: str, sql: str, rows: Sequence[Sequence]):
+        if rows:
+            await self._await(self._executemany_rows(sql, rows))
@@ -0,0 +1,318 @@
+"""
+Smart Money Tracker - Feed Subscriptions
+Keep pump.fun trade subscriptions in step with what the tracker needs
+
+PumpPortal only sends trades for keys that were subscribed on the same
+connection:
+
+    {"method": "subscribeAccountTrade", "keys": ["<wallet>", ...]}
+    {"method": "subscribeTokenTrade", "keys": ["<mint>", ...]}
+
+The manager subscribes every wallet with an active alert or is_tracked = 1
+and a bounded set of hot tokens (recent launches plus the most traded
+tokens of the last window). It periodically diffs that against what is
+subscribed and sends batched subscribe/unsubscribe calls. Keys are spread
+over as many connections as the per-connection limit requires, and each
+connection re-sends its whole key set after a reconnect (with jittered
+exponential backoff).
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import logging
+
+import websockets
+
+from db import Database
+from feed_recorder import FeedRecorder
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FEED_URL = "wss://pumpportal.fun/api/data"
+
+ACCOUNT = "Account"
+TOKEN = "Token"
+
+# Reconnect backoff: full jitter over min(cap, base * 2^attempt) seconds
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Seconds to wait before reconnect attempt `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class FeedConnection:
+    """One WebSocket and the keys subscribed on it"""
+
+    def __init__(self, index: int, url: str, frames: asyncio.Queue, batch_size: int,
+                 new_tokens: bool = False, recorder: Optional[FeedRecorder] = None, metrics=REGISTRY):
+        self.index = index
+        self.url = url
+        self.frames = frames
+        self.batch_size = batch_size
+        self.new_tokens = new_tokens
+        self.recorder = recorder
+        self.keys: Dict[str, Set[str]] = {ACCOUNT: set(), TOKEN: set()}
+        self._websocket = None
+        self._messages_sent = metrics.counter("feed_subscription_messages_total", "Subscribe/unsubscribe calls sent")
+        self._reconnects = metrics.counter("feed_reconnects_total", "Feed WebSocket reconnects")
+        self._gaps = metrics.latency("feed_gap_seconds", "Connection lost to first frame after reconnecting")
+
+    def __len__(self) -> int:
+        return len(self.keys[ACCOUNT]) + len(self.keys[TOKEN])
+
+    async def _send(self, method: str, keys: List[str]):
+        """Send keys in batches; a no-op while disconnected (resent on connect)"""
+        websocket = self._websocket
+        if websocket is None or not keys:
+            return
+        try:
+            for i in range(0, len(keys), self.batch_size):
+                await websocket.send(json.dumps({"method": method, "keys": keys[i:i + self.batch_size]}))
+                self._messages_sent.inc()
+        except websockets.ConnectionClosed as e:
+            # run() reconnects and resends the whole key set
+            logger.warning(f"Feed connection {self.index} lost during {method}: {e}")
+
+    async def subscribe(self, kind: str, keys: List[str]):
+        self.keys[kind].update(keys)
+        await self._send(f"subscribe{kind}Trade", keys)
+
+    async def unsubscribe(self, kind: str, keys: List[str]):
+        self.keys[kind].difference_update(keys)
+        await self._send(f"unsubscribe{kind}Trade", keys)
+
+    async def run(self):
+        """Connect, (re)subscribe everything, and forward frames forever
+
+        Reconnects back off exponentially with full jitter, so many
+        connections dropped together do not reconnect in lockstep. The
+        backoff resets once a connection delivers a frame. The gap from
+        losing a connection to the first frame on the next one is
+        recorded in feed_gap_seconds.
+        """
+        attempt = 0
+        lost_at: Optional[float] = None
+        while True:
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    self._websocket = websocket
+                    if self.new_tokens:
+                        await websocket.send(json.dumps({"method": "subscribeNewToken"}))
+                    for kind, keys in self.keys.items():
+                        await self._send(f"subscribe{kind}Trade", sorted(keys))
+                    logger.info(f"Feed connection {self.index} up with {len(self)} keys")
+
+                    async for message in websocket:
+                        received = time.time()
+                        if lost_at is not None:
+                            gap = received - lost_at
+                            self._gaps.observe(gap)
+                            logger.info(f"Feed connection {self.index} resumed after a {gap:.1f}s gap")
+                            lost_at = None
+                        attempt = 0
+                        if self.recorder is not None:
+                            self.recorder.record(message, received)
+                        await self.frames.put((received, message))
+                logger.warning(f"Feed connection {self.index} closed by the server")
+
+            except websockets.ConnectionClosed as e:
+                logger.warning(f"Feed connection {self.index} closed: {e}")
+            except Exception as e:
+                logger.error(f"Feed connection {self.index} error: {e}")
+            finally:
+                self._websocket = None
+
+            if lost_at is None:
+                lost_at = time.time()
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self._reconnects.inc()
+            logger.info(f"Feed connection {self.index} reconnecting in {delay:.1f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+
+class SubscriptionManager:
+    """Decide which accounts and tokens to follow and place them on connections"""
+
+    def __init__(self, db: Database, url: str = FEED_URL, keys_per_connection: int = 500,
+                 batch_size: int = 100, refresh_interval: float = 30, max_hot_tokens: int = 200,
+                 hot_token_seconds: float = 900, queue_size: int = 10000,
+                 recorder: Optional[FeedRecorder] = None, metrics=REGISTRY):
+        self.db = db
+        self.url = url
+        self.keys_per_connection = keys_per_connection
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self.max_hot_tokens = max_hot_tokens
+        self.hot_token_seconds = hot_token_seconds
+        self.recorder = recorder
+        self.metrics = metrics
+
+        self.frames: "asyncio.Queue[Tuple[float, str]]" = asyncio.Queue(maxsize=queue_size)
+        self.connections: List[FeedConnection] = []
+        self._tasks: List[asyncio.Task] = []
+        self._owner: Dict[Tuple[str, str], FeedConnection] = {}
+        # Launches seen on the feed: mint -> launch time
+        self._launches: Dict[str, float] = {}
+        self._reconcile_lock = asyncio.Lock()
+        # Tokens subscribed: the last reconcile's set plus launches since
+        self.token_count = 0
+
+        self._accounts = metrics.gauge("feed_subscribed_accounts", "Wallets subscribed for trades")
+        self._tokens = metrics.gauge("feed_subscribed_tokens", "Tokens subscribed for trades")
+        self._connections = metrics.gauge("feed_connections", "Feed WebSocket connections")
+
+    def desired_accounts(self) -> Set[str]:
+        """Wallets someone has an active alert on or that are marked tracked"""
+        with self.db.read() as conn:
+            rows = conn.execute("""
+                SELECT wallet_address FROM alert_configs WHERE is_active = 1
+                UNION
+                SELECT address FROM wallets WHERE is_tracked = 1
+            """).fetchall()
+        return {wallet for (wallet,) in rows}
+
+    def traded_tokens(self, since: float) -> List[str]:
+        """Tokens with the most trades since `since`, busiest first"""
+        with self.db.read() as conn:
+            rows = conn.execute("""
+                SELECT token_address FROM trades
+                WHERE timestamp >= ?
+                GROUP BY token_address
+                ORDER BY COUNT(*) DESC
+                LIMIT ?
+            """, (int(since), self.max_hot_tokens)).fetchall()
+        return [mint for (mint,) in rows]
+
+    def desired_tokens(self, traded: List[str], now: Optional[float] = None) -> Set[str]:
+        """The busiest traded tokens, topped up with the newest launches"""
+        now = time.time() if now is None else now
+        cutoff = now - self.hot_token_seconds
+        self._launches = {mint: t for mint, t in self._launches.items() if t >= cutoff}
+
+        tokens = set(traded[:self.max_hot_tokens])
+        for mint in sorted(self._launches, key=self._launches.get, reverse=True):
+            if len(tokens) >= self.max_hot_tokens:
+                break
+            tokens.add(mint)
+        return tokens
+
+    def note_launch(self, mint: str, launched: Optional[float] = None):
+        """A new token was created; follow it while it is young"""
+        self._launches[mint] = time.time() if launched is None else launched
+
+    def _connection_with_room(self) -> FeedConnection:
+        for connection in self.connections:
+            if len(connection) < self.keys_per_connection:
+                return connection
+        connection = FeedConnection(len(self.connections), self.url, self.frames, self.batch_size,
+                                    new_tokens=not self.connections, recorder=self.recorder,
+                                    metrics=self.metrics)
+        self.connections.append(connection)
+        if self._tasks:
+            self._tasks.append(asyncio.create_task(connection.run()))
+        self._connections.set(len(self.connections))
+        return connection
+
+    async def reconcile(self, accounts: Set[str], tokens: Set[str]):
+        """Subscribe what is missing and unsubscribe what is no longer wanted"""
+        async with self._reconcile_lock:
+            for kind, wanted in ((ACCOUNT, accounts), (TOKEN, tokens)):
+                current = {key for (k, key) in self._owner if k == kind}
+
+                # Removals first so their slots can be reused
+                removed: Dict[FeedConnection, List[str]] = {}
+                for key in current - wanted:
+                    removed.setdefault(self._owner.pop((kind, key)), []).append(key)
+                for connection, keys in removed.items():
+                    await connection.unsubscribe(kind, keys)
+
+                added: Dict[FeedConnection, List[str]] = {}
+                for key in sorted(wanted - current):
+                    connection = self._connection_with_room()
+                    self._owner[(kind, key)] = connection
+                    # Reserve the slot now so the next key sees it taken
+                    connection.keys[kind].add(key)
+                    added.setdefault(connection, []).append(key)
+                for connection, keys in added.items():
+                    await connection.subscribe(kind, keys)
+
+                if removed or added:
+                    logger.info(f"Subscriptions | {kind.lower()}s +{sum(map(len, added.values()))} "
+                                f"-{sum(map(len, removed.values()))} | "
+                                f"{len(wanted)} over {len(self.connections)} connections")
+
+            self.token_count = len(tokens)
+            self._accounts.set(len(accounts))
+            self._tokens.set(self.token_count)
+
+    async def refresh(self):
+        """Re-read the wanted keys and reconcile"""
+        since = time.time() - self.hot_token_seconds
+        accounts, traded = await asyncio.to_thread(
+            lambda: (self.desired_accounts(), self.traded_tokens(since)))
+        await self.reconcile(accounts, self.desired_tokens(traded))
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing subscriptions: {e}")
+
+    async def start(self):
+        """Open the connections with the initial key set"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Nothing tracked yet (or no database): start with launches only
+            logger.warning(f"Initial subscription refresh failed: {e}")
+        if not self.connections:
+            self._connection_with_room()
+        self._tasks = [asyncio.create_task(connection.run()) for connection in self.connections]
+        self._tasks.append(asyncio.create_task(self._refresh_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def feed(self) -> AsyncIterator[Tuple[float, str]]:
+        """Yield (receive time, raw frame) from every connection"""
+        await self.start()
+        try:
+            while True:
+                received, message = await self.frames.get()
+                if isinstance(message, str) and (
+                        '"txType":"create"' in message or '"txType": "create"' in message):
+                    await self._follow_launch(message, received)
+                yield received, message
+        finally:
+            await self.stop()
+
+    async def _follow_launch(self, message: str, received: float):
+        """Subscribe a new token straight away rather than at the next refresh"""
+        try:
+            mint = json.loads(message).get("mint")
+        except (ValueError, AttributeError):
+            return
+        if not isinstance(mint, str):
+            return
+        self.note_launch(mint, received)
+
+        async with self._reconcile_lock:
+            if (TOKEN, mint) in self._owner or self.token_count >= self.max_hot_tokens:
+                return
+            connection = self._connection_with_room()
+            self._owner[(TOKEN, mint)] = connection
+            self.token_count += 1
+            self._tokens.set(self.token_count)
+            await connection.subscribe(TOKEN, [mint])
@@ -4,9 +4,9 @@ Sends real-time alerts when tracked wallets buy tokens
 """
 
 import asyncio
-import sqlite3
 import time
 import os
+from collections import OrderedDict
 from typing import Dict, List, Optional
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -17,14 +17,58 @@ from telegram.ext import (
     CallbackQueryHandler
 )
 
+from alert_channel import ALERT_SOCKET_PATH, serve_alerts
+from alert_sender import GLOBAL_RATE, PER_CHAT_RATE, AlertSender
+from db import DEFAULT_DB_PATH, DEFAULT_SHARDS
+from metrics import REGISTRY, serve_metrics
+from profiling import ProfilingControl
+from storage import STORAGE_URL, Storage, get_storage
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Queued alerts younger than this are left to the push channel
+CATCHUP_GRACE_SECONDS = 5
+
+# Recently delivered alert IDs remembered to drop push/poll duplicates
+RECENT_ALERTS = 4096
+
 class TelegramAlertBot:
-    def __init__(self, token: str, db_path: str = "data/smart_money_tracker.db"):
+    def __init__(self, token: str, db_path: str = DEFAULT_DB_PATH,
+                 socket_path: str = ALERT_SOCKET_PATH, catchup_interval: float = 30,
+                 global_rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 send_workers: int = 8, shards: int = DEFAULT_SHARDS,
+                 metrics_port: Optional[int] = None, storage: Optional[Storage] = None):
         self.token = token
         self.db_path = db_path
+        # SQLite at db_path unless another backend is passed in. With sharded
+        # ingest, rows live in the shard owning their wallet.
+        self.db = storage if storage is not None else get_storage(db_path=db_path, shards=shards)
         self.app = None
+        self.socket_path = socket_path
+        self.catchup_interval = catchup_interval
+        
+        # Rate-limited concurrent delivery of alert messages
+        self.sender = AlertSender(self._send_message, global_rate=global_rate,
+                                  per_chat_rate=per_chat_rate, workers=send_workers)
+        
+        # Alert IDs being sent or recently finished
+        self._in_flight = set()
+        self._delivered = OrderedDict()
+        
+        self.metrics = REGISTRY
+        self.delivery_latency = self.metrics.latency(
+            "alert_delivery_seconds", "Alert queued to Telegram send completed")
+        self.alerts_sent = self.metrics.counter("alerts_sent_total", "Alerts delivered to Telegram")
+        self.alerts_failed = self.metrics.counter("alerts_failed_total", "Alerts Telegram rejected")
+        self.alerts_caught_up = self.metrics.counter(
+            "alerts_caught_up_total", "Alerts delivered by the catch-up poll")
+        # Where delivery time goes before the Telegram send (telegram_send_seconds)
+        self.push_wait = self.metrics.latency(
+            "alert_push_wait_seconds", "Alert queued by the monitor to received over the push channel")
+        self.catchup_wait = self.metrics.latency(
+            "alert_catchup_wait_seconds", "Alert queued to picked up by the catch-up poll")
+        self.metrics_port = metrics_port
         
     def init_bot(self):
         """Initialize the Telegram bot application"""
@@ -81,15 +125,10 @@ Ready to find smart money? Check the /leaderboard!
         chat_id = str(update.effective_chat.id)
         
         # Validate wallet exists and has data
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT address, performance_score, total_trades, wins, losses
-            FROM wallets WHERE address = ?
-        """, (wallet,))
+        wallet_data = await self.db.wallet(wallet)
         
-        wallet_data = cursor.fetchone()
+        # Check if already tracking
+        already_tracking = wallet_data is not None and await self.db.is_tracking(user_id, wallet)
         
         if not wallet_data:
             await update.message.reply_text(
@@ -97,36 +136,16 @@ Ready to find smart money? Check the /leaderboard!
                 f"This wallet hasn't made any trades yet, or we haven't tracked it.\n\n"
                 f"Check the /leaderboard for high-performing wallets to track!"
             )
-            conn.close()
             return
         
-        addr, score, total, wins, losses = wallet_data
-        
-        # Check if already tracking
-        cursor.execute("""
-            SELECT id FROM alert_configs
-            WHERE user_id = ? AND wallet_address = ? AND is_active = 1
-        """, (user_id, wallet))
+        score, total, wins, losses = wallet_data[:4]
         
-        if cursor.fetchone():
+        if already_tracking:
             await update.message.reply_text(f"✅ You're already tracking this wallet!")
-            conn.close()
             return
         
-        # Add alert config
-        cursor.execute("""
-            INSERT INTO alert_configs 
-            (user_id, wallet_address, alert_type, alert_destination, created_at)
-            VALUES (?, ?, 'telegram', ?, ?)
-        """, (user_id, wallet, chat_id, int(time.time())))
-        
-        # Mark wallet as tracked
-        cursor.execute("""
-            UPDATE wallets SET is_tracked = 1 WHERE address = ?
-        """, (wallet,))
-        
-        conn.commit()
-        conn.close()
+        # Add alert config and mark wallet as tracked
+        await self.db.track(user_id, wallet, chat_id, int(time.time()))
         
         win_rate = (wins / total * 100) if total > 0 else 0
         
@@ -157,24 +176,13 @@ Wallet: `{wallet[:8]}...{wallet[-8:]}`
         wallet = context.args[0].strip()
         user_id = str(update.effective_user.id)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # Deactivate alert config
-        cursor.execute("""
-            UPDATE alert_configs 
-            SET is_active = 0
-            WHERE user_id = ? AND wallet_address = ?
-        """, (user_id, wallet))
+        updated = await self.db.untrack(user_id, wallet)
         
-        if cursor.rowcount == 0:
+        if updated == 0:
             await update.message.reply_text("❌ You're not tracking this wallet.")
-            conn.close()
             return
         
-        conn.commit()
-        conn.close()
-        
         await update.message.reply_text(
             f"✅ Stopped tracking wallet `{wallet[:8]}...{wallet[-8:]}`",
             parse_mode='Markdown'
@@ -184,19 +192,7 @@ Wallet: `{wallet[:8]}...{wallet[-8:]}`
         """Handle /list command - show tracked wallets"""
         user_id = str(update.effective_user.id)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT w.address, w.performance_score, w.total_trades, w.wins, w.losses
-            FROM alert_configs ac
-            JOIN wallets w ON ac.wallet_address = w.address
-            WHERE ac.user_id = ? AND ac.is_active = 1
-            ORDER BY w.performance_score DESC
-        """, (user_id,))
-        
-        tracked = cursor.fetchall()
-        conn.close()
+        tracked = await self.db.tracked_wallets(user_id)
         
         if not tracked:
             await update.message.reply_text(
@@ -215,19 +211,7 @@ Wallet: `{wallet[:8]}...{wallet[-8:]}`
     
     async def cmd_leaderboard(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /leaderboard command - show top wallets"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT address, performance_score, total_trades, wins, losses, roi_7d, volume_7d
-            FROM wallets
-            WHERE total_trades >= 5
-            ORDER BY performance_score DESC
-            LIMIT 10
-        """, ())
-        
-        leaderboard = cursor.fetchall()
-        conn.close()
+        leaderboard = await self.db.leaderboard(10)
         
         if not leaderboard:
             await update.message.reply_text(
@@ -236,7 +220,7 @@ Wallet: `{wallet[:8]}...{wallet[-8:]}`
             return
         
         msg = "🏆 **Top 10 Smart Money Wallets**\n\n"
-        for i, (addr, score, total, wins, losses, roi_7d, vol_7d) in enumerate(leaderboard, 1):
+        for i, (addr, score, total, wins, losses, _, roi_7d, vol_7d, _) in enumerate(leaderboard, 1):
             win_rate = (wins / total * 100) if total > 0 else 0
             msg += f"{i}. Score: {score:.1f}/100\n"
             msg += f"   `{addr[:8]}...{addr[-8:]}`\n"
@@ -257,39 +241,19 @@ Wallet: `{wallet[:8]}...{wallet[-8:]}`
         
         wallet = context.args[0].strip()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        data = await self.db.wallet(wallet)
         
-        cursor.execute("""
-            SELECT performance_score, total_trades, wins, losses, total_profit_sol,
-                   avg_hold_time_mins, roi_7d, roi_24h, volume_7d, volume_24h, last_active
-            FROM wallets
-            WHERE address = ?
-        """, (wallet,))
-        
-        data = cursor.fetchone()
+        # Get recent trades
+        recent = await self.db.recent_trades(wallet, 5) if data else []
         
         if not data:
             await update.message.reply_text("❌ Wallet not found in our database.")
-            conn.close()
             return
         
-        score, total, wins, losses, profit, avg_hold, roi_7d, roi_24h, vol_7d, vol_24h, last_active = data
+        score, total, wins, losses, profit, avg_hold, roi_7d, roi_24h, vol_7d, vol_24h, last_active, _ = data
         
         win_rate = (wins / total * 100) if total > 0 else 0
         
-        # Get recent trades
-        cursor.execute("""
-            SELECT token_symbol, action, amount_sol, timestamp
-            FROM trades
-            WHERE wallet_address = ?
-            ORDER BY timestamp DESC
-            LIMIT 5
-        """, (wallet,))
-        
-        recent = cursor.fetchall()
-        conn.close()
-        
         # Format last active time
         time_diff = int(time.time()) - last_active
         if time_diff < 3600:
@@ -324,7 +288,7 @@ Last Active: {last_active_str}
 🔥 **Recent Trades:**
 """
         
-        for symbol, action, sol, ts in recent:
+        for symbol, _, action, sol, ts in recent:
             emoji = "🟢" if action == "buy" else "🔴"
             msg += f"{emoji} {action.upper()} ${symbol} - {sol:.2f} SOL\n"
         
@@ -343,23 +307,22 @@ Last Active: {last_active_str}
         
         # Future: handle inline button actions (track/untrack from leaderboard)
     
-    async def send_buy_alert(self, chat_id: str, wallet: str, trade_data: Dict):
-        """Send buy alert to user"""
-        try:
-            token_symbol = trade_data.get('token_symbol', 'UNKNOWN')
-            token_name = trade_data.get('token_name', 'Unknown Token')
-            token_addr = trade_data.get('token_address', '')
-            sol_amount = trade_data.get('amount_sol', 0)
-            score = trade_data.get('wallet_score', 0)
-            win_rate = trade_data.get('win_rate', 0)
-            total_trades = trade_data.get('total_trades', 0)
-            wins = trade_data.get('wins', 0)
-            losses = trade_data.get('losses', 0)
-            
-            # Calculate USD estimate (assuming $200/SOL)
-            usd_amount = sol_amount * 200
-            
-            msg = f"""
+    def render_buy_alert(self, wallet: str, trade_data: Dict) -> str:
+        """Build the buy alert message (identical for every subscriber)"""
+        token_symbol = trade_data.get('token_symbol', 'UNKNOWN')
+        token_name = trade_data.get('token_name', 'Unknown Token')
+        token_addr = trade_data.get('token_address', '')
+        sol_amount = trade_data.get('amount_sol', 0)
+        score = trade_data.get('wallet_score', 0)
+        win_rate = trade_data.get('win_rate', 0)
+        total_trades = trade_data.get('total_trades', 0)
+        wins = trade_data.get('wins', 0)
+        losses = trade_data.get('losses', 0)
+        
+        # Calculate USD estimate (assuming $200/SOL)
+        usd_amount = sol_amount * 200
+        
+        return f"""
 🚀 **SMART MONEY BUY ALERT**
 
 💎 **Token:** ${token_symbol}
@@ -375,84 +338,169 @@ Total Trades: {total_trades}
 🔗 [Buy on pump.fun](https://pump.fun/{token_addr})
 👁️ Wallet: `{wallet[:8]}...{wallet[-8:]}`
 """
-            
-            await self.app.bot.send_message(
-                chat_id=chat_id,
+    
+    async def send_rendered_alert(self, chat_id: str, wallet: str, msg: str,
+                                  token_symbol: str = 'UNKNOWN') -> bool:
+        """Send a pre-rendered alert message to one chat"""
+        try:
+            sent = await self.sender.send(
+                chat_id,
                 text=msg,
                 parse_mode='Markdown',
                 disable_web_page_preview=True
             )
             
-            logger.info(f"Alert sent to {chat_id}: {wallet[:8]}... bought ${token_symbol}")
-            return True
+            if sent:
+                logger.info(f"Alert sent to {chat_id}: {wallet[:8]}... bought ${token_symbol}")
+            return sent
             
         except Exception as e:
             logger.error(f"Failed to send alert: {e}")
             return False
     
+    async def send_buy_alert(self, chat_id: str, wallet: str, trade_data: Dict):
+        """Send buy alert to user"""
+        msg = self.render_buy_alert(wallet, trade_data)
+        return await self.send_rendered_alert(chat_id, wallet, msg,
+                                              trade_data.get('token_symbol', 'UNKNOWN'))
+    
+    async def _send_message(self, **kwargs):
+        return await self.app.bot.send_message(**kwargs)
+    
+    async def deliver_alert(self, payload: Dict):
+        """Send one trade's alert to all of its subscribers and record their status
+        
+        The payload carries the trade and wallet fields once plus an 'alerts'
+        list of {alert_id, chat_id}; the message is rendered once for all.
+        The bot pickup time (payload 'dequeued_at') and each Telegram
+        acknowledgement are stored on the alert_history rows.
+        """
+        alerts = [a for a in payload['alerts']
+                  if a['alert_id'] not in self._in_flight and a['alert_id'] not in self._delivered]
+        if not alerts:
+            return
+        alert_ids = [a['alert_id'] for a in alerts]
+        self._in_flight.update(alert_ids)
+        dequeued_at = payload.get('dequeued_at') or time.time()
+        
+        try:
+            wallet = payload['wallet']
+            msg = self.render_buy_alert(wallet, payload)
+            symbol = payload.get('token_symbol', 'UNKNOWN')
+            
+            async def send(chat_id: str) -> Optional[float]:
+                """Telegram acknowledgement time, None if the send failed"""
+                if not await self.send_rendered_alert(chat_id, wallet, msg, symbol):
+                    return None
+                acked_at = time.time()
+                self.delivery_latency.observe(acked_at - payload['queued_at'])
+                return acked_at
+            
+            acks = await asyncio.gather(*(send(a['chat_id']) for a in alerts))
+            results = [acked_at is not None for acked_at in acks]
+            
+            # Update the group's status (rows already settled by another path are left alone)
+            statuses = [('sent' if acked_at is not None else 'failed', dequeued_at, acked_at, alert_id)
+                        for acked_at, alert_id in zip(acks, alert_ids)]
+            await self.db.settle_alerts(wallet, statuses)
+            # Only settled rows are skipped by later catch-up polls
+            for alert_id in alert_ids:
+                self._delivered[alert_id] = None
+            while len(self._delivered) > RECENT_ALERTS:
+                self._delivered.popitem(last=False)
+            
+            sent = sum(results)
+            self.alerts_sent.inc(sent)
+            self.alerts_failed.inc(len(results) - sent)
+        except Exception as e:
+            logger.error(f"Error delivering alerts for trade {payload.get('trade_id')}: {e}")
+        finally:
+            # Unsettled alerts stay queued and are retried by the next poll
+            self._in_flight.difference_update(alert_ids)
+    
+    async def deliver_pushed_alert(self, payload: Dict):
+        """Push channel handler"""
+        payload['dequeued_at'] = time.time()
+        self.push_wait.observe(payload['dequeued_at'] - payload['queued_at'])
+        await self.deliver_alert(payload)
+    
+    async def _queued_alerts(self, older_than: int) -> List[Dict]:
+        """Queued alerts that were not pushed (monitor restarts, bot downtime)
+        
+        Grouped by trade so each trade and wallet row is read once.
+        """
+        rows = await self.db.queued_alerts(older_than)
+        if not rows:
+            return []
+        
+        groups: Dict[int, List] = {}
+        for alert_id, trade_id, queued_at, alert_type, chat_id in rows:
+            groups.setdefault(trade_id, []).append((alert_id, queued_at, alert_type, chat_id))
+        
+        trades = await self.db.alert_trades(list(groups))
+        
+        queued = []
+        for trade_id, wallet, token_addr, token_name, token_symbol, sol_amount, event_ts, \
+            score, total, wins, losses in trades:
+            
+            group = groups[trade_id]
+            queued.append({
+                'wallet': wallet,
+                'trade_id': trade_id,
+                'token_address': token_addr,
+                'token_name': token_name,
+                'token_symbol': token_symbol,
+                'amount_sol': sol_amount,
+                'wallet_score': score,
+                'win_rate': (wins / total * 100) if total > 0 else 0,
+                'total_trades': total,
+                'wins': wins,
+                'losses': losses,
+                'event_timestamp': event_ts,
+                'queued_at': min(queued_at for _, queued_at, _, _ in group),
+                'alerts': [{'alert_id': alert_id, 'alert_type': alert_type, 'chat_id': chat_id}
+                           for alert_id, _, alert_type, chat_id in group],
+            })
+        return queued
+    
     async def process_alert_queue(self):
-        """Background task to process queued alerts"""
+        """Background task to deliver queued alerts the push channel missed"""
         while True:
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Get queued alerts
-                cursor.execute("""
-                    SELECT ah.id, ah.alert_config_id, ah.wallet_address, ah.trade_id,
-                           ac.alert_destination,
-                           t.token_address, t.token_name, t.token_symbol, t.amount_sol,
-                           w.performance_score, w.total_trades, w.wins, w.losses
-                    FROM alert_history ah
-                    JOIN alert_configs ac ON ah.alert_config_id = ac.id
-                    JOIN trades t ON ah.trade_id = t.id
-                    JOIN wallets w ON ah.wallet_address = w.address
-                    WHERE ah.status = 'queued'
-                    ORDER BY ah.sent_at ASC
-                    LIMIT 10
-                """)
-                
-                alerts = cursor.fetchall()
-                
-                for alert_id, config_id, wallet, trade_id, chat_id, \
-                    token_addr, token_name, token_symbol, sol_amount, \
-                    score, total, wins, losses in alerts:
-                    
-                    win_rate = (wins / total * 100) if total > 0 else 0
-                    
-                    trade_data = {
-                        'token_address': token_addr,
-                        'token_name': token_name,
-                        'token_symbol': token_symbol,
-                        'amount_sol': sol_amount,
-                        'wallet_score': score,
-                        'win_rate': win_rate,
-                        'total_trades': total,
-                        'wins': wins,
-                        'losses': losses
-                    }
-                    
-                    success = await self.send_buy_alert(chat_id, wallet, trade_data)
-                    
-                    # Update alert status
-                    status = 'sent' if success else 'failed'
-                    cursor.execute("""
-                        UPDATE alert_history SET status = ? WHERE id = ?
-                    """, (status, alert_id))
+                alerts = await self._queued_alerts(int(time.time()) - CATCHUP_GRACE_SECONDS)
+                polled = time.time()
+                for alert in alerts:
+                    alert['dequeued_at'] = polled
+                    self.catchup_wait.observe(polled - alert['queued_at'])
+                await asyncio.gather(*(self.deliver_alert(alert) for alert in alerts))
+                if alerts:
+                    caught_up = sum(len(alert['alerts']) for alert in alerts)
+                    self.alerts_caught_up.inc(caught_up)
+                    logger.info(f"Caught up {caught_up} queued alerts for {len(alerts)} trades")
                 
-                conn.commit()
-                conn.close()
+                if self.delivery_latency.count:
+                    logger.info(
+                        f"Alerts: {self.alerts_sent.value} sent, {self.alerts_failed.value} failed, "
+                        f"delivery p50 {self.delivery_latency.percentile(50) * 1000:.0f}ms "
+                        f"max {self.delivery_latency.max * 1000:.0f}ms"
+                    )
                 
             except Exception as e:
                 logger.error(f"Error processing alerts: {e}")
             
-            await asyncio.sleep(2)  # Check every 2 seconds
+            await asyncio.sleep(self.catchup_interval)
     
     async def start(self):
         """Start the bot and alert processor"""
         self.init_bot()
         
-        # Start alert processing task
+        # Alerts are pushed by the monitor; the queue poll only catches up
+        self.alert_server = await serve_alerts(self.deliver_pushed_alert, self.socket_path)
+        if self.metrics_port:
+            self.metrics_server = await serve_metrics(self.metrics_port)
+        # SIGUSR1 profiles the bot, SIGUSR2 toggles the loop lag monitor
+        self.profiling = ProfilingControl("bot")
+        self.profiling.install()
         asyncio.create_task(self.process_alert_queue())
         
         # Start the bot
@@ -471,5 +519,13 @@ if __name__ == "__main__":
         print("❌ Error: TELEGRAM_BOT_TOKEN environment variable not set")
         exit(1)
     
-    bot = TelegramAlertBot(token)
+    bot = TelegramAlertBot(
+        token,
+        catchup_interval=float(os.getenv("ALERT_CATCHUP_SECONDS", "30")),
+        global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", str(GLOBAL_RATE))),
+        per_chat_rate=float(os.getenv("TELEGRAM_PER_CHAT_RATE", str(PER_CHAT_RATE))),
+        send_workers=int(os.getenv("TELEGRAM_SEND_WORKERS", "8")),
+        metrics_port=int(os.getenv("METRICS_PORT", "0")) or None,
+        storage=get_storage(STORAGE_URL),
+    )
     asyncio.run(bot.start())
@@ -0,0 +1,60 @@
+"""
+Smart Money Tracker - Alert Channel Test
+Pushed alerts reach the handler with bounded concurrency; handler errors
+are logged without stopping the listener
+"""
+
+import asyncio
+import logging
+
+from alert_channel import AlertPublisher, serve_alerts
+from metrics import MetricsRegistry
+
+
+def test_pushed_alerts_bounded_and_errors_logged(tmp_path, caplog):
+    path = str(tmp_path / "alerts.sock")
+
+    async def run():
+        handled = []
+        running = 0
+        peak = 0
+        release = asyncio.Event()
+
+        async def handler(payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            try:
+                await release.wait()
+                if payload["n"] == 1:
+                    raise RuntimeError("send failed")
+                handled.append(payload["n"])
+            finally:
+                running -= 1
+
+        server = await serve_alerts(handler, path, max_pending=2)
+        publisher = AlertPublisher(path, metrics=MetricsRegistry())
+        task = asyncio.create_task(publisher.run())
+        try:
+            await asyncio.sleep(0)
+            publisher.publish([{"n": n} for n in range(6)])
+            await asyncio.sleep(0.2)
+            # Reading stops while both slots are taken
+            assert running == 2
+
+            release.set()
+            for _ in range(50):
+                if len(handled) == 5:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            task.cancel()
+            server.close()
+            await server.wait_closed()
+
+        assert sorted(handled) == [0, 2, 3, 4, 5]
+        assert peak == 2
+
+    with caplog.at_level(logging.ERROR, logger="alert_channel"):
+        asyncio.run(run())
+    assert "send failed" in caplog.text
@@ -0,0 +1,62 @@
+"""
+Smart Money Tracker - Alert Index Test
+Every change to alert_configs bumps alert_config_version, and only then
+does the index rebuild
+"""
+
+import asyncio
+
+from conftest import make_tracker
+
+
+def version(storage) -> int:
+    with storage.read() as conn:
+        return conn.execute("SELECT version FROM alert_config_version WHERE id = 1").fetchone()[0]
+
+
+def refresh(tracker) -> bool:
+    with tracker.db.session() as cursor:
+        return tracker.alert_index.refresh(cursor)
+
+
+def test_config_changes_rebuild_the_index(storage, tmp_path):
+    tracker = make_tracker(storage, tmp_path)
+    index = tracker.alert_index
+    with storage.write() as conn:
+        conn.executemany("INSERT INTO wallets (address, first_seen, last_active) VALUES (?, 0, 0)",
+                         [("WalletA",), ("WalletB",)])
+    assert len(index) == 0
+    assert not refresh(tracker)
+    start = version(storage)
+
+    # Insert
+    asyncio.run(storage.track("u1", "WalletA", "chat1", 1))
+    assert version(storage) > start
+    assert "WalletA" not in index
+    assert refresh(tracker)
+    assert [config.destination for config in index.get("WalletA")] == ["chat1"]
+    assert index.version == version(storage)
+    assert not refresh(tracker)
+
+    # Update
+    seen = version(storage)
+    with storage.write() as conn:
+        conn.execute("UPDATE alert_configs SET min_buy_amount_sol = 2.5 WHERE wallet_address = 'WalletA'")
+    assert version(storage) > seen
+    assert index.get("WalletA")[0].min_buy_amount_sol != 2.5
+    assert refresh(tracker)
+    assert index.get("WalletA")[0].min_buy_amount_sol == 2.5
+
+    # Deactivate, then delete
+    asyncio.run(storage.track("u2", "WalletB", "chat2", 2))
+    assert asyncio.run(storage.untrack("u1", "WalletA")) == 1
+    assert refresh(tracker)
+    assert "WalletA" not in index and index.wallets() == ["WalletB"]
+
+    seen = version(storage)
+    with storage.write() as conn:
+        conn.execute("DELETE FROM alert_configs WHERE wallet_address = 'WalletB'")
+    assert version(storage) > seen
+    assert refresh(tracker)
+    assert len(index) == 0
+    assert not refresh(tracker)
@@ -0,0 +1,73 @@
+"""
+Smart Money Tracker - Alert Latency Test
+Alerts carry their trace timestamps and the report reads them per stage
+"""
+
+import asyncio
+import json
+import time
+
+import smart_money_monitor
+from alert_latency import latency_report, parse_time
+from events import TradeEvent
+from smart_money_monitor import SmartMoneyTracker
+
+
+def test_alert_trace_and_report(tmp_path):
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "latency.db"))
+    with tracker.db.write() as conn:
+        conn.execute("""
+            INSERT INTO alert_configs (user_id, wallet_address, alert_type, alert_destination,
+                                       min_performance_score, min_buy_amount_sol, created_at)
+            VALUES ('u1', 'Wallet', 'telegram', 'chat', 0, 0.1, 0)
+        """)
+
+    now = time.time()
+    events = [TradeEvent("buy", "Wallet", f"Mint{i}", "Token", "TKN", 1.0, 100.0, f"sig{i}",
+                         int((now - 3) * 1000) + i) for i in range(20)]
+    received = [now - 1] * len(events)
+    assert tracker.process_batch(events, received) == len(events)
+
+    # What the bot records once Telegram acknowledges each alert
+    with tracker.db.write() as conn:
+        conn.execute("""
+            UPDATE alert_history SET status = 'sent', dequeued_at = queued_at + 0.5,
+                                     acked_at = queued_at + 0.75
+        """)
+        assert conn.execute("""
+            SELECT COUNT(*) FROM alert_history WHERE event_at IS NULL OR received_at != ?
+        """, (now - 1,)).fetchone()[0] == 0
+
+    report = asyncio.run(latency_report(tracker.db, now - 60))
+    stages = report["stages"]
+    assert report["alerts"] == report["acknowledged"] == len(events)
+    assert 1900 <= stages["feed"]["p50"] <= 2100
+    assert stages["push"]["p99"] == 500.0
+    assert stages["send"]["max"] == 250.0
+    assert stages["total"]["p50"] > stages["feed"]["p50"] + 750
+
+    # The window excludes alerts queued outside it
+    assert asyncio.run(latency_report(tracker.db, now - 60, now - 30))["alerts"] == 0
+    assert parse_time("24h", now) == now - 86400
+
+
+def test_receive_time_is_the_socket_read(tmp_path, monkeypatch):
+    frame = json.dumps({"txType": "buy", "traderPublicKey": "Wallet", "mint": "Mint",
+                        "solAmount": 1.0, "tokenAmount": 100.0, "signature": "sig"})
+
+    class Feed:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def feed(self):
+            # Read off the socket half a second before the reader got to it
+            yield time.time() - 0.5, frame
+
+    monkeypatch.setattr(smart_money_monitor, "SubscriptionManager", Feed)
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "receive.db"))
+    queue = asyncio.Queue()
+    asyncio.run(tracker._receive(queue))
+
+    received, event = queue.get_nowait()
+    assert event.signature == "sig"
+    assert 0.5 <= time.perf_counter() - received < 1.5
@@ -0,0 +1,118 @@
+"""
+Smart Money Tracker - Alert Sender Test
+Sends respect the global and per-chat token buckets, and a 429 pauses
+only the chat it was returned for
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+
+from alert_sender import AlertSender, TokenBucket
+from metrics import MetricsRegistry
+
+
+class Recorder:
+    """send_func that records (chat_id, text, time) and fails on request"""
+
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = failures or {}
+
+    async def __call__(self, chat_id: str, text: str):
+        self.calls.append((chat_id, text, time.monotonic()))
+        pending = self.failures.get(text)
+        if pending:
+            self.failures[text] = pending[1:]
+            raise pending[0]
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=10.0)
+    assert bucket.delay() == 0
+    bucket.take()
+    assert 0.09 < bucket.delay() <= 0.1
+
+    bucket.pause(0.5)
+    assert 0.49 < bucket.delay() <= 0.5
+
+    async def burst():
+        bucket = TokenBucket(rate=50.0)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # First token is free, the other five wait 20ms each
+    assert 0.09 < asyncio.run(burst()) < 0.3
+
+
+def test_sends_respect_global_and_per_chat_rates():
+    send = Recorder()
+
+    async def run():
+        sender = AlertSender(send, global_rate=100.0, per_chat_rate=20.0, workers=4,
+                             metrics=MetricsRegistry())
+        try:
+            sent = await asyncio.gather(
+                *(sender.send("one", text=f"one-{i}") for i in range(5)),
+                *(sender.send(f"chat{i}", text=f"many-{i}") for i in range(20)),
+            )
+        finally:
+            await sender.stop()
+        return sent, sender
+
+    sent, sender = asyncio.run(run())
+    assert all(sent) and sender._sent.value == 25
+
+    # One chat: in order, at least 1/20s apart
+    one = [(text, at) for chat, text, at in send.calls if chat == "one"]
+    assert [text for text, _ in one] == [f"one-{i}" for i in range(5)]
+    gaps = [b - a for (_, a), (_, b) in zip(one, one[1:])]
+    assert min(gaps) > 0.045
+
+    # Overall: no faster than 100/s
+    times = sorted(at for _, _, at in send.calls)
+    assert times[-1] - times[0] > 24 / 100 * 0.9
+
+
+def test_retry_after_pauses_only_that_chat():
+    send = Recorder({
+        "limited": [RetryAfter(timedelta(seconds=0.3))],
+        "hopeless": [RetryAfter(timedelta(seconds=0.05))] * 3,
+    })
+
+    async def run():
+        sender = AlertSender(send, global_rate=100.0, per_chat_rate=100.0, max_retries=2,
+                             metrics=MetricsRegistry())
+        try:
+            results = await asyncio.gather(
+                sender.send("slow", text="limited"),
+                sender.send("slow", text="after"),
+                sender.send("fast", text="other"),
+                sender.send("stuck", text="hopeless"),
+            )
+        finally:
+            await sender.stop()
+        return results, sender
+
+    results, sender = asyncio.run(run())
+    assert results == [True, True, True, False]
+    assert sender._limited.value == 4
+    assert sender._failed.value == 1
+
+    calls = [(chat, text) for chat, text, _ in send.calls]
+    at = {}
+    for chat, text, when in send.calls:
+        at.setdefault(text, []).append(when)
+
+    # Retried first, after the pause; the queued message waited behind it
+    slow = [text for chat, text in calls if chat == "slow"]
+    assert slow == ["limited", "limited", "after"]
+    assert at["limited"][1] - at["limited"][0] >= 0.29
+    # Other chats were not held up by it
+    assert at["other"][0] < at["limited"][1]
+    # Gave up after max_retries retries
+    assert len(at["hopeless"]) == 3
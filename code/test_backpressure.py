@@ -0,0 +1,127 @@
+"""
+Smart Money Tracker - Backpressure Test
+Shedding must never drop alert-capable events; spilling must keep order
+and survive a crash
+"""
+
+import asyncio
+import time
+
+from backpressure import Backpressure, SpillJournal
+from events import TradeEvent
+from metrics import MetricsRegistry
+
+
+def event(i: int, tx_type: str = "buy", wallet: str = "Small", sol: float = 0.01) -> TradeEvent:
+    return TradeEvent(tx_type, wallet, "Mint", "Token", "TKN", sol, 1000.0, f"sig{i}", i)
+
+
+def test_shed_keeps_subscribed_notable_large_and_sells():
+    async def run():
+        gate = Backpressure("shed", shed_watermark=0.5, shed_max_sol=0.5,
+                            is_subscribed=lambda wallet: wallet == "Subscribed")
+        gate._notable = {"Notable"}
+        queue = asyncio.Queue(maxsize=100)
+        for i in range(60):
+            await gate.put(queue, (time.perf_counter(), event(i)))
+
+        kept = [event(100, wallet="Subscribed"), event(101, wallet="Notable"),
+                event(102, sol=5.0), event(103, tx_type="sell")]
+        for e in kept:
+            await gate.put(queue, (time.perf_counter(), e))
+
+        queued = [queue.get_nowait()[1].signature for _ in range(queue.qsize())]
+        # Only small unsubscribed buys past the watermark were dropped
+        assert len(queued) == 50 + len(kept)
+        assert queued[-len(kept):] == [e.signature for e in kept]
+        assert gate._shed_low_value.value == 10
+
+    asyncio.run(run())
+
+
+def test_spill_replays_in_order(tmp_path):
+    async def run():
+        gate = Backpressure("spill", spill_path=str(tmp_path / "spill.jsonl"))
+        queue = asyncio.Queue(maxsize=10)
+        for i in range(50):
+            await gate.put(queue, (time.perf_counter(), event(i)))
+        assert len(gate.journal) == 40
+
+        unspill = asyncio.create_task(gate.run(queue))
+        seen = []
+        while len(seen) < 50:
+            received, e = await queue.get()
+            seen.append(e.timestamp_ms)
+            # Kept until the writer has committed what it read
+            if len(seen) == 50:
+                assert (tmp_path / "spill.jsonl").stat().st_size > 0
+            queue.task_done()
+        await gate.drain()
+        unspill.cancel()
+
+        assert seen == list(range(50))
+        assert len(gate.journal) == 0
+        assert (tmp_path / "spill.jsonl").stat().st_size == 0
+
+    asyncio.run(run())
+
+
+def drain_journal(path, pending: int):
+    """Restart on an existing journal and collect what it feeds back"""
+    async def run():
+        gate = Backpressure("spill", spill_path=str(path), metrics=MetricsRegistry())
+        assert len(gate.journal) == pending
+        queue = asyncio.Queue(maxsize=10)
+        seen = []
+
+        async def writer():
+            while True:
+                received, e = await queue.get()
+                seen.append(e.timestamp_ms)
+                queue.task_done()
+
+        tasks = [asyncio.create_task(gate.run(queue)), asyncio.create_task(writer())]
+        await asyncio.wait_for(gate.drain(), 5)
+        tasks[1].cancel()
+
+        # New events go straight to the queue again
+        await gate.put(queue, (time.perf_counter(), event(99)))
+        assert queue.get_nowait()[1].timestamp_ms == 99
+        tasks[0].cancel()
+        return seen, gate
+
+    return asyncio.run(run())
+
+
+def test_restart_replays_the_journal(tmp_path):
+    path = tmp_path / "spill.jsonl"
+    journal = SpillJournal(str(path), metrics=MetricsRegistry())
+    for i in range(25):
+        journal.append(time.time(), event(i))
+    # Read but never committed before the crash
+    assert len(journal.read(10)) == 10
+    journal.close()
+
+    seen, gate = drain_journal(path, 25)
+    assert seen == list(range(25))
+    assert path.stat().st_size == 0
+
+
+def test_restart_survives_a_torn_and_a_corrupt_line(tmp_path):
+    path = tmp_path / "spill.jsonl"
+    journal = SpillJournal(str(path), metrics=MetricsRegistry())
+    for i in range(5):
+        journal.append(time.time(), event(i))
+    journal.close()
+    with open(path, "r+b") as f:
+        lines = f.read().split(b"\n")
+        lines[2] = b"not json"
+        f.seek(0)
+        f.truncate()
+        # A crash in the middle of writing the last line
+        f.write(b"\n".join(lines[:5]) + b"\n" + lines[4][:17])
+
+    seen, gate = drain_journal(path, 5)
+    assert seen == [0, 1, 3, 4]
+    assert gate.journal._skipped.value == 1
+    assert path.stat().st_size == 0
@@ -0,0 +1,66 @@
+"""
+Smart Money Tracker - Feed Events Test
+Non-trade frames are dropped before the JSON decode; trades decode to the
+same TradeEvent as the dict path
+"""
+
+import json
+
+import events
+from events import TradeEvent, decode_trade, is_trade_frame
+
+TRADE = {
+    "signature": "sig1", "mint": "Mint1", "traderPublicKey": "Wallet1", "txType": "buy",
+    "tokenAmount": 1234567.5, "solAmount": "0.75", "name": "Test", "symbol": "TST",
+    "timestamp": 1700000000123, "marketCapSol": 31.2, "pool": "pump",
+}
+
+IRRELEVANT = [
+    json.dumps({"message": "Successfully subscribed to keys."}),
+    json.dumps({"errors": "Invalid message"}),
+    json.dumps({"signature": "sig2", "mint": "Mint2", "traderPublicKey": "Dev", "txType": "create",
+                "initialBuy": 5e7, "name": "New", "symbol": "NEW"}, separators=(",", ":")),
+]
+
+
+def fields(event: TradeEvent) -> tuple:
+    return tuple(getattr(event, name) for name in TradeEvent.__slots__)
+
+
+def test_prefilter_skips_the_decode(monkeypatch):
+    decoded = []
+
+    def counting_loads(frame):
+        decoded.append(frame)
+        return json.loads(frame)
+
+    monkeypatch.setattr(events, "_loads", counting_loads)
+
+    for frame in IRRELEVANT:
+        assert not is_trade_frame(frame)
+        assert decode_trade(frame) is None
+        assert decode_trade(frame.encode()) is None
+    assert decoded == []
+
+    sell = dict(TRADE, txType="sell", signature="sig3")
+    sell.pop("name")
+    trades = [json.dumps(TRADE), json.dumps(sell, separators=(",", ":")).encode()]
+    for frame in trades:
+        event = decode_trade(frame)
+        assert fields(event) == fields(TradeEvent.from_dict(json.loads(frame)))
+    assert decoded == trades
+
+    event = decode_trade(trades[0])
+    assert (event.tx_type, event.sol_amount, event.timestamp_ms) == ("buy", 0.75, 1700000000123)
+    assert decode_trade(trades[1]).name == "Unknown"
+
+
+def test_prefilter_only_rules_frames_out():
+    # Spacing the cheap check does not recognise still decodes to nothing
+    spaced = '{"txType": "create", "mint": "Mint4"}'
+    assert is_trade_frame(spaced)
+    assert decode_trade(spaced) is None
+
+    assert decode_trade('{"txType":"buy", "solAmount": "lots"}') is None
+    assert decode_trade('["txType"]') is None
+    assert decode_trade('{"txType":"buy"') is None
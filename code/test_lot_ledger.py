@@ -0,0 +1,50 @@
+"""
+Smart Money Tracker - Lot Ledger Test
+Partial sells split the oldest lots first, and resent frames change no
+realized PnL (the per-backend replay is in test_storage.py)
+"""
+
+import math
+import sqlite3
+
+from conftest import make_events, reference_pnl
+from smart_money_monitor import Lot, LotLedger, SmartMoneyTracker
+
+
+def test_partial_sell_splits_oldest_lot():
+    ledger = LotLedger()
+    ledger.add('w', 't', Lot(1, 100, 0.0, 1.0, 1000))
+    ledger.add('w', 't', Lot(2, 200, 0.0, 3.0, 1000))
+
+    fills = ledger.match_sell(None, 'w', 't', 1500, 6.0)
+
+    assert [(f.lot.id, f.closes_lot) for f in fills] == [(1, True), (2, False)]
+    assert math.isclose(fills[0].profit_sol, 4.0 - 1.0)
+    assert math.isclose(fills[1].profit_sol, 2.0 - 1.5)
+
+    remaining = ledger.match_sell(None, 'w', 't', 500, 1.0)
+    assert len(remaining) == 1 and remaining[0].closes_lot
+    assert math.isclose(remaining[0].entry_sol, 1.5)
+    assert ledger.match_sell(None, 'w', 't', 10, 1.0) == []
+
+
+def test_duplicate_signature_applies_nothing(tmp_path):
+    events = make_events(count=200)
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "dupes.db"))
+    tracker.process_batch(events)
+    # The feed resends every frame, including within one batch
+    assert tracker.process_batch(events + events[:50]) == 0
+
+    conn = sqlite3.connect(tracker.db_path)
+    trades = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+    realized = dict(conn.execute("""
+        SELECT wallet_address, SUM(profit_sol) FROM positions
+        WHERE status = 'closed' GROUP BY wallet_address
+    """).fetchall())
+    conn.close()
+
+    expected, _ = reference_pnl(events)
+    assert trades == len(events)
+    for wallet, pnl in expected.items():
+        assert math.isclose(realized[wallet], pnl, rel_tol=1e-9, abs_tol=1e-9), wallet
+    assert tracker.check_wallet_stats() == []
@@ -0,0 +1,50 @@
+"""
+Smart Money Tracker - Metrics Test
+Histogram buckets and the Prometheus text served at /metrics
+"""
+
+import asyncio
+
+from metrics import MetricsRegistry, serve_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.latency("stage_seconds", "One stage", buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.01, 0.05, 0.5, 2.0):
+        latency.observe(seconds)
+    registry.counter("events_total", "Events seen").inc(3)
+
+    text = registry.render_prometheus()
+    # An observation equal to a bound falls in that bucket (le = less or equal)
+    assert 'stage_seconds_bucket{le="0.01"} 2' in text
+    assert 'stage_seconds_bucket{le="0.1"} 3' in text
+    assert 'stage_seconds_bucket{le="1"} 4' in text
+    assert 'stage_seconds_bucket{le="+Inf"} 5' in text
+    assert "stage_seconds_count 5" in text
+    assert "# TYPE stage_seconds histogram" in text
+    assert "# TYPE events_total counter\nevents_total 3\n" in text
+
+
+def test_serve_metrics_answers_get():
+    async def run():
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth").set(7)
+        server = await serve_metrics(0, registry=registry)
+        port = server.sockets[0].getsockname()[1]
+
+        async def get(path: str) -> bytes:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+        metrics, missing = await get("/metrics"), await get("/other")
+        server.close()
+        assert metrics.startswith(b"HTTP/1.1 200 OK")
+        assert metrics.endswith(b"queue_depth 7\n")
+        assert missing.startswith(b"HTTP/1.1 404")
+
+    asyncio.run(run())
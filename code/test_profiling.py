@@ -0,0 +1,42 @@
+"""
+Smart Money Tracker - Profiling Test
+Lag monitor reports a blocked loop; profiles come out as folded stacks
+"""
+
+import asyncio
+import time
+
+from metrics import MetricsRegistry
+from profiling import LoopLagMonitor, SamplingProfiler
+
+
+def test_lag_monitor_reports_blocking_callback():
+    async def run():
+        monitor = LoopLagMonitor(threshold=0.04, metrics=MetricsRegistry())
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    assert monitor._stalls.value == 1
+    assert monitor._lag.max >= 0.15
+
+
+def test_profile_is_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    path = profiler.start(0.1, "test")
+    # Keep the main thread busy in a recognisable function
+    def spin(until: float):
+        while time.monotonic() < until:
+            pass
+    spin(time.monotonic() + 0.15)
+    profiler._thread.join()
+
+    lines = open(path).read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any(line.startswith("MainThread;") and "spin (test_profiling.py" in line for line in lines)
@@ -0,0 +1,122 @@
+"""
+Smart Money Tracker - Offline Replay Test
+Recordings in every supported format replay through the ingest pipeline
+into the expected database state, in-process, sharded and paced
+"""
+
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from conftest import make_events
+from metrics import REGISTRY
+from replay import Pacer, open_events, read_frames, replay, replay_sharded
+
+ACK = '{"message":"Successfully subscribed to keys."}'
+CREATE = '{"txType":"create","mint":"NewMint","traderPublicKey":"Dev","signature":"create-1"}'
+
+REPORT_KEYS = {"file", "speed", "frames", "events", "non_trade_frames", "trades_processed",
+               "seconds", "events_per_second", "latency_ms", "batches", "db"}
+DB_KEYS = {"wallets", "trades", "open_positions", "closed_positions", "alerts", "leaderboard"}
+
+
+def write_recording(path, events, envelope: bool = False):
+    """gzip JSONL of the events' frames with a subscription ack and a launch mixed in"""
+    frames = [ACK, CREATE] + [json.dumps(event) for event in events]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for frame in frames:
+            if envelope:
+                frame = json.dumps({"t": json.loads(frame).get("timestamp", 0) / 1000, "f": frame})
+            f.write(frame + "\n\n")
+    return frames
+
+
+def test_open_events_detects_compression(tmp_path):
+    lines = [ACK, CREATE]
+    plain = tmp_path / "plain.jsonl"
+    plain.write_text("\n".join(lines) + "\n")
+    write_recording(tmp_path / "events.bin", [])
+    assert [line.strip() for line in open_events(str(plain))] == lines
+    # Detected from the header, not the file name
+    with open_events(str(tmp_path / "events.bin")) as f:
+        assert [line.strip() for line in f if line.strip()] == lines
+
+    zstandard = pytest.importorskip("zstandard")
+    compressed = tmp_path / "events.zst"
+    compressed.write_bytes(zstandard.ZstdCompressor().compress(plain.read_bytes()))
+    assert [frame for _, frame in read_frames(str(compressed))] == lines
+
+
+def test_read_frames_unwraps_recorder_envelopes(tmp_path):
+    events = make_events(count=5)
+    frames = write_recording(tmp_path / "rec.jsonl.gz", events, envelope=True)
+    read = list(read_frames(str(tmp_path / "rec.jsonl.gz")))
+    assert [frame for _, frame in read] == frames
+    assert [t for t, _ in read[2:]] == [event["timestamp"] / 1000 for event in events]
+
+
+def test_replay_reports_throughput_latency_and_db_state(tmp_path):
+    events = make_events(count=800)
+    write_recording(tmp_path / "rec.jsonl.gz", events)
+    processed = REGISTRY.counter("ingest_events_processed_total").value
+
+    result = asyncio.run(replay(str(tmp_path / "rec.jsonl.gz"), str(tmp_path / "replay.db"),
+                                batch_size=100))
+
+    assert REPORT_KEYS <= set(result) and DB_KEYS <= set(result["db"])
+    assert result["frames"] == len(events) + 2
+    assert result["non_trade_frames"] == 2
+    assert result["events"] == len(events)
+    assert REGISTRY.counter("ingest_events_processed_total").value - processed == len(events)
+    assert result["events_per_second"] > 0 and result["batches"] > 0
+    latency = result["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p99"] <= latency["max"]
+
+    db = result["db"]
+    assert db["trades"] == len(events)
+    assert db["wallets"] == len({event["traderPublicKey"] for event in events})
+    assert db["open_positions"] > 0 and db["closed_positions"] > 0
+    assert db["alerts"] == {}
+
+    # --limit stops after that many trade events
+    limited = asyncio.run(replay(str(tmp_path / "rec.jsonl.gz"), str(tmp_path / "limited.db"), limit=50))
+    assert limited["events"] == limited["db"]["trades"] == 50
+
+
+def test_replay_sharded_matches_in_process(tmp_path):
+    events = make_events(count=600)
+    write_recording(tmp_path / "rec.jsonl.gz", events)
+
+    single = asyncio.run(replay(str(tmp_path / "rec.jsonl.gz"), str(tmp_path / "single.db")))
+    sharded = asyncio.run(replay_sharded(str(tmp_path / "rec.jsonl.gz"), str(tmp_path / "sharded.db"), 2))
+
+    assert REPORT_KEYS <= set(sharded)
+    assert sharded["events"] == sharded["trades_processed"] == len(events)
+    assert sum(shard["events"] for shard in sharded["per_shard"]) == len(events)
+    for key in ("wallets", "trades", "open_positions", "closed_positions"):
+        assert sharded["db"][key] == single["db"][key], key
+
+
+def test_paced_replay_respects_speed(tmp_path):
+    # 20 events one recorded second apart: 19s of feed at 19x is about 1s
+    events = make_events(count=20)
+    write_recording(tmp_path / "rec.jsonl.gz", events, envelope=True)
+
+    result = asyncio.run(replay(str(tmp_path / "rec.jsonl.gz"), str(tmp_path / "paced.db"),
+                                speed=19, flush_interval=0.01))
+    assert result["speed"] == 19 and result["events"] == 20
+    assert 0.95 <= result["seconds"] < 2.5
+
+
+def test_pacer_without_speed_never_sleeps():
+    async def run():
+        pacer = Pacer(None)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for t in (0, 100, 200):
+            await pacer.wait(t)
+        return loop.time() - started
+
+    assert asyncio.run(run()) < 0.05
@@ -0,0 +1,130 @@
+"""
+Smart Money Tracker - Trade Retention Test
+Compaction rolls old trades up exactly once and leaves positions, wallet
+stats and queued alerts intact, on every storage backend
+"""
+
+import asyncio
+import math
+import time
+from collections import defaultdict
+
+from conftest import count, make_events
+from events import as_trade_event
+from retention import DAY_SECONDS
+from smart_money_monitor import SmartMoneyTracker
+
+
+def old_events(count: int = 1200, days: int = 20):
+    """make_events spread evenly over the last `days` days"""
+    events = make_events(count=count)
+    start = int(time.time()) - days * DAY_SECONDS
+    step = (days - 1) * DAY_SECONDS // count
+    for i, event in enumerate(events):
+        event["timestamp"] = (start + i * step) * 1000
+    return events
+
+
+def expected_rollups(events):
+    wallets = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    tokens = defaultdict(lambda: [0, 0, 0.0, 0.0, math.inf, -math.inf])
+    for event in events:
+        day = event["timestamp"] // 1000 // DAY_SECONDS * DAY_SECONDS
+        sold = event["txType"] == "sell"
+        price = event["solAmount"] / event["tokenAmount"]
+        w = wallets[(event["traderPublicKey"], day)]
+        t = tokens[(event["mint"], day)]
+        w[sold] += 1
+        w[2 + sold] += event["solAmount"]
+        t[sold] += 1
+        t[2 + sold] += event["solAmount"]
+        t[4], t[5] = min(t[4], price), max(t[5], price)
+    return wallets, tokens
+
+
+def assert_close(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert math.isclose(a, e, rel_tol=1e-9, abs_tol=1e-9), (actual, expected)
+
+
+def test_compaction_rolls_up_old_trades(storage, tmp_path):
+    events = old_events()
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "tracker.db"), storage=storage, retention_days=8)
+    for start in range(0, len(events), 300):
+        tracker.process_batch(events[start:start + 300])
+    tracker.retention.batch_size = 97
+
+    # An alert the bot has not delivered yet keeps its trade
+    pending = events[0]
+    asyncio.run(storage.track("u1", pending["traderPublicKey"], "chat", 1))
+    with storage.write() as conn:
+        conn.execute("""
+            INSERT INTO alert_history (alert_config_id, wallet_address, trade_id, sent_at, status)
+            SELECT c.id, t.wallet_address, t.id, 0, 'queued'
+            FROM alert_configs c, trades t WHERE t.signature = ?
+        """, (pending["signature"],))
+
+    positions = "SELECT COUNT(*), SUM(profit_sol), SUM(entry_amount_tokens) FROM positions GROUP BY status ORDER BY status"
+    with storage.read() as conn:
+        positions_before = conn.execute(positions).fetchall()
+
+    now = time.time()
+    cutoff = tracker.retention.cutoff(now)
+    old = [e for e in events[1:] if e["timestamp"] // 1000 < cutoff]
+    assert 0 < len(old) < len(events) - 1
+    assert tracker.retention.run_once(now) == len(old)
+    assert tracker.retention.run_once(now) == 0
+
+    assert count(storage, "SELECT COUNT(*) FROM trades") == len(events) - len(old)
+    assert count(storage, "SELECT COUNT(*) FROM trades WHERE timestamp < ?", (cutoff,)) == 1
+
+    wallets, tokens = expected_rollups(old)
+    with storage.read() as conn:
+        wallet_rows = conn.execute("""
+            SELECT wallet_address, day, buys, sells, buy_volume_sol, sell_volume_sol FROM wallet_daily
+        """).fetchall()
+        token_rows = conn.execute("""
+            SELECT token_address, day, buys, sells, buy_volume_sol, sell_volume_sol, low_price, high_price
+            FROM token_daily
+        """).fetchall()
+        assert conn.execute(positions).fetchall() == positions_before
+    assert {row[:2] for row in wallet_rows} == set(wallets)
+    for wallet, day, *values in wallet_rows:
+        assert_close(values, wallets[(wallet, day)])
+    assert {row[:2] for row in token_rows} == set(tokens)
+    for token, day, *values in token_rows:
+        assert_close(values, tokens[(token, day)])
+
+    assert tracker.check_wallet_stats() == []
+    restarted = SmartMoneyTracker(db_path=str(tmp_path / "tracker.db"), storage=storage)
+    assert restarted.retention.compacted_before == cutoff
+    assert restarted.check_wallet_stats() == []
+
+    # Resent frames from compacted days are dropped instead of re-inserted
+    assert restarted.process_batch(old[:50]) == 0
+    assert count(storage, "SELECT COUNT(*) FROM trades") == len(events) - len(old)
+
+
+def test_retention_is_off_by_default(tmp_path, monkeypatch):
+    events = old_events(count=300)
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "tracker.db"))
+    assert tracker.retention.horizon_days == 0
+
+    def loop_started():
+        raise AssertionError("retention loop started with RETENTION_DAYS=0")
+
+    monkeypatch.setattr(tracker, "_retention_loop", loop_started)
+
+    async def source(queue):
+        for event in events:
+            await tracker.enqueue(queue, time.perf_counter(), as_trade_event(event))
+
+    asyncio.run(tracker.run_pipeline(source, publish_alerts=False))
+    assert count(tracker.db, "SELECT COUNT(*) FROM trades") == len(events)
+
+    # Called directly it does nothing either
+    assert tracker.retention.run_once() == 0
+    assert tracker.retention.compacted_before == 0
+    assert count(tracker.db, "SELECT COUNT(*) FROM trades") == len(events)
+    assert count(tracker.db, "SELECT COUNT(*) FROM wallet_daily") == 0
@@ -0,0 +1,65 @@
+"""
+Smart Money Tracker - Scoring Test
+Vectorized batch scorer must agree with the scalar score formula
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+from db import Database
+from scoring import compute_performance_score, compute_performance_scores, rescore_all_wallets
+
+np = pytest.importorskip("numpy")
+
+NOW = 1_700_000_000
+
+
+def random_wallets(count: int = 5000, seed: int = 3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        total = rng.choice([0, 1, 2, 3, 4, 10, rng.randint(0, 500)])
+        wins = rng.randint(0, total)
+        roi_7d = rng.choice([0.0, -50.0, 999.0, 1000.0, 1500.0, rng.uniform(-100, 2000)])
+        vol_7d = rng.choice([0.0, 49.9, 50.0, 80.0, rng.uniform(0, 200)])
+        # Include the exact 24h/7d recency boundaries
+        last_active = rng.choice([NOW, NOW - 86400, NOW - 86401, NOW - 604800,
+                                  NOW - 604801, NOW - rng.randint(0, 30 * 86400)])
+        rows.append((f"Wallet{i:038d}", total, wins, roi_7d, vol_7d, last_active))
+    return rows
+
+
+def test_vectorized_matches_scalar():
+    rows = random_wallets()
+    _, total, wins, roi_7d, vol_7d, last_active = map(list, zip(*rows))
+
+    vectorized = compute_performance_scores(total, wins, roi_7d, vol_7d, last_active, NOW)
+    scalar = [compute_performance_score(*row[1:], NOW) for row in rows]
+
+    assert vectorized.tolist() == scalar
+
+
+def test_rescore_all_wallets_updates_stale_scores(tmp_path):
+    db = Database(str(tmp_path / "scores.db"))
+    db.init_schema()
+    rows = random_wallets(count=1200)
+    with db.write() as conn:
+        conn.executemany("""
+            INSERT INTO wallets (address, first_seen, last_active, total_trades, wins,
+                                 roi_7d, volume_7d, performance_score)
+            VALUES (?, 0, ?, ?, ?, ?, ?, 99)
+        """, [(a, last, total, wins, roi, vol) for a, total, wins, roi, vol, last in rows])
+
+    scanned, written = rescore_all_wallets(db, now=NOW, chunk_size=500)
+    assert scanned == len(rows)
+    assert written == len(rows)
+    assert rescore_all_wallets(db, now=NOW, chunk_size=500) == (len(rows), 0)
+
+    conn = sqlite3.connect(db.db_path)
+    stored = dict(conn.execute("SELECT address, performance_score FROM wallets").fetchall())
+    conn.close()
+    db.close()
+    for address, total, wins, roi, vol, last in rows:
+        assert stored[address] == compute_performance_score(total, wins, roi, vol, last, NOW)
@@ -0,0 +1,215 @@
+"""
+Smart Money Tracker - Storage Conformance Test
+The same ingest, bot and dashboard checks against every storage backend
+
+PostgreSQL runs when TEST_POSTGRES_DSN is set (see conftest.py), e.g.
+    TEST_POSTGRES_DSN=postgresql://postgres@localhost/postgres pytest code/test_storage.py
+"""
+
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+
+from conftest import count, make_events, make_tracker, reference_pnl
+from events import TradeEvent
+
+
+def test_replay_matches_brute_force(storage, tmp_path):
+    events = make_events(count=1500)
+    tracker = make_tracker(storage, tmp_path)
+    for start in range(0, len(events), 250):
+        tracker.process_batch(events[start:start + 250])
+    # Resent frames, within and across batches, apply nothing
+    assert tracker.process_batch(events[:100] + events[:100]) == 0
+
+    with storage.read() as conn:
+        realized = dict(conn.execute("""
+            SELECT wallet_address, SUM(profit_sol) FROM positions
+            WHERE status = 'closed' GROUP BY wallet_address
+        """).fetchall())
+        open_tokens = conn.execute("""
+            SELECT COALESCE(SUM(entry_amount_tokens), 0) FROM positions WHERE status = 'open'
+        """).fetchone()[0]
+
+    expected, expected_open = reference_pnl(events)
+    assert count(storage, "SELECT COUNT(*) FROM trades") == len(events)
+    assert set(realized) == set(expected)
+    for wallet, pnl in expected.items():
+        assert math.isclose(realized[wallet], pnl, rel_tol=1e-9, abs_tol=1e-9), wallet
+    assert math.isclose(open_tokens, expected_open, rel_tol=1e-9)
+    assert tracker.check_wallet_stats() == []
+
+    # A restarted tracker loads the same state back
+    assert make_tracker(storage, tmp_path).check_wallet_stats() == []
+
+
+def test_failed_event_rolls_back_alone(storage, tmp_path):
+    tracker = make_tracker(storage, tmp_path)
+    now = int(time.time())
+
+    def buy(wallet: str, i: int) -> TradeEvent:
+        return TradeEvent("buy", wallet, f"Mint{i}", "Token", "TKN", 1.0, 100.0,
+                          f"{wallet}-{i}", (now + i) * 1000)
+
+    assert tracker.process_batch([buy("Alerted", 0)]) == 1
+    asyncio.run(storage.track("u1", "Alerted", "chat", now))
+    with storage.write() as conn:
+        conn.execute("UPDATE alert_configs SET min_performance_score = 0")
+
+    # One event fails before any read, one after its alert check has read
+    # (and so flushed) its writes; both must vanish without the rest
+    check_alerts = tracker._check_alerts
+
+    def failing_check(cursor, wallet, *args):
+        check_alerts(cursor, wallet, *args)
+        if wallet == "Alerted":
+            raise RuntimeError("alert check failed")
+
+    def failing_stats(cursor, wallet):
+        if wallet == "Broken":
+            raise RuntimeError("stats failed")
+        update_stats(cursor, wallet)
+
+    update_stats = tracker._update_wallet_stats
+    tracker._check_alerts = failing_check
+    tracker._update_wallet_stats = failing_stats
+    batch = [buy("Good", 1), buy("Broken", 2), buy("Alerted", 3), buy("Good", 4)]
+    assert tracker.process_batch(batch) == 2
+
+    assert count(storage, "SELECT COUNT(*) FROM trades") == 3
+    assert count(storage, "SELECT COUNT(*) FROM wallets WHERE address = 'Broken'") == 0
+    assert count(storage, "SELECT COUNT(*) FROM positions WHERE wallet_address = 'Alerted'") == 1
+    assert count(storage, "SELECT COUNT(*) FROM alert_history") == 0
+
+    # The failed events are applied once the fault clears
+    tracker._check_alerts = check_alerts
+    tracker._update_wallet_stats = update_stats
+    assert tracker.process_batch(batch) == 2
+    assert count(storage, "SELECT COUNT(*) FROM trades") == 5
+    assert count(storage, "SELECT COUNT(*) FROM alert_history WHERE status = 'queued'") == 1
+    assert tracker.check_wallet_stats() == []
+
+
+def test_constraint_error_loses_only_its_event(storage, tmp_path):
+    tracker = make_tracker(storage, tmp_path)
+    now = int(time.time())
+    open_position = tracker._open_position
+
+    def broken_open(cursor, wallet, *args):
+        if wallet == "Broken":
+            # positions.token_address is NOT NULL; PostgreSQL only finds out at commit
+            cursor.execute("INSERT INTO positions (wallet_address) VALUES (?)", (wallet,))
+        open_position(cursor, wallet, *args)
+
+    tracker._open_position = broken_open
+    batch = [TradeEvent("buy", wallet, f"Mint{i}", "Token", "TKN", 1.0, 100.0,
+                        f"{wallet}-{i}", (now + i) * 1000)
+             for i, wallet in enumerate(["Good", "Broken", "Other"])]
+    assert tracker.process_batch(batch) == 2
+
+    assert count(storage, "SELECT COUNT(*) FROM trades") == 2
+    assert count(storage, "SELECT COUNT(*) FROM positions") == 2
+    assert count(storage, "SELECT COUNT(*) FROM wallets WHERE address = 'Broken'") == 0
+    assert tracker.check_wallet_stats() == []
+
+
+def test_trade_stored_by_another_writer_is_a_duplicate(storage, tmp_path, monkeypatch):
+    tracker = make_tracker(storage, tmp_path)
+    now = int(time.time())
+    batch = [TradeEvent("buy", "Wallet", f"Mint{i}", "Token", "TKN", 1.0, 100.0,
+                        f"sig-{i}", (now + i) * 1000) for i in range(3)]
+    with storage.write() as conn:
+        conn.execute("INSERT INTO wallets (address, first_seen, last_active) VALUES ('Wallet', 0, 0)")
+
+    # Another process stores sig-1 right after the batch looked it up
+    session = storage.session
+    raced = []
+
+    @contextmanager
+    def racing_session():
+        with session() as cursor:
+            prepare = cursor.prepare_trades
+
+            def prepare_trades(signatures):
+                prepare(signatures)
+                if not raced:
+                    raced.append(True)
+                    with storage.write() as conn:
+                        conn.execute("""
+                            INSERT INTO trades (wallet_address, token_address, action, amount_sol,
+                                                timestamp, signature)
+                            VALUES ('Wallet', 'Mint1', 'buy', 1.0, ?, 'sig-1')
+                        """, (now,))
+
+            cursor.prepare_trades = prepare_trades
+            yield cursor
+
+    monkeypatch.setattr(storage, "session", racing_session)
+    assert tracker.process_batch(batch) == 2
+
+    # Nothing points at an id the lost trade never got
+    assert count(storage, "SELECT COUNT(*) FROM trades") == 3
+    assert count(storage, "SELECT COUNT(*) FROM positions") == 2
+    assert count(storage, """
+        SELECT COUNT(*) FROM positions WHERE entry_trade_id NOT IN (SELECT id FROM trades)
+    """) == 0
+    assert tracker.check_wallet_stats() == []
+
+
+def test_bot_and_dashboard_queries(storage, tmp_path):
+    tracker = make_tracker(storage, tmp_path)
+    events = make_events(count=400)
+    tracker.process_batch(events)
+    tracker.flush_scores()
+    wallet = events[0]["traderPublicKey"]
+
+    async def run():
+        leaders = await storage.leaderboard(5, min_trades=1)
+        assert leaders and len(leaders[0]) == 9
+        assert [row[1] for row in leaders] == sorted((row[1] for row in leaders), reverse=True)
+
+        stats = await storage.wallet(wallet)
+        assert stats[1] > 0 and stats[11] == events[0]["timestamp"] // 1000
+        assert await storage.wallet("Unknown") is None
+        trades = await storage.recent_trades(wallet, 3)
+        assert len(trades) == 3 and trades[0][4] >= trades[-1][4]
+        assert len(await storage.recent_positions(wallet, 4)) == 4
+
+        assert not await storage.is_tracking("u1", wallet)
+        await storage.track("u1", wallet, "chat1", 1)
+        assert await storage.is_tracking("u1", wallet)
+        assert [row[0] for row in await storage.tracked_wallets("u1")] == [wallet]
+        await storage.track("u1", wallet, "chat1", 2)
+        assert await storage.untrack("u1", wallet) == 2
+        assert await storage.tracked_wallets("u1") == []
+        assert await storage.untrack("u2", wallet) == 0
+
+        await storage.track("u2", wallet, "chat2", 3)
+        with storage.write() as conn:
+            conn.execute("UPDATE alert_configs SET min_performance_score = 0, min_buy_amount_sol = 0")
+
+    asyncio.run(run())
+
+    # The monitor picks the subscription up on its next batch
+    now = int(time.time())
+    tracker.process_batch([TradeEvent("buy", wallet, "MintAlert", "Token", "TKN", 1.0, 100.0,
+                                      "sig-alert", now * 1000)], [now + 0.5])
+
+    async def deliver():
+        queued = await storage.queued_alerts(now + 1)
+        assert len(queued) == 1
+        alert_id, trade_id, queued_at, alert_type, chat_id = queued[0]
+        assert (alert_type, chat_id) == ("telegram", "chat2")
+        [trade] = await storage.alert_trades([trade_id])
+        assert trade[:2] == (trade_id, wallet) and trade[6] == now
+
+        await storage.settle_alerts(wallet, [("sent", queued_at + 1, queued_at + 2, alert_id)])
+        # Already settled rows are left alone
+        await storage.settle_alerts(wallet, [("failed", queued_at + 5, None, alert_id)])
+        assert await storage.queued_alerts(now + 1) == []
+
+        [row] = await storage.alert_latency_rows(queued_at - 1, queued_at + 1)
+        assert row == (now, now + 0.5, queued_at, queued_at + 1, queued_at + 2)
+
+    asyncio.run(deliver())
@@ -0,0 +1,135 @@
+"""
+Smart Money Tracker - Feed Subscriptions Test
+Reconcile sends only the diff; launches are followed even when a socket
+drops; a reconnected connection resubscribes everything it owns
+"""
+
+import asyncio
+import json
+
+import websockets
+
+import subscriptions
+from metrics import MetricsRegistry
+from subscriptions import ACCOUNT, TOKEN, FeedConnection, SubscriptionManager
+
+
+class FakeSocket:
+    """Records what a connection sends; optionally fails like a dropped socket"""
+
+    def __init__(self, closed: bool = False):
+        self.sent = []
+        self.closed = closed
+
+    async def send(self, message: str):
+        if self.closed:
+            raise websockets.ConnectionClosedError(None, None)
+        self.sent.append(json.loads(message))
+
+
+def make_manager(**kwargs) -> SubscriptionManager:
+    kwargs.setdefault("keys_per_connection", 3)
+    return SubscriptionManager(None, url="ws://unused", metrics=MetricsRegistry(), **kwargs)
+
+
+def sent(manager: SubscriptionManager):
+    return [(connection.index, message["method"], sorted(message["keys"]))
+            for connection in manager.connections for message in connection._websocket.sent]
+
+
+def test_reconcile_sends_only_the_diff():
+    async def run():
+        manager = make_manager()
+        await manager.reconcile({"w1", "w2"}, {"t1", "t2"})
+        # Four keys at three per connection
+        assert len(manager.connections) == 2
+        assert [len(connection) for connection in manager.connections] == [3, 1]
+        assert manager.token_count == 2
+
+        for connection in manager.connections:
+            connection._websocket = FakeSocket()
+        await manager.reconcile({"w1"}, {"t2", "t3"})
+
+        # w1, w2 and t1 filled the first connection; t3 takes a slot freed there
+        assert sent(manager) == [
+            (0, "unsubscribeAccountTrade", ["w2"]),
+            (0, "unsubscribeTokenTrade", ["t1"]),
+            (0, "subscribeTokenTrade", ["t3"]),
+        ]
+        assert len(manager.connections) == 2
+        assert sum(map(len, manager.connections)) == 3
+        assert {key for (_, key) in manager._owner} == {"w1", "t2", "t3"}
+        assert manager.token_count == 2 and manager._tokens.value == 2
+
+        # Nothing changed, nothing sent
+        for connection in manager.connections:
+            connection._websocket.sent.clear()
+        await manager.reconcile({"w1"}, {"t2", "t3"})
+        assert sent(manager) == []
+
+    asyncio.run(run())
+
+
+def test_follow_launch_survives_a_dropped_socket():
+    async def run():
+        manager = make_manager(max_hot_tokens=2)
+        await manager.reconcile(set(), {"t1"})
+        manager.connections[0]._websocket = FakeSocket(closed=True)
+
+        await manager._follow_launch(json.dumps({"txType": "create", "mint": "new1"}), 1.0)
+        # Kept on the connection, so run() resubscribes it after reconnecting
+        assert "new1" in manager.connections[0].keys[TOKEN]
+        assert manager.token_count == 2 and manager._tokens.value == 2
+
+        # The cap counts launches followed since the last reconcile
+        await manager._follow_launch(json.dumps({"txType": "create", "mint": "new2"}), 2.0)
+        assert (TOKEN, "new2") not in manager._owner
+        assert "new2" in manager._launches
+
+        # A reconcile resets the count to what it subscribed
+        await manager.reconcile(set(), {"t1"})
+        assert manager.token_count == 1
+
+    asyncio.run(run())
+
+
+def test_reconnect_resubscribes_every_key(monkeypatch):
+    monkeypatch.setattr(subscriptions, "backoff_delay", lambda attempt: 0)
+
+    async def run():
+        received = []
+
+        async def handler(websocket):
+            # Each connection gets its subscriptions, one frame, then a drop
+            for _ in range(2):
+                received.append((len(received) // 2, json.loads(await websocket.recv())))
+            await websocket.send(json.dumps({"txType": "buy", "n": len(received)}))
+            await websocket.close()
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            frames = asyncio.Queue()
+            connection = FeedConnection(0, f"ws://127.0.0.1:{port}", frames, batch_size=100,
+                                        metrics=MetricsRegistry())
+            connection.keys[ACCOUNT].update({"w1", "w2"})
+            connection.keys[TOKEN].add("t1")
+            task = asyncio.create_task(connection.run())
+            try:
+                first = await asyncio.wait_for(frames.get(), 5)
+                second = await asyncio.wait_for(frames.get(), 5)
+            finally:
+                task.cancel()
+
+        assert json.loads(first[1])["n"] != json.loads(second[1])["n"]
+        subscribed = [(attempt, message["method"], sorted(message["keys"]))
+                      for attempt, message in received[:4]]
+        assert subscribed == [
+            (0, "subscribeAccountTrade", ["w1", "w2"]),
+            (0, "subscribeTokenTrade", ["t1"]),
+            (1, "subscribeAccountTrade", ["w1", "w2"]),
+            (1, "subscribeTokenTrade", ["t1"]),
+        ]
+        assert connection._reconnects.value >= 1
+        assert connection._gaps.count >= 1
+
+    asyncio.run(run())
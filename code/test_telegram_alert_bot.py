@@ -0,0 +1,69 @@
+"""
+Smart Money Tracker - Telegram Alert Bot Test
+Alerts whose status could not be settled stay queued for the next poll
+"""
+
+import asyncio
+import time
+
+from events import TradeEvent
+from smart_money_monitor import SmartMoneyTracker
+from telegram_alert_bot import TelegramAlertBot
+
+
+def test_failed_settle_leaves_alerts_for_catch_up(tmp_path, monkeypatch):
+    tracker = SmartMoneyTracker(db_path=str(tmp_path / "bot.db"))
+    with tracker.db.write() as conn:
+        conn.executemany("""
+            INSERT INTO alert_configs (user_id, wallet_address, alert_type, alert_destination,
+                                       min_performance_score, min_buy_amount_sol, created_at)
+            VALUES (?, 'Wallet', 'telegram', ?, 0, 0.1, 0)
+        """, [("u1", "chat1"), ("u2", "chat2")])
+    assert tracker.process_batch([TradeEvent("buy", "Wallet", "Mint", "Token", "TKN", 1.0, 100.0,
+                                             "sig", int(time.time() * 1000))]) == 1
+
+    bot = TelegramAlertBot("token", storage=tracker.db)
+    sent = []
+
+    async def send_message(**kwargs):
+        sent.append(kwargs["chat_id"])
+
+    bot.sender.send_func = send_message
+    settle = bot.db.settle_alerts
+
+    async def broken_settle(wallet, statuses):
+        raise RuntimeError("database is locked")
+
+    def statuses():
+        with tracker.db.read() as conn:
+            return sorted(conn.execute("SELECT status FROM alert_history").fetchall())
+
+    async def poll():
+        for payload in await bot._queued_alerts(int(time.time()) + 60):
+            await bot.deliver_alert(payload)
+
+    async def run():
+        try:
+            monkeypatch.setattr(bot.db, "settle_alerts", broken_settle)
+            await poll()
+            assert sorted(sent) == ["chat1", "chat2"]
+            assert statuses() == [("queued",), ("queued",)]
+            assert not bot._in_flight and not bot._delivered
+
+            # The next poll retries them once the database recovers
+            monkeypatch.setattr(bot.db, "settle_alerts", settle)
+            await poll()
+            assert len(sent) == 4
+            assert statuses() == [("sent",), ("sent",)]
+            assert len(bot._delivered) == 2
+
+            # Settled alerts are not sent again, even if a push repeats them
+            payload = {"wallet": "Wallet", "alerts": [{"alert_id": alert_id, "chat_id": "chat1"}
+                                                      for alert_id in bot._delivered]}
+            await bot.deliver_alert(payload)
+            await poll()
+            assert len(sent) == 4
+        finally:
+            await bot.sender.stop()
+
+    asyncio.run(run())
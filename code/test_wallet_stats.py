@@ -0,0 +1,100 @@
+"""
+Smart Money Tracker - Wallet Statistics Test
+The consistency checker reports and repairs drifted accumulators; hourly
+buckets roll out of the 24h/7d windows and sweep expires idle wallets
+"""
+
+import math
+
+from conftest import count, make_events, make_tracker
+from wallet_stats import BUCKET_SECONDS, RollingWindows, WalletStatsEngine
+
+HOUR = BUCKET_SECONDS
+DAY = 24 * HOUR
+START = 1_700_000_000 // DAY * DAY
+
+
+def test_checker_repairs_a_drifted_wallet(storage, tmp_path):
+    tracker = make_tracker(storage, tmp_path)
+    tracker.process_batch(make_events(count=600))
+    assert tracker.check_wallet_stats() == []
+
+    # A winning close rewritten behind the tracker's back
+    with storage.write() as conn:
+        position_id, wallet, profit = conn.execute("""
+            SELECT id, wallet_address, profit_sol FROM positions
+            WHERE status = 'closed' AND profit_sol > 0 ORDER BY id LIMIT 1
+        """).fetchone()
+        conn.execute("UPDATE positions SET profit_sol = ? WHERE id = ?", (-profit, position_id))
+    stale = count(storage, "SELECT wins FROM wallets WHERE address = ?", (wallet,))
+
+    mismatches = tracker.check_wallet_stats()
+    assert {m['wallet'] for m in mismatches} == {wallet}
+    assert {m['field'] for m in mismatches} == {'wins', 'losses', 'total_profit'}
+    wins = next(m for m in mismatches if m['field'] == 'wins')
+    assert (wins['memory'], wins['sql']) == (stale, stale - 1)
+
+    # Repaired in memory and in the wallets row
+    assert tracker.check_wallet_stats() == []
+    with storage.read() as conn:
+        row = conn.execute("""
+            SELECT wins, losses, total_profit_sol FROM wallets WHERE address = ?
+        """, (wallet,)).fetchone()
+        expected = conn.execute("""
+            SELECT SUM(CASE WHEN profit_sol > 0 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN profit_sol <= 0 THEN 1 ELSE 0 END), SUM(profit_sol)
+            FROM positions WHERE status = 'closed' AND wallet_address = ?
+        """, (wallet,)).fetchone()
+    assert row[:2] == tuple(expected[:2]) and row[0] == stale - 1
+    assert math.isclose(row[2], expected[2], rel_tol=1e-9)
+
+
+def test_buckets_roll_out_of_the_windows():
+    windows = RollingWindows()
+    windows.add_buy(START, 1.0)
+    windows.add_close(START + 10, 0.5, 2.0)
+    windows.add_buy(START + 5 * HOUR, 3.0)
+    # A late event lands in its own hour, keeping buckets in order
+    windows.add_buy(START + 2 * HOUR + 59, 4.0)
+    assert [bucket[0] for bucket in windows.buckets] == [START // HOUR + h for h in (0, 2, 5)]
+
+    assert windows.sums(START + 23 * HOUR) == (8.0, 8.0, 25.0, 25.0)
+    # The first hour leaves the 24h window but stays in the 7d one
+    assert windows.sums(START + DAY) == (7.0, 8.0, 0, 25.0)
+    assert len(windows.buckets) == 3
+
+    # ... and is dropped once it leaves the 7d window
+    assert windows.sums(START + 7 * DAY) == (0, 7.0, 0, 0)
+    assert len(windows.buckets) == 2
+    assert windows.sums(START + 7 * DAY + 5 * HOUR) == (0, 0, 0, 0)
+    assert not windows.buckets
+
+
+def test_sweep_writes_changes_and_expires_idle_wallets():
+    engine = WalletStatsEngine()
+    engine.record_buy(None, "active", START, 1.0, START)
+    engine.record_buy(None, "idle", START, 2.0, START)
+
+    now = START + HOUR
+    assert sorted(engine.sweep(None, now), key=lambda row: row[-1]) == [
+        (1.0, 1.0, 0, 0, "active"),
+        (2.0, 2.0, 0, 0, "idle"),
+    ]
+    # Nothing changed since the last sweep
+    assert engine.sweep(None, now) == []
+
+    now = START + 6 * DAY
+    engine.record_buy(None, "active", now, 5.0, now)
+    assert sorted(engine.sweep(None, now), key=lambda row: row[-1]) == [
+        (5.0, 6.0, 0, 0, "active"),
+        (0, 2.0, 0, 0, "idle"),
+    ]
+
+    # A week on, the idle wallet is written once as zeros and forgotten
+    now = START + 7 * DAY
+    assert sorted(engine.sweep(None, now), key=lambda row: row[-1]) == [
+        (0, 5.0, 0, 0, "active"),
+        (0, 0, 0, 0, "idle"),
+    ]
+    assert len(engine._windows) == 1 and "idle" not in engine._windows
+    assert engine.sweep(None, now + HOUR) == []
@@ -0,0 +1,297 @@
+"""
+Smart Money Tracker - Incremental Wallet Statistics
+Per-wallet win/loss/profit/hold-time accumulators updated as positions close,
+plus hourly rolling windows for the 24h/7d volume and ROI columns
+"""
+
+import math
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same aggregate the tracker used to run on every trade
+CLOSED_POSITION_AGGREGATE = """
+    SELECT wallet_address,
+           SUM(CASE WHEN profit_sol > 0 THEN 1 ELSE 0 END) as wins,
+           SUM(CASE WHEN profit_sol <= 0 THEN 1 ELSE 0 END) as losses,
+           SUM(profit_sol) as total_profit,
+           SUM(hold_time_mins) as hold_sum,
+           COUNT(hold_time_mins) as hold_count
+    FROM positions
+    WHERE status = 'closed'
+"""
+
+# Rolling windows are kept in hourly buckets, so window edges are accurate
+# to within one hour of the exact `timestamp >= now - N` cut-off
+BUCKET_SECONDS = 3600
+BUCKETS_24H = 24
+BUCKETS_7D = 168
+
+BUY_VOLUME_BY_HOUR = """
+    SELECT wallet_address, timestamp / 3600 as hour, SUM(amount_sol)
+    FROM trades
+    WHERE action = 'buy' AND timestamp >= ?
+"""
+
+CLOSED_BY_HOUR = """
+    SELECT wallet_address, exit_timestamp / 3600 as hour,
+           SUM(profit_sol), SUM(entry_amount_sol)
+    FROM positions
+    WHERE status = 'closed' AND exit_timestamp >= ?
+"""
+
+
+class WalletStats:
+    """Running totals over a wallet's closed positions"""
+
+    __slots__ = ('wins', 'losses', 'total_profit', 'hold_sum', 'hold_count')
+
+    def __init__(self, wins: int = 0, losses: int = 0, total_profit: float = 0.0,
+                 hold_sum: float = 0.0, hold_count: int = 0):
+        self.wins = wins
+        self.losses = losses
+        self.total_profit = total_profit
+        self.hold_sum = hold_sum
+        self.hold_count = hold_count
+
+    @property
+    def total(self) -> int:
+        return self.wins + self.losses
+
+    @property
+    def avg_hold(self) -> Optional[float]:
+        return self.hold_sum / self.hold_count if self.hold_count else None
+
+    def record_close(self, profit_sol: float, hold_time_mins: Optional[int]):
+        """Fold one closed position into the totals"""
+        if profit_sol > 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.total_profit += profit_sol
+        if hold_time_mins is not None:
+            self.hold_sum += hold_time_mins
+            self.hold_count += 1
+
+
+class RollingWindows:
+    """Hourly buckets of buy volume and closed profit/entry for one wallet
+
+    Buckets are [hour, buy_volume, closed_profit, closed_entry], oldest
+    first. Only hours with activity are stored and anything older than
+    seven days is dropped, so a window sum walks at most 168 buckets.
+    """
+
+    __slots__ = ('buckets', 'written')
+
+    def __init__(self):
+        self.buckets: deque = deque()
+        # Last (volume_24h, volume_7d, roi_24h, roi_7d) written to `wallets`
+        self.written: Optional[Tuple[float, float, float, float]] = None
+
+    def _bucket(self, hour: int) -> list:
+        buckets = self.buckets
+        if buckets and buckets[-1][0] == hour:
+            return buckets[-1]
+        if not buckets or buckets[-1][0] < hour:
+            bucket = [hour, 0.0, 0.0, 0.0]
+            buckets.append(bucket)
+            return bucket
+
+        # Late event: walk back to the matching hour or its insertion point
+        for i in range(len(buckets) - 1, -1, -1):
+            if buckets[i][0] == hour:
+                return buckets[i]
+            if buckets[i][0] < hour:
+                bucket = [hour, 0.0, 0.0, 0.0]
+                buckets.insert(i + 1, bucket)
+                return bucket
+        bucket = [hour, 0.0, 0.0, 0.0]
+        buckets.appendleft(bucket)
+        return bucket
+
+    def add_buy(self, timestamp: int, sol: float):
+        self._bucket(timestamp // BUCKET_SECONDS)[1] += sol
+
+    def add_close(self, timestamp: int, profit_sol: float, entry_sol: float):
+        bucket = self._bucket(timestamp // BUCKET_SECONDS)
+        bucket[2] += profit_sol
+        bucket[3] += entry_sol
+
+    def expire(self, now: int):
+        """Drop buckets that have left the 7d window"""
+        oldest = now // BUCKET_SECONDS - BUCKETS_7D + 1
+        buckets = self.buckets
+        while buckets and buckets[0][0] < oldest:
+            buckets.popleft()
+
+    def sums(self, now: int) -> Tuple[float, float, float, float]:
+        """Return (volume_24h, volume_7d, roi_24h, roi_7d) as of `now`"""
+        self.expire(now)
+        day_start = now // BUCKET_SECONDS - BUCKETS_24H + 1
+
+        vol_24h = vol_7d = 0.0
+        profit_24h = profit_7d = 0.0
+        entry_24h = entry_7d = 0.0
+        for hour, volume, profit, entry in self.buckets:
+            vol_7d += volume
+            profit_7d += profit
+            entry_7d += entry
+            if hour >= day_start:
+                vol_24h += volume
+                profit_24h += profit
+                entry_24h += entry
+
+        roi_24h = (profit_24h / entry_24h * 100) if entry_24h else 0
+        roi_7d = (profit_7d / entry_7d * 100) if entry_7d else 0
+        return vol_24h, vol_7d, roi_24h, roi_7d
+
+
+class WalletStatsEngine:
+    """In-memory WalletStats and RollingWindows, seeded once from the DB
+
+    Wallets whose in-memory state may have diverged from the database (for
+    example after a rolled-back batch) are marked stale and reloaded from
+    SQL the next time they are read.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, WalletStats] = {}
+        self._windows: Dict[str, RollingWindows] = {}
+        self._stale: Set[str] = set()
+        self._stale_windows: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def load(self, cursor, now: int):
+        """Seed accumulators for all wallets from closed positions and recent trades"""
+        cursor.execute(CLOSED_POSITION_AGGREGATE + " GROUP BY wallet_address")
+        self._stats = {
+            row[0]: WalletStats(row[1] or 0, row[2] or 0, row[3] or 0.0, row[4] or 0.0, row[5] or 0)
+            for row in cursor.fetchall()
+        }
+        self._stale.clear()
+
+        self._windows = {}
+        self._stale_windows.clear()
+        self._load_windows(cursor, now)
+        logger.info(f"Loaded wallet stats for {len(self._stats)} wallets, "
+                    f"rolling windows for {len(self._windows)}")
+
+    def _load_windows(self, cursor, now: int, wallet: Optional[str] = None):
+        since = (now // BUCKET_SECONDS - BUCKETS_7D + 1) * BUCKET_SECONDS
+        wallet_filter = " AND wallet_address = ?" if wallet else ""
+        params = (since, wallet) if wallet else (since,)
+
+        # Buckets are created in hour order so each deque stays sorted
+        cursor.execute(BUY_VOLUME_BY_HOUR + wallet_filter +
+                       " GROUP BY wallet_address, hour ORDER BY hour", params)
+        for address, hour, volume in cursor.fetchall():
+            self._windows.setdefault(address, RollingWindows()).add_buy(hour * BUCKET_SECONDS, volume or 0.0)
+
+        cursor.execute(CLOSED_BY_HOUR + wallet_filter +
+                       " GROUP BY wallet_address, hour ORDER BY hour", params)
+        for address, hour, profit, entry in cursor.fetchall():
+            self._windows.setdefault(address, RollingWindows()).add_close(
+                hour * BUCKET_SECONDS, profit or 0.0, entry or 0.0)
+
+    def _reload(self, cursor, wallet: str) -> WalletStats:
+        cursor.execute(CLOSED_POSITION_AGGREGATE + " AND wallet_address = ? GROUP BY wallet_address", (wallet,))
+        row = cursor.fetchone() or (wallet, 0, 0, 0.0, 0.0, 0)
+        stats = WalletStats(row[1] or 0, row[2] or 0, row[3] or 0.0, row[4] or 0.0, row[5] or 0)
+        self._stats[wallet] = stats
+        return stats
+
+    def get(self, cursor, wallet: str) -> WalletStats:
+        """Current stats for a wallet (reloaded from SQL if marked stale)"""
+        if wallet in self._stale:
+            self._stale.discard(wallet)
+            return self._reload(cursor, wallet)
+
+        stats = self._stats.get(wallet)
+        if stats is None:
+            stats = self._stats[wallet] = WalletStats()
+        return stats
+
+    def windows(self, cursor, wallet: str, now: int) -> RollingWindows:
+        """Rolling windows for a wallet (reloaded from SQL if marked stale)"""
+        if wallet in self._stale_windows:
+            self._stale_windows.discard(wallet)
+            self._windows.pop(wallet, None)
+            self._load_windows(cursor, now, wallet)
+            return self._windows.setdefault(wallet, RollingWindows())
+
+        windows = self._windows.get(wallet)
+        if windows is None:
+            windows = self._windows[wallet] = RollingWindows()
+        return windows
+
+    def record_buy(self, cursor, wallet: str, timestamp: int, sol: float, now: int):
+        self.windows(cursor, wallet, now).add_buy(timestamp, sol)
+
+    def record_close(self, cursor, wallet: str, profit_sol: float, hold_time_mins: Optional[int],
+                     entry_sol: float, timestamp: int, now: int):
+        self.get(cursor, wallet).record_close(profit_sol, hold_time_mins)
+        self.windows(cursor, wallet, now).add_close(timestamp, profit_sol, entry_sol)
+
+    def invalidate(self, wallet: str):
+        """Mark a wallet for reload after its writes were rolled back"""
+        self._stale.add(wallet)
+        self._stale_windows.add(wallet)
+
+    def sweep(self, cursor, now: int) -> List[Tuple[float, float, float, float, str]]:
+        """Expire old buckets and collect window values that changed
+
+        Returns (volume_24h, volume_7d, roi_24h, roi_7d, address) rows for
+        every wallet whose windows differ from what was last written.
+        Wallets with no buckets left are written once more as zeros and
+        then dropped from memory.
+        """
+        for wallet in list(self._stale_windows):
+            self.windows(cursor, wallet, now)
+
+        rows = []
+        for wallet in list(self._windows):
+            windows = self._windows[wallet]
+            values = windows.sums(now)
+            if values != windows.written:
+                rows.append(values + (wallet,))
+                windows.written = values
+            if not windows.buckets:
+                del self._windows[wallet]
+        return rows
+
+    def check_consistency(self, cursor, rel_tol: float = 1e-6) -> List[Dict]:
+        """Compare in-memory state against the SQL aggregates
+
+        Returns one dict per mismatching wallet/field; an empty list means
+        the accumulators agree with the positions table.
+        """
+        cursor.execute(CLOSED_POSITION_AGGREGATE + " GROUP BY wallet_address")
+        expected = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        mismatches = []
+        for wallet in set(expected) | set(self._stats):
+            if wallet in self._stale:
+                continue
+
+            stats = self._stats.get(wallet, WalletStats())
+            sql = expected.get(wallet, (0, 0, 0.0, 0.0, 0))
+            actual = (stats.wins, stats.losses, stats.total_profit, stats.hold_sum, stats.hold_count)
+
+            for field, mem_value, sql_value in zip(
+                ('wins', 'losses', 'total_profit', 'hold_sum', 'hold_count'), actual, sql
+            ):
+                sql_value = sql_value or 0
+                if not math.isclose(mem_value, sql_value, rel_tol=rel_tol, abs_tol=1e-9):
+                    mismatches.append({
+                        'wallet': wallet,
+                        'field': field,
+                        'memory': mem_value,
+                        'sql': sql_value,
+                    })
+
+        return mismatches
@@ -4,40 +4,52 @@ Simple FastAPI web interface for viewing wallet leaderboard and stats
 """
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import sqlite3
 import time
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from alert_latency import latency_report
+from db import DEFAULT_DB_PATH, DEFAULT_SHARDS
+from metrics import CONTENT_TYPE, REGISTRY
+from storage import STORAGE_URL, get_storage
+
 app = FastAPI(title="Smart Money Tracker")
 
-# Database path
-DB_PATH = "data/smart_money_tracker.db"
+# Database: STORAGE_URL, else the SQLite file(s) at DB_PATH
+DB_PATH = DEFAULT_DB_PATH
+DB_SHARDS = DEFAULT_SHARDS
 
 def get_db():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+    """Get the shared Storage (its queries are awaitable)"""
+    return get_storage(STORAGE_URL, DB_PATH, DB_SHARDS)
+
+request_latency = REGISTRY.latency("dashboard_request_seconds", "Dashboard request handling time")
+requests_failed = REGISTRY.counter("dashboard_requests_failed_total", "Dashboard requests answered with a 5xx")
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    request_latency.observe(time.perf_counter() - started)
+    if response.status_code >= 500:
+        requests_failed.inc()
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the dashboard's metrics"""
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type=CONTENT_TYPE)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with leaderboard"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT address, performance_score, total_trades, wins, losses, 
-               total_profit_sol, roi_7d, volume_7d, last_active
-        FROM wallets
-        WHERE total_trades >= 5
-        ORDER BY performance_score DESC
-        LIMIT 20
-    """)
+    rows = await get_db().leaderboard(20)
     
     wallets = []
-    for row in cursor.fetchall():
+    for row in rows:
         addr, score, total, wins, losses, profit, roi_7d, vol_7d, last_active = row
         win_rate = (wins / total * 100) if total > 0 else 0
         
@@ -64,8 +76,6 @@ async def home(request: Request):
             'last_active': last_active_str
         })
     
-    conn.close()
-    
     html = f"""
 <!DOCTYPE html>
 <html>
@@ -301,37 +311,22 @@ async def home(request: Request):
 @app.get("/wallet/{address}", response_class=HTMLResponse)
 async def wallet_detail(address: str):
     """Detailed wallet view"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
+    db = get_db()
     # Get wallet data
-    cursor.execute("""
-        SELECT performance_score, total_trades, wins, losses, total_profit_sol,
-               avg_hold_time_mins, roi_7d, roi_24h, volume_7d, volume_24h, 
-               last_active, first_seen
-        FROM wallets
-        WHERE address = ?
-    """, (address,))
+    wallet_data = await db.wallet(address)
     
-    wallet_data = cursor.fetchone()
     if not wallet_data:
-        conn.close()
         raise HTTPException(status_code=404, detail="Wallet not found")
     
+    # Get recent trades and positions
+    trade_rows = await db.recent_trades(address, 20)
+    position_rows = await db.recent_positions(address, 10)
+    
     score, total, wins, losses, profit, avg_hold, roi_7d, roi_24h, vol_7d, vol_24h, last_active, first_seen = wallet_data
     win_rate = (wins / total * 100) if total > 0 else 0
     
-    # Get recent trades
-    cursor.execute("""
-        SELECT token_symbol, token_name, action, amount_sol, timestamp
-        FROM trades
-        WHERE wallet_address = ?
-        ORDER BY timestamp DESC
-        LIMIT 20
-    """, (address,))
-    
     trades = []
-    for row in cursor.fetchall():
+    for row in trade_rows:
         symbol, name, action, sol, ts = row
         trades.append({
             'symbol': symbol,
@@ -341,18 +336,8 @@ async def wallet_detail(address: str):
             'time': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
         })
     
-    # Get recent positions
-    cursor.execute("""
-        SELECT token_symbol, entry_timestamp, exit_timestamp, 
-               profit_sol, profit_percent, hold_time_mins, status
-        FROM positions
-        WHERE wallet_address = ?
-        ORDER BY entry_timestamp DESC
-        LIMIT 10
-    """, (address,))
-    
     positions = []
-    for row in cursor.fetchall():
+    for row in position_rows:
         symbol, entry_ts, exit_ts, profit_sol, profit_pct, hold_mins, status = row
         positions.append({
             'symbol': symbol,
@@ -364,8 +349,6 @@ async def wallet_detail(address: str):
             'status': status
         })
     
-    conn.close()
-    
     score_class = 'score-high' if score >= 80 else 'score-med' if score >= 60 else 'score-low'
     
     html = f"""
@@ -584,20 +567,10 @@ async def wallet_detail(address: str):
 @app.get("/api/leaderboard")
 async def api_leaderboard(limit: int = 20):
     """API endpoint for leaderboard data"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT address, performance_score, total_trades, wins, losses, 
-               total_profit_sol, roi_7d, volume_7d, last_active
-        FROM wallets
-        WHERE total_trades >= 5
-        ORDER BY performance_score DESC
-        LIMIT ?
-    """, (limit,))
+    rows = await get_db().leaderboard(limit)
     
     wallets = []
-    for row in cursor.fetchall():
+    for row in rows:
         addr, score, total, wins, losses, profit, roi_7d, vol_7d, last_active = row
         wallets.append({
             'address': addr,
@@ -612,25 +585,14 @@ async def api_leaderboard(limit: int = 20):
             'last_active': last_active
         })
     
-    conn.close()
     return JSONResponse(content={'wallets': wallets})
 
 @app.get("/api/wallet/{address}")
 async def api_wallet(address: str):
     """API endpoint for wallet details"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT performance_score, total_trades, wins, losses, total_profit_sol,
-               avg_hold_time_mins, roi_7d, roi_24h, volume_7d, volume_24h, last_active
-        FROM wallets
-        WHERE address = ?
-    """, (address,))
+    data = await get_db().wallet(address)
     
-    data = cursor.fetchone()
     if not data:
-        conn.close()
         raise HTTPException(status_code=404, detail="Wallet not found")
     
     wallet = {
@@ -649,9 +611,17 @@ async def api_wallet(address: str):
         'last_active': data[10]
     }
     
-    conn.close()
     return JSONResponse(content={'wallet': wallet})
 
+@app.get("/api/alert-latency")
+async def api_alert_latency(since: Optional[float] = None, until: Optional[float] = None):
+    """Alert latency percentiles per stage for alerts queued in [since, until) (epoch seconds, default last 24h)"""
+    until = time.time() if until is None else until
+    since = until - 86400 if since is None else since
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return JSONResponse(content=await latency_report(get_db(), since, until))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
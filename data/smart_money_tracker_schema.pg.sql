@@ -0,0 +1,185 @@
+-- Smart Money Tracker Database Schema (PostgreSQL)
+-- Same tables and indexes as smart_money_tracker_schema.sql. Flags stay
+-- INTEGER so `is_active = 1` style queries run unchanged on both backends.
+-- References to wallets are enforced; references to trade ids are not,
+-- matching SQLite (which runs with foreign_keys off).
+
+-- Wallets table - tracks all wallet performance metrics
+CREATE TABLE IF NOT EXISTS wallets (
+    address TEXT PRIMARY KEY,
+    first_seen BIGINT NOT NULL,
+    last_active BIGINT NOT NULL,
+    total_trades INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0,
+    total_profit_sol DOUBLE PRECISION DEFAULT 0,
+    avg_hold_time_mins DOUBLE PRECISION DEFAULT 0,
+    performance_score DOUBLE PRECISION DEFAULT 0,
+    is_tracked INTEGER DEFAULT 0,
+    volume_24h DOUBLE PRECISION DEFAULT 0,
+    volume_7d DOUBLE PRECISION DEFAULT 0,
+    roi_24h DOUBLE PRECISION DEFAULT 0,
+    roi_7d DOUBLE PRECISION DEFAULT 0
+);
+
+-- Trades table - individual buy/sell transactions
+CREATE TABLE IF NOT EXISTS trades (
+    id BIGSERIAL PRIMARY KEY,
+    wallet_address TEXT NOT NULL REFERENCES wallets(address),
+    token_address TEXT NOT NULL,
+    token_name TEXT,
+    token_symbol TEXT,
+    action TEXT NOT NULL CHECK(action IN ('buy', 'sell')),
+    amount_sol DOUBLE PRECISION NOT NULL,
+    amount_tokens DOUBLE PRECISION,
+    timestamp BIGINT NOT NULL,
+    price_at_trade DOUBLE PRECISION,
+    signature TEXT UNIQUE
+);
+
+-- Positions table - track open positions for PnL calculation
+CREATE TABLE IF NOT EXISTS positions (
+    id BIGSERIAL PRIMARY KEY,
+    wallet_address TEXT NOT NULL REFERENCES wallets(address),
+    token_address TEXT NOT NULL,
+    token_name TEXT,
+    token_symbol TEXT,
+    entry_trade_id BIGINT NOT NULL,
+    entry_timestamp BIGINT NOT NULL,
+    entry_price DOUBLE PRECISION NOT NULL,
+    entry_amount_sol DOUBLE PRECISION NOT NULL,
+    entry_amount_tokens DOUBLE PRECISION NOT NULL,
+    exit_trade_id BIGINT,
+    exit_timestamp BIGINT,
+    exit_price DOUBLE PRECISION,
+    exit_amount_sol DOUBLE PRECISION,
+    profit_sol DOUBLE PRECISION,
+    profit_percent DOUBLE PRECISION,
+    hold_time_mins INTEGER,
+    status TEXT DEFAULT 'open' CHECK(status IN ('open', 'closed'))
+);
+
+-- Performance snapshots for historical tracking
+CREATE TABLE IF NOT EXISTS performance_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    wallet_address TEXT NOT NULL REFERENCES wallets(address),
+    snapshot_time BIGINT NOT NULL,
+    win_rate DOUBLE PRECISION,
+    roi_7d DOUBLE PRECISION,
+    roi_24h DOUBLE PRECISION,
+    volume_7d DOUBLE PRECISION,
+    volume_24h DOUBLE PRECISION,
+    performance_score DOUBLE PRECISION,
+    total_trades INTEGER
+);
+
+-- Alert configurations
+CREATE TABLE IF NOT EXISTS alert_configs (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    wallet_address TEXT NOT NULL REFERENCES wallets(address),
+    alert_type TEXT NOT NULL CHECK(alert_type IN ('telegram', 'webhook', 'email')),
+    alert_destination TEXT NOT NULL,
+    min_performance_score DOUBLE PRECISION DEFAULT 70,
+    min_buy_amount_sol DOUBLE PRECISION DEFAULT 0.1,
+    is_active INTEGER DEFAULT 1,
+    created_at BIGINT NOT NULL
+);
+
+-- Alert history (see smart_money_tracker_schema.sql for the *_at trace columns)
+CREATE TABLE IF NOT EXISTS alert_history (
+    id BIGSERIAL PRIMARY KEY,
+    alert_config_id BIGINT NOT NULL REFERENCES alert_configs(id),
+    wallet_address TEXT NOT NULL,
+    trade_id BIGINT NOT NULL,
+    sent_at BIGINT NOT NULL,
+    status TEXT DEFAULT 'sent' CHECK(status IN ('sent', 'failed', 'queued')),
+    event_at DOUBLE PRECISION,
+    received_at DOUBLE PRECISION,
+    queued_at DOUBLE PRECISION,
+    dequeued_at DOUBLE PRECISION,
+    acked_at DOUBLE PRECISION
+);
+
+-- Alert config version - bumped by a trigger on every alert_configs change
+-- so long-running processes can cheaply detect new or removed subscriptions
+CREATE TABLE IF NOT EXISTS alert_config_version (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO alert_config_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_alert_config_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE alert_config_version SET version = version + 1 WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_alert_configs_change ON alert_configs;
+CREATE TRIGGER trg_alert_configs_change AFTER INSERT OR UPDATE OR DELETE ON alert_configs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_alert_config_version();
+
+-- Tokens table - cache token metadata
+CREATE TABLE IF NOT EXISTS tokens (
+    address TEXT PRIMARY KEY,
+    name TEXT,
+    symbol TEXT,
+    created_at BIGINT,
+    total_volume_sol DOUBLE PRECISION DEFAULT 0,
+    unique_traders INTEGER DEFAULT 0,
+    last_updated BIGINT
+);
+
+-- Daily rollups of trades past the retention horizon (code/retention.py).
+-- day is the UTC midnight the trades fall on, in epoch seconds.
+CREATE TABLE IF NOT EXISTS wallet_daily (
+    wallet_address TEXT NOT NULL,
+    day BIGINT NOT NULL,
+    buys INTEGER NOT NULL DEFAULT 0,
+    sells INTEGER NOT NULL DEFAULT 0,
+    buy_volume_sol DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sell_volume_sol DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet_address, day)
+);
+
+CREATE TABLE IF NOT EXISTS token_daily (
+    token_address TEXT NOT NULL,
+    day BIGINT NOT NULL,
+    token_symbol TEXT,
+    buys INTEGER NOT NULL DEFAULT 0,
+    sells INTEGER NOT NULL DEFAULT 0,
+    buy_volume_sol DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sell_volume_sol DOUBLE PRECISION NOT NULL DEFAULT 0,
+    low_price DOUBLE PRECISION,
+    high_price DOUBLE PRECISION,
+    PRIMARY KEY (token_address, day)
+);
+
+-- Retention watermark: every trade before compacted_before is rolled up
+CREATE TABLE IF NOT EXISTS retention_state (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    compacted_before BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO retention_state (id, compacted_before) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Indexes for performance (trades.signature is covered by its UNIQUE constraint)
+CREATE INDEX IF NOT EXISTS idx_wallets_score ON wallets(performance_score DESC);
+CREATE INDEX IF NOT EXISTS idx_wallets_tracked ON wallets(is_tracked);
+CREATE INDEX IF NOT EXISTS idx_wallets_last_active ON wallets(last_active DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_wallet ON trades(wallet_address);
+CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_token ON trades(token_address);
+CREATE INDEX IF NOT EXISTS idx_positions_wallet ON positions(wallet_address);
+CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
+CREATE INDEX IF NOT EXISTS idx_positions_token ON positions(token_address);
+CREATE INDEX IF NOT EXISTS idx_alerts_user ON alert_configs(user_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_wallet ON alert_configs(wallet_address);
+CREATE INDEX IF NOT EXISTS idx_alert_history_sent ON alert_history(sent_at DESC);
+-- Queued alerts: the bot's catch-up poll and retention's keep-list
+CREATE INDEX IF NOT EXISTS idx_alert_history_status ON alert_history(status);
+-- Covers the latency report, which reads a queued_at range and nothing else
+CREATE INDEX IF NOT EXISTS idx_alert_history_latency
+    ON alert_history(queued_at, event_at, received_at, dequeued_at, acked_at);
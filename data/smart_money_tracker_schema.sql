@@ -89,6 +89,10 @@ CREATE TABLE IF NOT EXISTS alert_configs (
 );
 
 -- Alert history
+-- sent_at is the (whole second) time the alert was queued. The *_at REAL
+-- columns trace one alert end to end in epoch seconds: on-chain trade,
+-- monitor receive, queued by the monitor, picked up by the bot and
+-- acknowledged by Telegram.
 CREATE TABLE IF NOT EXISTS alert_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     alert_config_id INTEGER NOT NULL,
@@ -96,10 +100,39 @@ CREATE TABLE IF NOT EXISTS alert_history (
     trade_id INTEGER NOT NULL,
     sent_at INTEGER NOT NULL,
     status TEXT DEFAULT 'sent' CHECK(status IN ('sent', 'failed', 'queued')),
+    event_at REAL,
+    received_at REAL,
+    queued_at REAL,
+    dequeued_at REAL,
+    acked_at REAL,
     FOREIGN KEY (alert_config_id) REFERENCES alert_configs(id),
     FOREIGN KEY (trade_id) REFERENCES trades(id)
 );
 
+-- Alert config version - bumped by triggers on every alert_configs change
+-- so long-running processes can cheaply detect new or removed subscriptions
+CREATE TABLE IF NOT EXISTS alert_config_version (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO alert_config_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_alert_configs_insert AFTER INSERT ON alert_configs
+BEGIN
+    UPDATE alert_config_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alert_configs_update AFTER UPDATE ON alert_configs
+BEGIN
+    UPDATE alert_config_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alert_configs_delete AFTER DELETE ON alert_configs
+BEGIN
+    UPDATE alert_config_version SET version = version + 1 WHERE id = 1;
+END;
+
 -- Tokens table - cache token metadata
 CREATE TABLE IF NOT EXISTS tokens (
     address TEXT PRIMARY KEY,
@@ -111,6 +144,39 @@ CREATE TABLE IF NOT EXISTS tokens (
     last_updated INTEGER
 );
 
+-- Daily rollups of trades past the retention horizon (code/retention.py).
+-- day is the UTC midnight the trades fall on, in epoch seconds.
+CREATE TABLE IF NOT EXISTS wallet_daily (
+    wallet_address TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    buys INTEGER NOT NULL DEFAULT 0,
+    sells INTEGER NOT NULL DEFAULT 0,
+    buy_volume_sol REAL NOT NULL DEFAULT 0,
+    sell_volume_sol REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet_address, day)
+);
+
+CREATE TABLE IF NOT EXISTS token_daily (
+    token_address TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    token_symbol TEXT,
+    buys INTEGER NOT NULL DEFAULT 0,
+    sells INTEGER NOT NULL DEFAULT 0,
+    buy_volume_sol REAL NOT NULL DEFAULT 0,
+    sell_volume_sol REAL NOT NULL DEFAULT 0,
+    low_price REAL,
+    high_price REAL,
+    PRIMARY KEY (token_address, day)
+);
+
+-- Retention watermark: every trade before compacted_before is rolled up
+CREATE TABLE IF NOT EXISTS retention_state (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    compacted_before INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO retention_state (id, compacted_before) VALUES (1, 0);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_wallets_score ON wallets(performance_score DESC);
 CREATE INDEX IF NOT EXISTS idx_wallets_tracked ON wallets(is_tracked);
@@ -118,10 +184,16 @@ CREATE INDEX IF NOT EXISTS idx_wallets_last_active ON wallets(last_active DESC);
 CREATE INDEX IF NOT EXISTS idx_trades_wallet ON trades(wallet_address);
 CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_trades_token ON trades(token_address);
-CREATE INDEX IF NOT EXISTS idx_trades_signature ON trades(signature);
+-- trades.signature is covered by its UNIQUE constraint's index
+DROP INDEX IF EXISTS idx_trades_signature;
 CREATE INDEX IF NOT EXISTS idx_positions_wallet ON positions(wallet_address);
 CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
 CREATE INDEX IF NOT EXISTS idx_positions_token ON positions(token_address);
 CREATE INDEX IF NOT EXISTS idx_alerts_user ON alert_configs(user_id);
 CREATE INDEX IF NOT EXISTS idx_alerts_wallet ON alert_configs(wallet_address);
 CREATE INDEX IF NOT EXISTS idx_alert_history_sent ON alert_history(sent_at DESC);
+-- Queued alerts: the bot's catch-up poll and retention's keep-list
+CREATE INDEX IF NOT EXISTS idx_alert_history_status ON alert_history(status);
+-- Covers the latency report, which reads a queued_at range and nothing else
+CREATE INDEX IF NOT EXISTS idx_alert_history_latency
+    ON alert_history(queued_at, event_at, received_at, dequeued_at, acked_at);